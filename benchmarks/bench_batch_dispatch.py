@@ -0,0 +1,84 @@
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+
+sys.path.append('../protofiles')
+import ride_sharing_pb2
+
+sys.path.append('../server')
+from ride_sharing_server import RideSharingService
+from spatial_index import haversine_km
+
+CENTER = (12.97, 77.59)  # Drivers and pickups are spread over a box around this point
+
+
+def random_location(rng, spread):
+    return f"{CENTER[0] + rng.uniform(-spread, spread):.6f},{CENTER[1] + rng.uniform(-spread, spread):.6f}"
+
+
+def build_service(drivers, seed, spread):
+    rng = random.Random(seed)
+    service = RideSharingService(accept_timeout=3600)
+    for i in range(drivers):
+        service.register_driver(f'driver-{i}', tuple(map(float, random_location(rng, spread).split(','))))
+    return service
+
+
+def pickup_distance(service, ride_id):
+    ride = service.rides[ride_id]
+    driver_location = service.drivers.location(ride['assigned_driver'])
+    return float(haversine_km(ride['pickup_point'][0], ride['pickup_point'][1], [driver_location[0]], [driver_location[1]])[0])
+
+
+def run(mode, args):
+    # The same drivers and the same surge of requests for both modes
+    service = build_service(args.drivers, args.seed, args.spread)
+    rng = random.Random(args.seed + 1)
+    requests = [ride_sharing_pb2.RideRequest(rider_id=f'rider-{i}', pickup_location=random_location(rng, args.spread), destination='')
+                for i in range(args.riders)]
+
+    distances = []
+    started = time.perf_counter()
+    for start in range(0, len(requests), args.batch_size):
+        # One batch is the set of requests that arrive within one dispatch window
+        window = requests[start:start + args.batch_size]
+        if mode == 'greedy':
+            for request in window:
+                response = service.RequestRide(request, None)
+                if response.status == 'assigned':
+                    distances.append(pickup_distance(service, response.ride_id))
+        else:
+            ride_ids = [service.create_ride(request) for request in window]
+            assignments = service.dispatch_batch(ride_ids)
+            distances.extend(pickup_distance(service, ride_id) for ride_id in assignments)
+    elapsed = time.perf_counter() - started
+    service.scheduler.stop()
+    return {
+        'assigned': len(distances),
+        'mean_pickup_km': sum(distances) / len(distances) if distances else 0.0,
+        'max_pickup_km': max(distances) if distances else 0.0,
+        'rides_per_s': len(requests) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare greedy and batched dispatch on a surge of ride requests.")
+    parser.add_argument('--drivers', type=int, default=1000)
+    parser.add_argument('--riders', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=200, help='Requests arriving within one dispatch window')
+    parser.add_argument('--spread', type=float, default=0.1, help='Half-width of the service area in degrees')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'assigned':>9} {'mean km':>9} {'max km':>8} {'rides/s':>9}")
+    for mode in ('greedy', 'batch'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run(mode, args)
+        print(f"{mode:>8} {result['assigned']:>9} {result['mean_pickup_km']:>9.3f} {result['max_pickup_km']:>8.3f} {result['rides_per_s']:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
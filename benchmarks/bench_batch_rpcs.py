@@ -0,0 +1,78 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import grpc
+
+sys.path.append('../protofiles')
+import ride_sharing_pb2
+import ride_sharing_pb2_grpc
+
+sys.path.append('../helper')
+from channel_pool import ChannelPool
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server')
+
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def run(stub, prefix, batch, args):
+    # Onboards args.items drivers, requests as many rides and polls their statuses, one item
+    # per call (batch=0) or batch items per call. Returns items per second for each step.
+    drivers = [ride_sharing_pb2.RegisterDriverRequest(driver_id=f'{prefix}-driver-{i}', location=f'12.{i % 100:02d},77.59')
+               for i in range(args.items)]
+    rides = [ride_sharing_pb2.RideRequest(rider_id=f'{prefix}-rider-{i}', pickup_location=f'12.{i % 100:02d},77.60',
+                                          destination='12.98,77.60') for i in range(args.items)]
+    if batch:
+        register, _ = timed(lambda: [stub.RegisterDrivers(ride_sharing_pb2.RegisterDriversRequest(drivers=chunk))
+                                     for chunk in chunks(drivers, batch)])
+        request, responses = timed(lambda: [response for chunk in chunks(rides, batch)
+                                            for response in stub.RequestRides(ride_sharing_pb2.RideRequests(rides=chunk)).rides])
+        ride_ids = [response.ride_id for response in responses]
+        status, _ = timed(lambda: [stub.GetRideStatuses(ride_sharing_pb2.RideStatusesRequest(ride_ids=chunk))
+                                   for chunk in chunks(ride_ids, batch)])
+    else:
+        register, _ = timed(lambda: [stub.RegisterDriver(driver) for driver in drivers])
+        request, responses = timed(lambda: [stub.RequestRide(ride) for ride in rides])
+        ride_ids = [response.ride_id for response in responses]
+        status, _ = timed(lambda: [stub.GetRideStatus(ride_sharing_pb2.RideStatusRequest(ride_id=ride_id)) for ride_id in ride_ids])
+    assigned = sum(response.status == 'assigned' for response in responses)
+    return args.items / register, args.items / request, args.items / status, assigned
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare unary and batch RPCs for driver onboarding, ride requests and status polling.")
+    parser.add_argument('--items', type=int, default=2000, help='Drivers, rides and status checks per mode')
+    parser.add_argument('--batches', type=int, nargs='+', default=[10, 100, 500], help='Batch sizes to compare with unary calls')
+    parser.add_argument('--port', type=int, default=5160)
+    args = parser.parse_args()
+
+    # A long acceptance window keeps offered drivers busy for the whole run
+    server = subprocess.Popen([sys.executable, 'ride_sharing_server.py', str(args.port), '--accept-timeout', '3600'],
+                              cwd=SERVER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        channel = ChannelPool('driver_client').channel(f'localhost:{args.port}')
+        grpc.channel_ready_future(channel).result(timeout=15)
+        stub = ride_sharing_pb2_grpc.RideSharingServiceStub(channel)
+
+        print(f"{'batch':>6} {'register/s':>11} {'request/s':>10} {'status/s':>9} {'assigned':>9}")
+        for batch in [0] + args.batches:
+            register, request, status, assigned = run(stub, f'b{batch}', batch, args)
+            print(f"{batch or 'unary':>6} {register:>11.0f} {request:>10.0f} {status:>9.0f} {assigned:>9}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+from concurrent import futures
+
+import grpc
+
+sys.path.append('../protofiles')
+import ride_sharing_pb2
+import ride_sharing_pb2_grpc
+
+sys.path.append('../server')
+from ride_sharing_server import RideSharingService, load_server_credentials
+
+sys.path.append('../helper')
+from channel_pool import ChannelPool
+
+
+def fresh_channel(pool, target):
+    # What the clients did before the pool: read the certificates and open a new channel per call
+    return grpc.secure_channel(target, ChannelPool(pool.certificate).credentials())
+
+
+def run(pooled, target, args):
+    pool = ChannelPool('rider_client')
+    request = ride_sharing_pb2.RideStatusRequest(ride_id='missing')
+    latencies = []
+    for _ in range(args.calls):
+        started = time.perf_counter()
+        channel = pool.channel(target) if pooled else fresh_channel(pool, target)
+        ride_sharing_pb2_grpc.RideSharingServiceStub(channel).GetRideStatus(request)
+        latencies.append(time.perf_counter() - started)
+        if not pooled:
+            channel.close()
+    pool.close()
+    return statistics.median(latencies) * 1000, max(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call latency of a new secure channel per call with a pooled channel.")
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--port', type=int, default=5150)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = RideSharingService()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    ride_sharing_pb2_grpc.add_RideSharingServiceServicer_to_server(service, server)
+    server.add_secure_port(f'[::]:{args.port}', load_server_credentials())
+    server.start()
+
+    target = f'localhost:{args.port}'
+    print(f"{'channel':>8} {'p50 ms':>8} {'max ms':>8}")
+    for pooled in (False, True):
+        p50, worst = run(pooled, target, args)
+        print(f"{'pooled' if pooled else 'fresh':>8} {p50:>8.2f} {worst:>8.2f}")
+
+    server.stop(None)
+    service.scheduler.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+from concurrent import futures
+
+import grpc
+
+sys.path.append('../protofiles')
+import load_balancer_pb2
+import load_balancer_pb2_grpc
+
+sys.path.append('../server')
+from load_balance import LoadBalancer, load_server_credentials
+
+sys.path.append('../helper')
+from metrics_interceptor import MetricsInterceptor, ServerMetrics
+
+sys.path.append('../client')
+import rider_client
+
+
+def run(cached, args):
+    # Routes args.sessions riders from one process, the way a simulator or a gateway would,
+    # and counts the calls that reach the load balancer
+    ports = [str(5050 + i) for i in range(args.servers)]
+    metrics = ServerMetrics()
+    load_balancer = LoadBalancer(ports, metrics, list_ttl=args.list_ttl)
+    for port in ports:
+        load_balancer.ReportLoad(load_balancer_pb2.LoadReport(port=port, available_drivers=args.drivers), None)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), interceptors=[MetricsInterceptor(metrics)])
+    load_balancer_pb2_grpc.add_LoadBalancerServiceServicer_to_server(load_balancer, server)
+    server.add_secure_port('[::]:4000', load_server_credentials())
+    server.start()
+
+    rider_client.server_list = None
+    if cached:
+        rider_client.use_cached_routing()
+    latencies = []
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.sessions):
+            call_started = time.perf_counter()
+            rider_client.get_server_ports_from_load_balancer(f'rider-{i}')
+            latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    server.stop(None)
+    lb_calls = sum(stats.calls for stats in metrics.snapshot().values())
+    return args.sessions / elapsed, statistics.median(latencies) * 1000, lb_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare asking the load balancer per ride with routing from a cached server list.")
+    parser.add_argument('--sessions', type=int, default=2000, help='Riders routed per mode')
+    parser.add_argument('--servers', type=int, default=5)
+    parser.add_argument('--drivers', type=int, default=50, help='Free drivers reported by each server')
+    parser.add_argument('--list-ttl', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'routing':>8} {'sessions/s':>11} {'p50 ms':>8} {'LB calls':>9}")
+    for cached in (False, True):
+        rate, p50, lb_calls = run(cached, args)
+        print(f"{'cached' if cached else 'per ride':>8} {rate:>11.0f} {p50:>8.3f} {lb_calls:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import grpc
+
+sys.path.append('../protofiles')
+import load_balancer_pb2
+import load_balancer_pb2_grpc
+import ride_sharing_pb2
+import ride_sharing_pb2_grpc
+
+sys.path.append('../helper')
+from channel_pool import ChannelPool
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server')
+BATCH = 500  # Drivers or rides per batch RPC
+
+
+def start(args, name):
+    return subprocess.Popen([sys.executable, name, *args], cwd=SERVER_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def standby_load(lb_stub, primary):
+    for load in lb_stub.GetServerStats(load_balancer_pb2.LoadBalancerStatsRequest()).servers:
+        if load.port == primary:
+            return load
+    return None
+
+
+def fill(stub, args):
+    # args.drivers drivers and args.rides rides, every other ride accepted
+    for start_index in range(0, args.drivers, BATCH):
+        stub.RegisterDrivers(ride_sharing_pb2.RegisterDriversRequest(drivers=[
+            ride_sharing_pb2.RegisterDriverRequest(driver_id=f'driver-{i}', location=f'12.{i % 100:02d},77.{i // 100 % 100:02d}')
+            for i in range(start_index, min(start_index + BATCH, args.drivers))]))
+    ride_ids = []
+    for start_index in range(0, args.rides, BATCH):
+        responses = stub.RequestRides(ride_sharing_pb2.RideRequests(rides=[
+            ride_sharing_pb2.RideRequest(rider_id=f'rider-{i}', pickup_location=f'12.{i % 100:02d},77.{i // 100 % 100:02d}',
+                                         destination='12.98,77.60')
+            for i in range(start_index, min(start_index + BATCH, args.rides))])).rides
+        for index, response in enumerate(responses):
+            if response.status == 'assigned' and index % 2 == 0:
+                stub.AcceptRide(ride_sharing_pb2.AcceptRideRequest(driver_id=response.assigned_driver, ride_id=response.ride_id))
+            ride_ids.append(response.ride_id)
+    return ride_ids
+
+
+def churn(stub, stopped):
+    # Location updates from every driver in turn while the lag is sampled
+    i = 0
+    while not stopped.is_set():
+        stub.UpdateDriverLocation(ride_sharing_pb2.UpdateDriverLocationRequest(
+            driver_id=f'driver-{i % 1000}', location=f'12.{i % 97:02d},77.{i % 89:02d}'))
+        i += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure standby catch-up, replication lag and failover time.")
+    parser.add_argument('--drivers', type=int, default=50000)
+    parser.add_argument('--rides', type=int, default=20000)
+    parser.add_argument('--heartbeat-timeout', type=float, default=2.0, help="The load balancer's --heartbeat-timeout")
+    parser.add_argument('--report-interval', type=float, default=0.5, help="The servers' --report-interval")
+    parser.add_argument('--sample-seconds', type=float, default=10, help='Seconds of lag sampling under load')
+    parser.add_argument('--port', type=int, default=5180)
+    args = parser.parse_args()
+
+    primary_port, standby_port = str(args.port), str(args.port + 1)
+    common = ['--report-interval', str(args.report_interval), '--accept-timeout', '3600', '--queue-timeout', '3600']
+    processes = [start(['--ports', primary_port, '--heartbeat-timeout', str(args.heartbeat_timeout)], 'load_balance.py'),
+                 start([primary_port, '--replicate', '--async', *common], 'ride_sharing_server.py')]
+    pool = ChannelPool('driver_client')
+    try:
+        channel = pool.channel(f'localhost:{primary_port}')
+        grpc.channel_ready_future(channel).result(timeout=15)
+        stub = ride_sharing_pb2_grpc.RideSharingServiceStub(channel)
+        lb_stub = load_balancer_pb2_grpc.LoadBalancerServiceStub(pool.channel('localhost:4000'))
+
+        started = time.perf_counter()
+        ride_ids = fill(stub, args)
+        print(f"Filled the primary with {args.drivers} drivers and {len(ride_ids)} rides in {time.perf_counter() - started:.1f}s")
+
+        # The standby starts from a snapshot of everything above
+        started = time.perf_counter()
+        standby = start([standby_port, '--standby-of', primary_port, '--async', *common], 'ride_sharing_server.py')
+        processes.append(standby)
+        while True:
+            load = standby_load(lb_stub, primary_port)
+            if load is not None and load.standby_port and load.replication_lag_seconds >= 0:
+                break
+            time.sleep(0.05)
+        print(f"Standby caught up in {time.perf_counter() - started:.2f}s (including its start and first load report)")
+
+        stopped = threading.Event()
+        writer = threading.Thread(target=churn, args=(stub, stopped))
+        writer.start()
+        lags = []
+        deadline = time.monotonic() + args.sample_seconds
+        while time.monotonic() < deadline:
+            time.sleep(args.report_interval)
+            lags.append(standby_load(lb_stub, primary_port).replication_lag_seconds * 1000)
+        stopped.set()
+        writer.join()
+        lags.sort()
+        print(f"Replication lag under load: p50 {statistics.median(lags):.0f} ms, max {lags[-1]:.0f} ms ({len(lags)} samples)")
+
+        expected = stub.GetServerStats(ride_sharing_pb2.ServerStatsRequest())
+        killed = time.perf_counter()
+        processes[1].send_signal(signal.SIGKILL)
+        standby_stub = ride_sharing_pb2_grpc.RideSharingServiceStub(pool.channel(f'localhost:{standby_port}'))
+        while True:
+            try:
+                stats = standby_stub.GetServerStats(ride_sharing_pb2.ServerStatsRequest(), timeout=1)
+                break
+            except grpc.RpcError:
+                time.sleep(0.05)
+        failover = time.perf_counter() - killed
+        print(f"Failover: the standby served {failover:.2f}s after the primary was killed "
+              f"(heartbeat timeout {args.heartbeat_timeout}s, report interval {args.report_interval}s)")
+        print(f"  rides {stats.active_rides}/{expected.active_rides}, available drivers {stats.available_drivers}/{expected.available_drivers}, "
+              f"busy drivers {stats.busy_drivers}/{expected.busy_drivers}, pending offers {stats.pending_offers}/{expected.pending_offers}")
+    finally:
+        for process in processes:
+            process.send_signal(signal.SIGINT)
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == '__main__':
+    main()
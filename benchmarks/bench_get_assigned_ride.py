@@ -0,0 +1,49 @@
+import argparse
+import contextlib
+import io
+import sys
+import timeit
+
+sys.path.append('../protofiles')
+import ride_sharing_pb2
+
+sys.path.append('../server')
+from ride_sharing_server import RideSharingService
+
+
+def build_service(history_size):
+    # Run history_size rides through the full request/accept/complete cycle, then leave
+    # one driver holding an unanswered offer
+    service = RideSharingService(accept_timeout=3600)
+    with contextlib.redirect_stdout(io.StringIO()):
+        service.register_driver('history-driver')
+        for i in range(history_size):
+            ride = service.RequestRide(ride_sharing_pb2.RideRequest(rider_id=f'rider-{i}', pickup_location='A', destination='B'), None)
+            service.AcceptRide(ride_sharing_pb2.AcceptRideRequest(driver_id='history-driver', ride_id=ride.ride_id), None)
+            service.CompleteRide(ride_sharing_pb2.RideCompletionRequest(driver_id='history-driver', ride_id=ride.ride_id), None)
+        service.unregister_driver('history-driver')
+        service.register_driver('polling-driver')
+        service.RequestRide(ride_sharing_pb2.RideRequest(rider_id='pending-rider', pickup_location='A', destination='B'), None)
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure GetAssignedRide latency as ride history grows.")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    with_offer = ride_sharing_pb2.AssignedRideRequest(driver_id='polling-driver')
+    without_offer = ride_sharing_pb2.AssignedRideRequest(driver_id='idle-driver')
+    print(f"{'rides':>10} {'offer (us)':>12} {'no offer (us)':>14}")
+    for size in args.sizes:
+        service = build_service(size)
+        assert service.GetAssignedRide(with_offer, None).ride_id
+        hit = timeit.timeit(lambda: service.GetAssignedRide(with_offer, None), number=args.calls)
+        miss = timeit.timeit(lambda: service.GetAssignedRide(without_offer, None), number=args.calls)
+        print(f"{size:>10} {hit / args.calls * 1e6:>12.2f} {miss / args.calls * 1e6:>14.2f}")
+        service.scheduler.stop()
+
+
+if __name__ == '__main__':
+    main()
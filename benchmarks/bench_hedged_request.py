@@ -0,0 +1,107 @@
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+from concurrent import futures
+
+import grpc
+
+sys.path.append('../protofiles')
+import ride_sharing_pb2
+import ride_sharing_pb2_grpc
+
+sys.path.append('../server')
+from ride_sharing_server import RideSharingService, load_server_credentials
+
+sys.path.append('../client')
+from rider_client import connect, hedged_request
+
+
+class DelayedService(RideSharingService):
+    # Answers RequestRide after rtt seconds, standing in for the network between rider and server
+    def __init__(self, rtt, **options):
+        super().__init__(**options)
+        self.rtt = rtt
+
+    def RequestRide(self, request, context):
+        time.sleep(self.rtt)
+        return super().RequestRide(request, context)
+
+
+def start_servers(count, args):
+    # count servers; only the one ranked last has drivers, the worst case for a sequential rider
+    ports = [str(args.base_port + i) for i in range(count)]
+    servers = []
+    for index, port in enumerate(ports):
+        with contextlib.redirect_stdout(io.StringIO()):
+            service = DelayedService(args.rtt_ms / 1000, accept_timeout=3600)
+            if index == count - 1:
+                for i in range(args.drivers):
+                    service.register_driver(f'driver-{i}', (12.97, 77.59))
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+        ride_sharing_pb2_grpc.add_RideSharingServiceServicer_to_server(service, server)
+        server.add_secure_port(f'[::]:{port}', load_server_credentials())
+        server.start()
+        servers.append((server, service))
+    return ports, servers
+
+
+def sequential_request(rider_id, ports, request):
+    for port in ports:
+        stub = connect(port)
+        response = stub.RequestRide(request)
+        if response.status == 'assigned':
+            return port, stub, response
+    return None
+
+
+def run(count, hedged, args):
+    ports, servers = start_servers(count, args)
+    stubs = {port: connect(port) for port in ports}
+    for stub in stubs.values():
+        stub.GetRideStatus(ride_sharing_pb2.RideStatusRequest(ride_id='warmup'))  # TLS handshakes outside the measurement
+
+    times, failed = [], 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.rides):
+            rider_id = f'rider-{i}'
+            request = ride_sharing_pb2.RideRequest(rider_id=rider_id, pickup_location='12.97,77.59', destination='12.98,77.60')
+            started = time.perf_counter()
+            if hedged:
+                winner, _ = hedged_request(rider_id, ports, request)
+            else:
+                winner = sequential_request(rider_id, ports, request)
+            times.append(time.perf_counter() - started)
+            if winner is None:
+                failed += 1
+                continue
+            # Free the driver again so every ride sees the same cluster
+            port, _, response = winner
+            stubs[port].CancelRide(ride_sharing_pb2.CancelRideRequest(ride_id=response.ride_id, rider_id=rider_id))
+
+        for server, service in servers:
+            server.stop(1).wait()  # Lets the slower hedged calls of the last ride finish
+            service.scheduler.stop()
+    return statistics.median(times) * 1000, max(times) * 1000, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare rider time-to-assignment for sequential and hedged RequestRide as servers are added.")
+    parser.add_argument('--servers', type=int, nargs='+', default=[1, 2, 4, 8], help='Cluster sizes to compare')
+    parser.add_argument('--rides', type=int, default=30, help='Rides requested per cluster size and mode')
+    parser.add_argument('--drivers', type=int, default=5, help='Drivers on the last server of the ranking')
+    parser.add_argument('--rtt-ms', type=float, default=20.0, help='Delay added to every RequestRide, like a network round trip')
+    parser.add_argument('--base-port', type=int, default=5150)
+    args = parser.parse_args()
+
+    print(f"{'servers':>8} {'mode':>11} {'p50 ms':>8} {'max ms':>8} {'failed':>7}")
+    for count in args.servers:
+        for hedged in (False, True):
+            p50, worst, failed = run(count, hedged, args)
+            print(f"{count:>8} {'hedged' if hedged else 'sequential':>11} {p50:>8.1f} {worst:>8.1f} {failed:>7}")
+
+
+if __name__ == '__main__':
+    main()
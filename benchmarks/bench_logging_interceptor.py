@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime
+
+sys.path.append('../protofiles')
+import ride_sharing_pb2
+
+sys.path.append('../helper')
+from logging_interceptor import LoggingInterceptor
+
+CallDetails = namedtuple('CallDetails', 'method timeout metadata credentials wait_for_ready compression')
+DETAILS = CallDetails('/ride_sharing.RideSharingService/GetRideStatus', None, None, None, None, None)
+RESPONSE = ride_sharing_pb2.AssignedRideDetails(pickup_location='12.971600,77.594600', destination='12.935200,77.624500', ride_id='0' * 36)
+
+
+def continuation(details, request):
+    return RESPONSE
+
+
+class SyncInterceptor:
+    # The previous interceptor: format and append each record on the calling thread
+    def __init__(self, log_file):
+        self.log_file = log_file
+
+    def append_to_log(self, log_entry):
+        with open(self.log_file, 'a') as f:
+            f.write(log_entry)
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        method_name = client_call_details.method
+        self.append_to_log(f"[{datetime.now().isoformat()}] Rider calling method: {method_name}\n")
+        response = continuation(client_call_details, request)
+        self.append_to_log(f"[{datetime.now().isoformat()}] Rider received response from method: {method_name} - Response: {response}\n")
+        return response
+
+
+def per_call_us(interceptor, calls):
+    request = ride_sharing_pb2.RideStatusRequest(ride_id='ride')
+    started = time.perf_counter()
+    for _ in range(calls):
+        interceptor.intercept_unary_unary(continuation, DETAILS, request)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the latency the logging interceptor adds to every intercepted call.")
+    parser.add_argument('--calls', type=int, default=50000)
+    parser.add_argument('--capacity', type=int, default=8192, help='Ring buffer size of the asynchronous writer')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cases = [
+            ('sync', SyncInterceptor(os.path.join(directory, 'sync.txt'))),
+            ('async', LoggingInterceptor('rider', os.path.join(directory, 'async.txt'), capacity=args.capacity)),
+            ('async 10%', LoggingInterceptor('rider', os.path.join(directory, 'sampled.txt'), sample_rate=0.1, capacity=args.capacity)),
+        ]
+        print(f"{'mode':>10} {'us/call':>8} {'written':>8} {'dropped':>8}")
+        for name, interceptor in cases:
+            cost = per_call_us(interceptor, args.calls)
+            if isinstance(interceptor, LoggingInterceptor):
+                interceptor.writer.close()
+                stats = interceptor.stats()
+                written, dropped = stats['written'], stats['dropped']
+            else:
+                written, dropped = args.calls * 2, 0
+            print(f"{name:>10} {cost:>8.2f} {written:>8} {dropped:>8}")
+
+
+if __name__ == '__main__':
+    main()
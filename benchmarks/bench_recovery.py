@@ -0,0 +1,105 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append('../server')
+from ride_sharing_server import RideSharingService
+from state_log import StateLog, DEFAULT_SNAPSHOT_EVERY
+
+
+def write_history(directory, args, snapshot_every):
+    # Replays a synthetic day straight into a StateLog: args.drivers drivers and about
+    # args.active rides in flight, each ride logged as offered, accepted and completed
+    # together with its driver going busy and free again, in batches of args.batch records
+    rng = random.Random(args.seed)
+    rides, drivers = {}, {}
+    capture = lambda ride_ids, driver_ids: ({key: rides.get(key) for key in ride_ids},
+                                            {key: drivers.get(key) for key in driver_ids})
+    # Batches are written by the loop below rather than on the log's timer
+    state_log = StateLog(directory, sync_interval=3600, snapshot_every=snapshot_every)
+    state_log.start(threading.RLock(), capture)
+
+    for i in range(args.drivers):
+        drivers[f'driver-{i}'] = ['available', 12.9 + rng.random() / 10, 77.5 + rng.random() / 10]
+        state_log.driver_changed(f'driver-{i}')
+    free = list(drivers)
+    in_flight = []
+    started = time.perf_counter()
+    ride = 0
+    while state_log.records < args.events:
+        for _ in range(args.batch // 4):
+            if free and len(in_flight) < args.active:
+                driver_id = free.pop(rng.randrange(len(free)))
+                ride_id = f'ride-{ride}'
+                ride += 1
+                rides[ride_id] = [f'rider-{ride}', '12.95,77.55', '12.97,77.59', driver_id, 'waiting_for_acceptance',
+                                  time.time() + 3600, []]
+                drivers[driver_id][0] = 'busy'
+                in_flight.append(ride_id)
+            else:
+                ride_id = in_flight.pop(rng.randrange(len(in_flight)))
+                driver_id = rides[ride_id][3]
+                if rides[ride_id][4] == 'waiting_for_acceptance':
+                    rides[ride_id][4:6] = ['in_progress', None]
+                    in_flight.append(ride_id)
+                else:
+                    del rides[ride_id]
+                    drivers[driver_id][0] = 'available'
+                    free.append(driver_id)
+            state_log.ride_changed(ride_id)
+            state_log.driver_changed(driver_id)
+        state_log.flush()
+    elapsed = time.perf_counter() - started
+    state_log.close()
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    return state_log.records / elapsed, size, len(rides)
+
+
+def recover(directory):
+    # Time to the point where a restarted server could take calls again
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = RideSharingService(state_log=StateLog(directory))
+        service.recover()
+    elapsed = time.perf_counter() - started
+    service.state_log.close()
+    service.scheduler.stop()
+    return elapsed, service.state_log.recovery['replayed_records'], len(service.rides)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how long a server takes to recover from its state log.")
+    parser.add_argument('--events', type=int, default=2000000, help='Ride and driver records in the history')
+    parser.add_argument('--drivers', type=int, default=20000)
+    parser.add_argument('--active', type=int, default=10000, help='Rides in flight at any time')
+    parser.add_argument('--batch', type=int, default=200, help='Records per fsynced batch')
+    parser.add_argument('--snapshot-every', type=int, nargs='+', default=[0, DEFAULT_SNAPSHOT_EVERY],
+                        help='Snapshot intervals to compare; 0 never snapshots')
+    parser.add_argument('--dir', help='Directory for the state logs (default: a temporary directory)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    root = args.dir or tempfile.mkdtemp(prefix='bench-recovery-')
+    print(f"{'snapshot every':>14} {'records/s':>10} {'on disk MB':>11} {'replayed':>9} {'recover s':>10} {'rides':>7}")
+    try:
+        for snapshot_every in args.snapshot_every:
+            directory = os.path.join(root, f'snapshot-{snapshot_every}')
+            shutil.rmtree(directory, ignore_errors=True)
+            rate, size, rides = write_history(directory, args, snapshot_every or float('inf'))
+            seconds, replayed, recovered = recover(directory)
+            assert recovered == rides, (recovered, rides)
+            print(f"{snapshot_every or 'never':>14} {rate:>10.0f} {size / 1e6:>11.1f} {replayed:>9} {seconds:>10.2f} {recovered:>7}")
+    finally:
+        if not args.dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
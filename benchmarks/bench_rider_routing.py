@@ -0,0 +1,96 @@
+import argparse
+import contextlib
+import heapq
+import io
+import random
+import sys
+
+sys.path.append('../protofiles')
+import load_balancer_pb2
+
+sys.path.append('../server')
+from load_balance import LoadBalancer
+
+
+class SimulatedServer:
+    def __init__(self, port, drivers):
+        self.port = port
+        self.available = drivers
+        self.busy = 0
+
+    def report(self):
+        return load_balancer_pb2.LoadReport(port=self.port, available_drivers=self.available, busy_drivers=self.busy,
+                                            active_rides=self.busy)
+
+
+def run(mode, args):
+    # Riders arrive at random, try the servers in the order they are given and take the first
+    # free driver. Drivers are spread unevenly over the servers, and each server reports its
+    # load every report_interval seconds, as the real servers do.
+    rng = random.Random(args.seed)
+    ports = [str(5050 + i) for i in range(args.servers)]
+    weights = [rng.uniform(0.2, 1.0) for _ in ports]
+    servers = {port: SimulatedServer(port, round(args.drivers * w / sum(weights))) for port, w in zip(ports, weights)}
+    load_balancer = LoadBalancer(ports, rider_routing='round-robin' if mode == 'round-robin' else 'p2c')
+
+    rides_in_progress = []  # Heap of (finish time, port)
+    rotation = 0
+    attempts, first_try, failed = [], 0, 0
+    now, next_report = 0.0, 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        while now < args.duration:
+            now += rng.expovariate(args.rate)
+            while rides_in_progress and rides_in_progress[0][0] <= now:
+                _, port = heapq.heappop(rides_in_progress)
+                servers[port].busy -= 1
+                servers[port].available += 1
+            while next_report <= now:
+                for server in servers.values():
+                    load_balancer.ReportLoad(server.report(), None)
+                next_report += args.report_interval
+
+            if mode == 'rotation':
+                # What riders got before load reports existed: every port, rotated per rider
+                order = ports[rotation:] + ports[:rotation]
+                rotation = (rotation + 1) % len(ports)
+            else:
+                order = list(load_balancer.GetServerPortForRider(load_balancer_pb2.RiderRequest(rider_id='rider'), None).server_ports)
+
+            for tries, port in enumerate(order, start=1):
+                server = servers[port]
+                if server.available:
+                    server.available -= 1
+                    server.busy += 1
+                    heapq.heappush(rides_in_progress, (now + rng.expovariate(1 / args.ride_time), port))
+                    attempts.append(tries)
+                    first_try += tries == 1
+                    break
+            else:
+                failed += 1
+    return {
+        'rides': len(attempts),
+        'attempts_per_ride': sum(attempts) / len(attempts) if attempts else 0.0,
+        'first_try': first_try / len(attempts) if attempts else 0.0,
+        'failed': failed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare attempts per ride under the load balancer's rider routing modes.")
+    parser.add_argument('--servers', type=int, default=5)
+    parser.add_argument('--drivers', type=int, default=200, help='Drivers spread unevenly over all servers')
+    parser.add_argument('--rate', type=float, default=9.0, help='Ride requests per second')
+    parser.add_argument('--ride-time', type=float, default=20.0, help='Mean seconds a driver is busy with a ride')
+    parser.add_argument('--report-interval', type=float, default=2.0, help='Seconds between load reports')
+    parser.add_argument('--duration', type=float, default=3600.0, help='Simulated seconds')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'mode':>12} {'rides':>7} {'attempts/ride':>14} {'first try':>10} {'failed':>7}")
+    for mode in ('rotation', 'round-robin', 'p2c'):
+        result = run(mode, args)
+        print(f"{mode:>12} {result['rides']:>7} {result['attempts_per_ride']:>14.3f} {result['first_try']:>9.1%} {result['failed']:>7}")
+
+
+if __name__ == '__main__':
+    main()
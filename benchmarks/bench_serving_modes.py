@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import grpc
+
+sys.path.append('../protofiles')
+import ride_sharing_pb2
+import ride_sharing_pb2_grpc
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server')
+
+
+def client_credentials():
+    with open('../certificates/driver_client.crt', 'rb') as f:
+        client_cert = f.read()
+    with open('../certificates/driver_client.key', 'rb') as f:
+        private_key = f.read()
+    with open('../certificates/ca.crt', 'rb') as f:
+        ca_cert = f.read()
+    return grpc.ssl_channel_credentials(root_certificates=ca_cert, private_key=private_key, certificate_chain=client_cert)
+
+
+def start_server(mode, port, max_workers):
+    command = [sys.executable, 'ride_sharing_server.py', str(port), '--max-workers', str(max_workers)]
+    if mode == 'async':
+        command.append('--async')
+    return subprocess.Popen(command, cwd=SERVER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def hold_stream(stub, driver_id, ready, refused):
+    # An idle driver subscribed to offers, like every connected driver in production
+    call = stub.SubscribeRideOffers(ride_sharing_pb2.AssignedRideRequest(driver_id=driver_id))
+    ready.release()
+    try:
+        async for _ in call:
+            pass
+    except grpc.aio.AioRpcError as e:
+        if e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED:
+            refused.append(driver_id)  # The threaded server keeps some workers free of streams
+    except asyncio.CancelledError:
+        pass
+
+
+async def caller(stub, deadline, latencies, errors, rpc_timeout):
+    request = ride_sharing_pb2.RideStatusRequest(ride_id='missing')
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            await stub.GetRideStatus(request, timeout=rpc_timeout)
+            latencies.append(time.perf_counter() - started)
+        except grpc.aio.AioRpcError:
+            errors.append(1)
+
+
+async def measure(port, args):
+    channel = grpc.aio.secure_channel(f'localhost:{port}', client_credentials())
+    await channel.channel_ready()
+    stub = ride_sharing_pb2_grpc.RideSharingServiceStub(channel)
+
+    ready = asyncio.Semaphore(0)
+    refused = []
+    streams = [asyncio.create_task(hold_stream(stub, f'idle-{i}', ready, refused)) for i in range(args.streams)]
+    for _ in range(args.streams):
+        await ready.acquire()
+    await asyncio.sleep(0.5)
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(caller(stub, deadline, latencies, errors, args.rpc_timeout) for _ in range(args.concurrency)))
+
+    for task in streams:
+        task.cancel()
+    await asyncio.gather(*streams, return_exceptions=True)
+    await channel.close()
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else float('nan')
+    p50 = latencies[len(latencies) // 2] if latencies else float('nan')
+    return len(latencies) / args.duration, p50 * 1000, p99 * 1000, len(errors), len(refused)
+
+
+def wait_for_port(port, timeout=10):
+    channel = grpc.secure_channel(f'localhost:{port}', client_credentials())
+    grpc.channel_ready_future(channel).result(timeout=timeout)
+    channel.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the threaded and asyncio serving modes of the ride-sharing server.")
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--streams', type=int, default=200, help='Idle driver offer streams held open during the run')
+    parser.add_argument('--concurrency', type=int, default=50, help='Concurrent unary callers')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--max-workers', type=int, default=100, help='Thread pool size of the threaded server')
+    parser.add_argument('--rpc-timeout', type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'rpc/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'refused':>8}")
+    for mode in ('threaded', 'async'):
+        server = start_server(mode, args.port, args.max_workers)
+        try:
+            wait_for_port(args.port)
+            throughput, p50, p99, errors, refused = asyncio.run(measure(args.port, args))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{mode:>8} {throughput:>9.0f} {p50:>8.2f} {p99:>8.2f} {errors:>7} {refused:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.append('../protofiles')
+import ride_sharing_pb2
+
+sys.path.append('../server')
+from ride_sharing_server import RideSharingService
+from shard_table import ShardTable, WorkerShard, shard_for
+
+CENTER = (12.97, 77.59)  # Drivers, pickups and destinations are spread over a box around this point
+
+
+def random_location(rng, spread):
+    return f"{CENTER[0] + rng.uniform(-spread, spread):.6f},{CENTER[1] + rng.uniform(-spread, spread):.6f}"
+
+
+def run_worker(index, workers, table_name, args, start, results):
+    # One worker process of a sharded server, driven directly without gRPC so the
+    # measurement is the matching work itself
+    table = ShardTable(workers, name=table_name)
+    ports = [str(5050 + i) for i in range(workers)]
+    rng = random.Random(args.seed + index)
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = RideSharingService(accept_timeout=3600, shard=WorkerShard(index, ports, table))
+        driver_ids = [f'driver-{i}' for i in range(args.drivers) if shard_for(f'driver-{i}', workers) == index]
+        for driver_id in driver_ids:
+            service.register_driver(driver_id, tuple(map(float, random_location(rng, args.spread).split(','))))
+
+    start.wait()
+    rides = 0
+    deadline = time.perf_counter() + args.duration
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        while time.perf_counter() < deadline:
+            # One full ride: match, accept, complete (which frees the driver at the destination)
+            request = ride_sharing_pb2.RideRequest(rider_id=f'rider-{index}-{rides}', pickup_location=random_location(rng, args.spread),
+                                                   destination=random_location(rng, args.spread))
+            response = service.RequestRide(request, None)
+            if response.status == 'assigned':
+                service.AcceptRide(ride_sharing_pb2.AcceptRideRequest(driver_id=response.assigned_driver, ride_id=response.ride_id), None)
+                service.CompleteRide(ride_sharing_pb2.RideCompletionRequest(driver_id=response.assigned_driver, ride_id=response.ride_id), None)
+                rides += 1
+            output.seek(0)
+            output.truncate()
+    service.scheduler.stop()
+    table.close()
+    results.put(rides)
+
+
+def run(workers, args):
+    table = ShardTable(workers)
+    context = multiprocessing.get_context('spawn')
+    start = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=run_worker, args=(i, workers, table.name, args, start, results)) for i in range(workers)]
+    for process in processes:
+        process.start()
+    time.sleep(args.warmup)  # Let every worker import and register its drivers
+    start.set()
+    rides = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    table.close()
+    table.unlink()
+    return rides / args.duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure matching throughput of the sharded server as worker processes are added.")
+    parser.add_argument('--workers', type=int, nargs='+', help='Worker counts to compare (default: 1, 2, 4, ... up to the CPU count)')
+    parser.add_argument('--drivers', type=int, default=4000, help='Drivers split across all workers')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--warmup', type=float, default=3.0, help='Seconds given to workers to start before measuring')
+    parser.add_argument('--spread', type=float, default=0.1, help='Half-width of the service area in degrees')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if not args.workers:
+        cores = os.cpu_count() or 1
+        args.workers = [1]
+        while args.workers[-1] * 2 <= cores:
+            args.workers.append(args.workers[-1] * 2)
+
+    print(f"CPU cores: {os.cpu_count()}")
+    print(f"{'workers':>8} {'rides/s':>9} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        throughput = run(workers, args)
+        baseline = baseline or throughput
+        print(f"{workers:>8} {throughput:>9.0f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,339 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import shlex
+import subprocess
+import sys
+import time
+
+import grpc
+
+sys.path.append('../protofiles')
+import load_balancer_pb2
+import load_balancer_pb2_grpc
+import ride_sharing_pb2
+import ride_sharing_pb2_grpc
+
+sys.path.append('../helper')
+from channel_pool import ChannelPool
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server')
+LOAD_BALANCER = 'localhost:4000'
+CENTER = (12.97, 77.59)  # Drivers, pickups and destinations are spread over a box around this point
+SPREAD = 0.05
+TERMINAL = ('completed', 'cancelled', 'no_such_ride')
+POLL_INTERVAL = 2  # Seconds between polls of a client refused a stream by a threaded server
+# Figures compared with --baseline; lower is better for all but rides_per_second
+COMPARED = ('rides_per_second', 'assign_p50_ms', 'assign_p99_ms', 'accept_p50_ms', 'accept_p99_ms', 'rpcs_per_ride')
+
+
+def random_location(rng):
+    return f"{CENTER[0] + rng.uniform(-SPREAD, SPREAD):.6f},{CENTER[1] + rng.uniform(-SPREAD, SPREAD):.6f}"
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Simulation:
+    # The drivers and riders of one generator process, all on one asyncio loop. Each process
+    # shares one channel per target and role, so thousands of clients need few connections.
+    def __init__(self, index, args):
+        self.args = args
+        self.rng = random.Random(args.seed + index)
+        self.credentials = {role: ChannelPool(role).credentials() for role in ('driver_client', 'rider_client')}
+        self.channels = {}
+        self.rpcs = {}  # method -> calls made by this process
+        self.assign_times = []  # Seconds from a rider's first request to an assigned driver
+        self.accept_times = []  # Seconds from a rider's first request to the driver accepting
+        self.completed = 0
+        self.no_driver = 0  # Ride requests that found no driver on any server
+        self.rejections = 0
+        self.failed_registrations = 0  # Drivers that never got onto a server and took no part
+        self.measuring = False  # Set once the drivers are registered; only then are rides counted
+
+    def channel(self, role, target):
+        channel = self.channels.get((role, target))
+        if channel is None:
+            channel = self.channels[(role, target)] = grpc.aio.secure_channel(target, self.credentials[role])
+        return channel
+
+    def server(self, role, port):
+        return ride_sharing_pb2_grpc.RideSharingServiceStub(self.channel(role, f'localhost:{port}'))
+
+    def load_balancer(self, role):
+        return load_balancer_pb2_grpc.LoadBalancerServiceStub(self.channel(role, LOAD_BALANCER))
+
+    def count(self, method):
+        if self.measuring:
+            self.rpcs[method] = self.rpcs.get(method, 0) + 1
+
+    async def run_driver(self, driver_id, registered):
+        # registered is released once the driver is registered or has given up, so run() never waits on a failure
+        try:
+            self.count('GetServerPortForDriver')
+            port = (await self.load_balancer('driver_client').GetServerPortForDriver(
+                load_balancer_pb2.DriverRequest(driver_id=driver_id))).server_port
+            stub = self.server('driver_client', port)
+            request = ride_sharing_pb2.RegisterDriverRequest(driver_id=driver_id, location=random_location(self.rng))
+            self.count('RegisterDriver')
+            response = await stub.RegisterDriver(request)
+            if response.status == 'wrong_shard':
+                port = response.redirect_port
+                stub = self.server('driver_client', port)
+                self.count('RegisterDriver')
+                response = await stub.RegisterDriver(request)
+        except grpc.aio.AioRpcError:
+            self.failed_registrations += 1
+            return
+        finally:
+            registered.release()
+        if response.status != 'driver_registered':
+            self.failed_registrations += 1
+            return
+
+        try:
+            async for offer in self.offers(stub, driver_id):
+                if not offer.ride_id:
+                    continue  # Keepalive
+                if self.rng.random() >= self.args.accept_prob:
+                    self.count('RejectRide')
+                    self.rejections += self.measuring
+                    await stub.RejectRide(ride_sharing_pb2.RejectRideRequest(driver_id=driver_id, ride_id=offer.ride_id))
+                    continue
+                self.count('AcceptRide')
+                accepted = await stub.AcceptRide(ride_sharing_pb2.AcceptRideRequest(driver_id=driver_id, ride_id=offer.ride_id))
+                if accepted.status != 'ride_accepted':
+                    continue
+                await asyncio.sleep(self.rng.expovariate(1 / self.args.ride_time))
+                self.count('CompleteRide')
+                await stub.CompleteRide(ride_sharing_pb2.RideCompletionRequest(driver_id=driver_id, ride_id=offer.ride_id))
+        finally:
+            if self.args.no_start:
+                # Leave a cluster we did not start as we found it
+                await asyncio.shield(stub.UnregisterDriver(ride_sharing_pb2.UnregisterDriverRequest(driver_id=driver_id)))
+
+    async def offers(self, stub, driver_id):
+        # The driver's offer stream, or GetAssignedRide polls if the server has no room for it,
+        # as driver_client does
+        request = ride_sharing_pb2.AssignedRideRequest(driver_id=driver_id)
+        try:
+            self.count('SubscribeRideOffers')
+            async for offer in stub.SubscribeRideOffers(request):
+                yield offer
+            return
+        except grpc.aio.AioRpcError as e:
+            if e.code() != grpc.StatusCode.RESOURCE_EXHAUSTED:
+                raise
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            self.count('GetAssignedRide')
+            yield await stub.GetAssignedRide(request)
+
+    async def ride_updates(self, stub, ride_id):
+        # The ride's status stream, or GetRideStatus polls if the server has no room for it
+        request = ride_sharing_pb2.RideStatusRequest(ride_id=ride_id)
+        try:
+            self.count('WatchRide')
+            async for update in stub.WatchRide(request):
+                yield update
+            return
+        except grpc.aio.AioRpcError as e:
+            if e.code() != grpc.StatusCode.RESOURCE_EXHAUSTED:
+                raise
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            self.count('GetRideStatus')
+            yield await stub.GetRideStatus(request)
+
+    async def request_ride(self, rider_id):
+        # Walks the servers the load balancer ranks for this rider, like rider_client.request_ride
+        request = ride_sharing_pb2.RideRequest(rider_id=rider_id, pickup_location=random_location(self.rng),
+                                               destination=random_location(self.rng))
+        self.count('GetServerPortForRider')
+        ports = list((await self.load_balancer('rider_client').GetServerPortForRider(
+            load_balancer_pb2.RiderRequest(rider_id=rider_id))).server_ports)
+        tried = set()
+        while ports:
+            port = ports.pop(0)
+            if port in tried:
+                continue
+            tried.add(port)
+            stub = self.server('rider_client', port)
+            self.count('RequestRide')
+            response = await stub.RequestRide(request)
+            if response.status == 'assigned':
+                return stub, response
+            if response.redirect_port:
+                ports.insert(0, response.redirect_port)
+        return None, None
+
+    async def run_rider(self, rider_id):
+        while True:
+            await asyncio.sleep(self.rng.expovariate(1 / self.args.think_time))
+            started = time.monotonic()
+            stub, response = await self.request_ride(rider_id)
+            if response is None:
+                self.no_driver += self.measuring
+                continue
+            measured = self.measuring
+            if measured:
+                self.assign_times.append(time.monotonic() - started)
+            accepted = False
+            async for update in self.ride_updates(stub, response.ride_id):
+                if update.status == 'in_progress' and not accepted:
+                    accepted = True
+                    if measured:
+                        self.accept_times.append(time.monotonic() - started)
+                if update.status in TERMINAL:
+                    if update.status == 'completed' and self.measuring:
+                        self.completed += 1
+                    break
+
+    async def run(self, drivers, riders):
+        registered = asyncio.Semaphore(0)
+        tasks = [asyncio.create_task(self.run_driver(driver_id, registered)) for driver_id in drivers]
+        for _ in drivers:
+            await registered.acquire()
+        await asyncio.sleep(self.args.warmup)  # Let the load reports catch up with the new drivers
+        self.measuring = True
+        tasks += [asyncio.create_task(self.run_rider(rider_id)) for rider_id in riders]
+        await asyncio.sleep(self.args.duration)
+        self.measuring = False
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for channel in self.channels.values():
+            await channel.close()
+        return {
+            'assign_times': self.assign_times,
+            'accept_times': self.accept_times,
+            'completed': self.completed,
+            'no_driver': self.no_driver,
+            'rejections': self.rejections,
+            'failed_registrations': self.failed_registrations,
+            'rpcs': self.rpcs,
+        }
+
+
+def run_process(index, args, results):
+    drivers = [f'load-driver-{i}' for i in range(index, args.drivers, args.processes)]
+    riders = [f'load-rider-{i}' for i in range(index, args.riders, args.processes)]
+    results.put(asyncio.run(Simulation(index, args).run(drivers, riders)))
+
+
+def start_cluster(args, processes):
+    # The load balancer and args.servers servers on consecutive ports, as the README starts them.
+    # Each process is added to processes as it starts, so the caller can stop them if a later one fails.
+    ports = [str(args.base_port + i) for i in range(args.servers)]
+    output = subprocess.DEVNULL
+    processes.append(subprocess.Popen([sys.executable, 'load_balance.py', '--ports', *ports, *shlex.split(args.lb_args)],
+                                      cwd=SERVER_DIR, stdout=output, stderr=output))
+    for port in ports:
+        processes.append(subprocess.Popen([sys.executable, 'ride_sharing_server.py', port, *shlex.split(args.server_args)],
+                                          cwd=SERVER_DIR, stdout=output, stderr=output))
+    pool = ChannelPool('driver_client')
+    for target in [LOAD_BALANCER] + [f'localhost:{port}' for port in ports]:
+        grpc.channel_ready_future(pool.channel(target)).result(timeout=30)
+    pool.close()
+
+
+def summarize(results, args):
+    assign_times = [t for result in results for t in result['assign_times']]
+    accept_times = [t for result in results for t in result['accept_times']]
+    completed = sum(result['completed'] for result in results)
+    rpcs = {}
+    for result in results:
+        for method, calls in result['rpcs'].items():
+            rpcs[method] = rpcs.get(method, 0) + calls
+    return {
+        'servers': args.servers,
+        'drivers': args.drivers,
+        'riders': args.riders,
+        'duration': args.duration,
+        'completed_rides': completed,
+        'rides_per_second': completed / args.duration,
+        'assigned_rides': len(assign_times),
+        'no_driver_requests': sum(result['no_driver'] for result in results),
+        'rejections': sum(result['rejections'] for result in results),
+        'failed_registrations': sum(result['failed_registrations'] for result in results),
+        'assign_p50_ms': percentile(assign_times, 0.5) * 1000,
+        'assign_p99_ms': percentile(assign_times, 0.99) * 1000,
+        'accept_p50_ms': percentile(accept_times, 0.5) * 1000,
+        'accept_p99_ms': percentile(accept_times, 0.99) * 1000,
+        'rpcs_per_ride': sum(rpcs.values()) / completed if completed else float('nan'),
+        'rpcs': rpcs,
+    }
+
+
+def report(summary, baseline=None):
+    print(f"{summary['completed_rides']} rides completed in {summary['duration']:.0f} s by {summary['drivers']} drivers and "
+          f"{summary['riders']} riders on {summary['servers']} servers; {summary['assigned_rides']} assigned, "
+          f"{summary['no_driver_requests']} found no driver, {summary['rejections']} offers rejected")
+    if summary['failed_registrations']:
+        print(f"  {summary['failed_registrations']} of {summary['drivers']} drivers could not register")
+    for key in COMPARED:
+        line = f"  {key:<18} {summary[key]:>10.2f}"
+        if baseline and key in baseline and baseline[key]:
+            change = (summary[key] - baseline[key]) / baseline[key]
+            line += f"   baseline {baseline[key]:>10.2f} ({change:+.1%})"
+        print(line)
+    print("  RPCs by method:", ', '.join(f"{method} {calls}" for method, calls in sorted(summary['rpcs'].items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate drivers and riders against a local cluster and report ride throughput and latency.")
+    parser.add_argument('--servers', type=int, default=2, help='Servers to start next to the load balancer')
+    parser.add_argument('--base-port', type=int, default=5050)
+    parser.add_argument('--server-args', default='--async', help='Extra options for every ride_sharing_server.py')
+    parser.add_argument('--lb-args', default='--async', help='Extra options for load_balance.py')
+    parser.add_argument('--no-start', action='store_true', help='Use the load balancer and servers that are already running')
+    parser.add_argument('--drivers', type=int, default=200)
+    parser.add_argument('--riders', type=int, default=200)
+    parser.add_argument('--processes', type=int, default=2, help='Generator processes the drivers and riders are split over')
+    parser.add_argument('--accept-prob', type=float, default=0.9, help='Chance that a driver accepts an offer')
+    parser.add_argument('--ride-time', type=float, default=5.0, help='Mean seconds from accepting a ride to completing it')
+    parser.add_argument('--think-time', type=float, default=2.0, help='Mean seconds a rider waits before the next request')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Seconds between registering the drivers and the first rider')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of measured load')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON file from an earlier --output run to compare against')
+    args = parser.parse_args()
+
+    cluster = []
+    try:
+        if not args.no_start:
+            start_cluster(args, cluster)
+        context = multiprocessing.get_context('spawn')
+        results_queue = context.Queue()
+        processes = [context.Process(target=run_process, args=(i, args, results_queue)) for i in range(args.processes)]
+        for process in processes:
+            process.start()
+        results = [results_queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        for process in cluster:
+            process.terminate()
+            process.wait()
+
+    summary = summarize(results, args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(summary, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
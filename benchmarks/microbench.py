@@ -0,0 +1,170 @@
+import argparse
+import contextlib
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+
+sys.path.append('../protofiles')
+import ride_sharing_pb2
+
+sys.path.append('../server')
+from ride_sharing_server import RideSharingService
+from spatial_index import DEFAULT_CELL_SIZE
+
+CENTER = (12.97, 77.59)
+DRIVERS_PER_CELL = 10  # The area grows with the store so that density, not size, stays fixed
+RIDER = 'bench-rider'
+
+
+def build_service(size, rng):
+    # size available drivers and size rides in progress with their own busy drivers, written
+    # straight into the stores so that a million of each takes seconds rather than minutes
+    service = RideSharingService(accept_timeout=3600)
+    half_width = math.sqrt(size / DRIVERS_PER_CELL) * DEFAULT_CELL_SIZE / 2
+
+    def location():
+        return CENTER[0] + rng.uniform(-half_width, half_width), CENTER[1] + rng.uniform(-half_width, half_width)
+
+    for i in range(size):
+        service.drivers.register(f'driver-{i}', location())
+    for i in range(size):
+        driver_id = f'busy-driver-{i}'
+        service.drivers.register(driver_id, location())
+        service.drivers.mark_busy(driver_id)
+        service.rides[f'ride-{i}'] = {
+            'rider_id': f'rider-{i}',
+            'pickup_location': 'A',
+            'destination': 'B',
+            'pickup_point': None,
+            'assigned_driver': driver_id,
+            'status': 'in_progress',
+            'timeout': None,
+        }
+    return service, location
+
+
+def ride_request(location):
+    lat, lng = location()
+    return ride_sharing_pb2.RideRequest(rider_id=RIDER, pickup_location=f'{lat:.6f},{lng:.6f}', destination='B')
+
+
+def cancel(service, ride_id):
+    service.CancelRide(ride_sharing_pb2.CancelRideRequest(ride_id=ride_id, rider_id=RIDER), None)
+
+
+def cases(service, location):
+    # name -> (setup() -> state, operation(state) -> result, undo(state, result)); only the
+    # operation is timed, and undo returns the stores to the size they had before
+    def located_ride():
+        return service.create_ride(ride_request(location))
+
+    def text_ride():
+        return service.create_ride(ride_sharing_pb2.RideRequest(rider_id=RIDER, pickup_location='A', destination='B'))
+
+    def drop_ride(ride_id, _):
+        service.rides.pop(ride_id, None)
+
+    def offered_ride():
+        return service.RequestRide(ride_request(location), None)
+
+    def queued_ride():
+        with service.lock:
+            ride_id = located_ride()
+            service.queue_ride(ride_id)
+        return ride_id
+
+    service.drivers.register('offered-driver')
+    offer = service.create_ride(ride_sharing_pb2.RideRequest(rider_id=RIDER, pickup_location='A', destination='B'))
+    with service.lock:
+        service.offer_ride(offer, 'offered-driver')
+    polling = ride_sharing_pb2.AssignedRideRequest(driver_id='offered-driver')
+
+    return {
+        'get_available_driver_nearest': (located_ride, service.get_available_driver, drop_ride),
+        'get_available_driver_any': (text_ride, service.get_available_driver, drop_ride),
+        'GetAssignedRide': (lambda: polling, lambda request: service.GetAssignedRide(request, None), lambda *_: None),
+        'assign_ride': (queued_ride, lambda ride_id: service.assign_ride('driver-0'), lambda ride_id, _: cancel(service, ride_id)),
+        'RequestRide': (lambda: ride_request(location), lambda request: service.RequestRide(request, None),
+                        lambda _, response: cancel(service, response.ride_id)),
+        'RejectRide': (offered_ride,
+                       lambda response: service.RejectRide(ride_sharing_pb2.RejectRideRequest(
+                           driver_id=response.assigned_driver, ride_id=response.ride_id), None),
+                       lambda response, _: cancel(service, response.ride_id)),
+    }
+
+
+def measure(setup, operation, undo, calls):
+    timings = []
+    for _ in range(calls):
+        state = setup()
+        started = time.perf_counter_ns()
+        result = operation(state)
+        timings.append(time.perf_counter_ns() - started)
+        undo(state, result)
+    timings.sort()
+    return {
+        'mean_us': sum(timings) / len(timings) / 1000,
+        'p50_us': timings[len(timings) // 2] / 1000,
+        'p99_us': timings[min(int(len(timings) * 0.99), len(timings) - 1)] / 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the matching and lookup paths of RideSharingService as its stores grow.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000],
+                        help='Available drivers and rides in progress in the synthetic stores')
+    parser.add_argument('--calls', type=int, default=2000, help='Timed calls per case and size')
+    parser.add_argument('--cases', nargs='+', help='Only run these cases')
+    parser.add_argument('--output', default='microbench.json', help='JSON file the results are written to')
+    parser.add_argument('--max-growth', type=float,
+                        help='Exit with status 1 if a p50 at the largest size exceeds this multiple of the smallest size')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'case':<30} {'size':>9} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            service, location = build_service(size, rng)
+            selected = {name: case for name, case in cases(service, location).items() if not args.cases or name in args.cases}
+            measured = {name: measure(*case, args.calls) for name, case in selected.items()}
+        for name, timing in measured.items():
+            results.append(dict(case=name, size=size, calls=args.calls, **timing))
+            print(f"{name:<30} {size:>9} {timing['mean_us']:>9.2f} {timing['p50_us']:>9.2f} {timing['p99_us']:>9.2f}")
+        service.scheduler.stop()
+        del service
+        gc.collect()
+
+    growth = {}
+    for result in results:
+        first = next(r for r in results if r['case'] == result['case'])
+        growth[result['case']] = result['p50_us'] / first['p50_us'] if first['p50_us'] else float('nan')
+    print(f"\np50 growth from {args.sizes[0]} to {args.sizes[-1]}:")
+    for name, ratio in growth.items():
+        print(f"  {name:<30} {ratio:>6.2f}x")
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'results': results,
+            'growth': growth,
+        }, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.max_growth is not None:
+        exceeded = [name for name, ratio in growth.items() if ratio > args.max_growth]
+        if exceeded:
+            print(f"p50 grew more than {args.max_growth}x for: {', '.join(exceeded)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,9 @@
-import grpc
-import time
+import argparse
 import signal
 import sys
+import time
+
+import grpc
 
 
 sys.path.append('../protofiles')  # Add the protofiles directory to the path
@@ -12,51 +14,86 @@ import ride_sharing_pb2_grpc
 
 sys.path.append('../helper')  # Add the helper directory to the path
 from logging_interceptor import LoggingInterceptor  # Import the logging interceptor
+from channel_pool import get_pool
+from server_list import ServerListCache
+
+pool = get_pool('driver_client')  # Channels to the load balancer and the servers, opened once
+server_list = None  # ServerListCache once use_cached_routing() is called
+RECONNECT_INTERVAL = 1  # Seconds between attempts to reach a server that stopped answering
+POLL_INTERVAL = 2  # Seconds between GetAssignedRide calls when the server has no room for an offer stream
 
 
+def use_cached_routing():
+    # Pick the server with the fewest drivers from a server list fetched once per TTL
+    global server_list
+    stub = load_balancer_pb2_grpc.LoadBalancerServiceStub(pool.channel('localhost:4000'))
+    server_list = ServerListCache(lambda: stub.GetServerList(load_balancer_pb2.ServerListRequest()))
 
 def get_port_from_load_balancer(driver_id):
+    if server_list is not None:
+        return server_list.pick_for_driver()
     # Connect to the load balancer's port
-    channel = grpc.secure_channel('localhost:4000', get_credentials())
+    channel = pool.channel('localhost:4000')
     stub = load_balancer_pb2_grpc.LoadBalancerServiceStub(channel)
     response = stub.GetServerPortForDriver(load_balancer_pb2.DriverRequest(driver_id=driver_id))
     return response.server_port
 
-def get_credentials():
-    # Load SSL certificates for client
-    with open('../certificates/driver_client.crt', 'rb') as f:
-        client_cert = f.read()
-    with open('../certificates/driver_client.key', 'rb') as f:
-        private_key = f.read()
-    with open('../certificates/ca.crt', 'rb') as f:
-        ca_cert = f.read()
-
-    # Set up SSL credentials for the driver client
-    return grpc.ssl_channel_credentials(
-        root_certificates=ca_cert,
-        private_key=private_key,
-        certificate_chain=client_cert
-    )
-
-def handle_driver(driver_id):
+def connect(port, interceptor):
+    # The pooled channel's keepalive pings keep the offer stream open
+    return ride_sharing_pb2_grpc.RideSharingServiceStub(pool.channel(f'localhost:{port}', interceptor))
+
+def register(driver_id, port, location, interceptor):
+    # Returns the port and stub of the server the driver ended up registered on
+    stub = connect(port, interceptor)
+    register_response = stub.RegisterDriver(ride_sharing_pb2.RegisterDriverRequest(driver_id=driver_id, location=location))
+    if register_response.status == 'wrong_shard':
+        # A sharded server keeps each driver on one worker; move to that worker
+        print(f"[Driver {driver_id}] Redirected from port {port} to port {register_response.redirect_port}")
+        port = register_response.redirect_port
+        stub = connect(port, interceptor)
+        register_response = stub.RegisterDriver(ride_sharing_pb2.RegisterDriverRequest(driver_id=driver_id, location=location))
+    print(f"[Driver {driver_id}] Registration status: {register_response.status} on port {port}")
+    return port, stub
+
+def reconnect(driver_id, port, location, interceptor):
+    # The offer stream ended. If the server's standby took over, the driver's registration and
+    # any open offer are already there. While a standby is about to take over, or the server
+    # may come back, the same port is tried again; the server unregisters a driver whose stream
+    # drops, so the driver registers again once it answers (an open offer stays with the driver).
+    # Otherwise register where the load balancer says.
+    lb_stub = load_balancer_pb2_grpc.LoadBalancerServiceStub(pool.channel('localhost:4000'))
+    try:
+        response = lb_stub.GetServerPortForDriver(load_balancer_pb2.DriverRequest(driver_id=driver_id, previous_port=port))
+    except grpc.RpcError as e:
+        if e.code() != grpc.StatusCode.UNAVAILABLE:
+            raise
+        response = None  # The load balancer is down as well; keep trying the same server
+    if response is not None and response.failed_over:
+        print(f"[Driver {driver_id}] Server {port} was replaced by its standby on port {response.server_port}")
+        return response.server_port, connect(response.server_port, interceptor)
+    if response is None or response.server_port == port:
+        time.sleep(RECONNECT_INTERVAL)
+        try:
+            return register(driver_id, port, location, interceptor)
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.UNAVAILABLE:
+                raise
+            return port, connect(port, interceptor)
+    return register(driver_id, response.server_port, location, interceptor)
+
+def handle_driver(driver_id, location=''):
     port = get_port_from_load_balancer(driver_id)
     print(f"[Driver {driver_id}] Assigned server port: {port}")
     interceptor = LoggingInterceptor(client_role='driver')
-    
-    # Create a gRPC channel with the logging interceptor
-    channel = grpc.intercept_channel(grpc.secure_channel(f'localhost:{port}', get_credentials()), interceptor)
-    stub = ride_sharing_pb2_grpc.RideSharingServiceStub(channel)
- 
 
     # Register the driver
-    register_response = stub.RegisterDriver(ride_sharing_pb2.RegisterDriverRequest(driver_id=driver_id))
-    print(f"[Driver {driver_id}] Registration status: {register_response.status} on port {port}")
+    port, stub = register(driver_id, port, location, interceptor)
 
     def unregister_driver(signum, frame):
         # Unregister the driver before exiting
         unregister_response = stub.UnregisterDriver(ride_sharing_pb2.UnregisterDriverRequest(driver_id=driver_id))
         print(f"[Driver {driver_id}] Unregistration status: {unregister_response.status}")
-        lb_channel = grpc.secure_channel('localhost:4000', get_credentials())  # Load balancer's port
+        lb_channel = pool.channel('localhost:4000')  # Load balancer's port, already open from the start
         lb_stub = load_balancer_pb2_grpc.LoadBalancerServiceStub(lb_channel)
         lb_response = lb_stub.DriverExit(load_balancer_pb2.DriverExitRequest(driver_id=driver_id, port=port))
         print(f"[Driver {driver_id}] Load Balancer response on exit: {lb_response.status}")  # Capture and print response
@@ -65,36 +102,69 @@ def handle_driver(driver_id):
     # Register the signal handler for graceful exit
     signal.signal(signal.SIGINT, unregister_driver)
 
+    # Subscribe once; the server pushes each ride offered to this driver as soon as it is made
+    print(f"[Driver {driver_id}] Waiting for a ride to be assigned...")
+    polling = False
     while True:
-        print(f"[Driver {driver_id}] Waiting for a ride to be assigned...")
-
-        # Poll the server to check for available rides
-        time.sleep(2)  # Polling interval
+        try:
+            if polling:
+                poll_offers(driver_id, stub)
+            else:
+                handle_offers(driver_id, stub)
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED:
+                # A threaded server holds a worker thread per stream and refuses streams once they run short
+                print(f"[Driver {driver_id}] The server on port {port} has no room for another stream, polling instead")
+                polling = True
+                continue
+            if e.code() != grpc.StatusCode.UNAVAILABLE:
+                raise
+            print(f"[Driver {driver_id}] Lost the server on port {port}, reconnecting...")
+            port, stub = reconnect(driver_id, port, location, interceptor)
+            polling = False
+
+def handle_offers(driver_id, stub):
+    offers = stub.SubscribeRideOffers(ride_sharing_pb2.AssignedRideRequest(driver_id=driver_id))
+    for response in offers:
+        if response.ride_id:
+            handle_offer(driver_id, stub, response)
 
-        # Check if any rides have been assigned to this driver
+def poll_offers(driver_id, stub):
+    while True:
+        time.sleep(POLL_INTERVAL)
         response = stub.GetAssignedRide(ride_sharing_pb2.AssignedRideRequest(driver_id=driver_id))
         if response.ride_id:
-            print(f"[Driver {driver_id}] Ride assigned: {response.ride_id} from {response.pickup_location} to {response.destination}")
-            accept = input(f"[Driver {driver_id}] Do you accept this ride? (yes/no): ").strip().lower()
-
-            if accept == 'yes':
-                # Simulate accepting the ride
-                accept_response = stub.AcceptRide(ride_sharing_pb2.AcceptRideRequest(driver_id=driver_id, ride_id=response.ride_id))
-                print(f"[Driver {driver_id}] Ride acceptance status: {accept_response.status}")
-
-                if accept_response.status == 'ride_accepted':
-                    # Simulate ride completion after some time
-                    input(f"[Driver {driver_id}] Press Enter to mark the ride as completed...")  # Driver inputs when ride is completed
-                    complete_response = stub.CompleteRide(ride_sharing_pb2.RideCompletionRequest(driver_id=driver_id, ride_id=response.ride_id))
-                    print(f"[Driver {driver_id}] Ride completion status: {complete_response.status}")
-            else:
-                # Simulate rejecting the ride
-                reject_response = stub.RejectRide(ride_sharing_pb2.RejectRideRequest(driver_id=driver_id, ride_id=response.ride_id))
-                print(f"[Driver {driver_id}] Ride rejection status: {reject_response.status}")
-        else:
-            print(f"[Driver {driver_id}] No rides currently assigned.")
+            handle_offer(driver_id, stub, response)
+
+def handle_offer(driver_id, stub, response):
+    print(f"[Driver {driver_id}] Ride assigned: {response.ride_id} from {response.pickup_location} to {response.destination}")
+    accept = input(f"[Driver {driver_id}] Do you accept this ride? (yes/no): ").strip().lower()
+
+    if accept == 'yes':
+        # Simulate accepting the ride
+        accept_response = stub.AcceptRide(ride_sharing_pb2.AcceptRideRequest(driver_id=driver_id, ride_id=response.ride_id))
+        print(f"[Driver {driver_id}] Ride acceptance status: {accept_response.status}")
+
+        if accept_response.status == 'ride_accepted':
+            # Simulate ride completion after some time
+            input(f"[Driver {driver_id}] Press Enter to mark the ride as completed...")  # Driver inputs when ride is completed
+            complete_response = stub.CompleteRide(ride_sharing_pb2.RideCompletionRequest(driver_id=driver_id, ride_id=response.ride_id))
+            print(f"[Driver {driver_id}] Ride completion status: {complete_response.status}")
+    else:
+        # Simulate rejecting the ride
+        reject_response = stub.RejectRide(ride_sharing_pb2.RejectRideRequest(driver_id=driver_id, ride_id=response.ride_id))
+        print(f"[Driver {driver_id}] Ride rejection status: {reject_response.status}")
+    print(f"[Driver {driver_id}] Waiting for a ride to be assigned...")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a driver that takes ride offers.")
+    parser.add_argument('--cached-routing', action='store_true',
+                        help="Pick the server from the load balancer's cached server list")
+    args = parser.parse_args()
+    if args.cached_routing:
+        use_cached_routing()
+
     driver_id = input("Enter Driver ID: ")
+    location = input("Enter Current Location as lat,lng (optional): ").strip()
     # port = input("Enter server port (5001, 5002, or 5003): ")
-    handle_driver(driver_id)
+    handle_driver(driver_id, location)
@@ -1,5 +1,8 @@
+import argparse
+import functools
 import grpc
 import sys
+import threading
 import time
 
 # Add the necessary directories to the path
@@ -11,24 +14,26 @@ import ride_sharing_pb2_grpc
 
 sys.path.append('../helper')  # Add the helper directory to the path
 from logging_interceptor import LoggingInterceptor  # Import the logging interceptor
+from channel_pool import get_pool
+from server_list import ServerListCache
 
+pool = get_pool('rider_client')  # One channel per server, shared by every ride request in this process
+server_list = None  # ServerListCache once use_cached_routing() is called
+POLL_INTERVAL = 3  # Seconds between GetRideStatus calls when the server has no room for a WatchRide stream
+FINAL_STATUSES = ('completed', 'cancelled', 'no_such_ride')
+
+
+def use_cached_routing():
+    # Rank servers locally from a server list fetched once per TTL, instead of asking the
+    # load balancer for every ride
+    global server_list
+    stub = load_balancer_pb2_grpc.LoadBalancerServiceStub(pool.channel('localhost:4000'))
+    server_list = ServerListCache(lambda: stub.GetServerList(load_balancer_pb2.ServerListRequest()))
 
 def get_server_ports_from_load_balancer(rider_id):
-    
-    with open('../certificates/rider_client.crt', 'rb') as f:
-        client_cert = f.read()
-    with open('../certificates/rider_client.key', 'rb') as f:
-        private_key = f.read()
-    with open('../certificates/ca.crt', 'rb') as f:
-        ca_cert = f.read()
-
-    # Set up SSL credentials for the client
-    credentials = grpc.ssl_channel_credentials(
-        root_certificates=ca_cert,
-        private_key=private_key,
-        certificate_chain=client_cert
-    )
-    channel = grpc.secure_channel('localhost:4000', credentials)
+    if server_list is not None:
+        return server_list.rank_for_rider()
+    channel = pool.channel('localhost:4000')
     stub = load_balancer_pb2_grpc.LoadBalancerServiceStub(channel)
 
     request = load_balancer_pb2.RiderRequest(rider_id=rider_id)
@@ -36,52 +41,130 @@ def get_server_ports_from_load_balancer(rider_id):
     return response.server_ports
 
 
-def request_ride(rider_id, pickup_location, destination):
+def connect(port, interceptor=None):
+    return ride_sharing_pb2_grpc.RideSharingServiceStub(pool.channel(f'localhost:{port}', interceptor))
+
+def cancel_extra_ride(stub, port, rider_id, ride_id):
+    response = stub.CancelRide(ride_sharing_pb2.CancelRideRequest(ride_id=ride_id, rider_id=rider_id))
+    print(f"[Rider {rider_id}] Released extra ride {ride_id} on server {port}: {response.status}")
+
+def hedged_request(rider_id, ports, request, interceptor=None):
+    # Sends RequestRide to every port at once and keeps the first server that assigns a driver.
+    # Rides assigned by slower servers are cancelled so their drivers go back to the pool.
+    # Returns ((port, stub, response) of the winner or None, redirect ports from the others).
+    lock = threading.Lock()
+    finished = threading.Event()
+    state = {'winner': None, 'pending': len(ports), 'redirects': []}
+
+    def on_done(port, stub, future):
+        try:
+            response = future.result()
+        except grpc.RpcError as e:
+            print(f"[Rider {rider_id}] Server {port} failed: {e.code().name}")
+            response = None
+        extra = False
+        with lock:
+            state['pending'] -= 1
+            if response is not None and response.status == 'assigned':
+                if state['winner'] is None:
+                    state['winner'] = (port, stub, response)
+                else:
+                    extra = True
+            elif response is not None and response.redirect_port:
+                state['redirects'].append(response.redirect_port)
+            if state['winner'] is not None or state['pending'] == 0:
+                finished.set()
+        if extra:
+            # Not on the gRPC callback thread, which must not block on another call
+            threading.Thread(target=cancel_extra_ride, args=(stub, port, rider_id, response.ride_id)).start()
+
+    for port in ports:
+        stub = connect(port, interceptor)
+        stub.RequestRide.future(request).add_done_callback(functools.partial(on_done, port, stub))
+    finished.wait()
+    with lock:
+        return state['winner'], list(state['redirects'])
+
+def follow_ride(rider_id, stub, ride_id):
+    # Prints each status change of the ride and returns the final one
+    try:
+        for update in stub.WatchRide(ride_sharing_pb2.RideStatusRequest(ride_id=ride_id)):
+            print(f"[Rider {rider_id}] Current ride status: {update.status}")
+            if update.status in FINAL_STATUSES:
+                return update.status
+    except grpc.RpcError as e:
+        if e.code() != grpc.StatusCode.RESOURCE_EXHAUSTED:
+            raise
+        # A threaded server holds a worker thread per stream and refuses streams once they run short
+        print(f"[Rider {rider_id}] The server has no room for another stream, polling instead")
+    status = None
+    while status not in FINAL_STATUSES:
+        time.sleep(POLL_INTERVAL)
+        response = stub.GetRideStatus(ride_sharing_pb2.RideStatusRequest(ride_id=ride_id))
+        if response.status != status:
+            status = response.status
+            print(f"[Rider {rider_id}] Current ride status: {status}")
+    return status
+
+def request_ride(rider_id, pickup_location, destination, hedge=0):
     ports = get_server_ports_from_load_balancer(rider_id)
     print(ports)
     interceptor = LoggingInterceptor(client_role='rider')  # Create an instance of the interceptor
-    for port in ports :
-        
-        with open('../certificates/rider_client.crt', 'rb') as f:
-            client_cert = f.read()
-        with open('../certificates/rider_client.key', 'rb') as f:
-            private_key = f.read()
-        with open('../certificates/ca.crt', 'rb') as f:
-            ca_cert = f.read()
-
-        # Set up SSL credentials for the rider client
-        credentials = grpc.ssl_channel_credentials(
-            root_certificates=ca_cert,
-            private_key=private_key,
-            certificate_chain=client_cert
-        )
-
-        channel = grpc.intercept_channel(grpc.secure_channel(f'localhost:{port}', credentials), interceptor)
-        stub = ride_sharing_pb2_grpc.RideSharingServiceStub(channel)
-
-
-        print(f"[Rider {rider_id}] Requesting a ride from server on port {port}...")
-        request = ride_sharing_pb2.RideRequest(rider_id=rider_id, pickup_location=pickup_location, destination=destination)
-        response = stub.RequestRide(request)
+    request = ride_sharing_pb2.RideRequest(rider_id=rider_id, pickup_location=pickup_location, destination=destination)
+    ports = list(ports)
+    tried = set()
+    attempts = 0  # RequestRide calls made for this ride
+    while ports:
+        # The next untried server, or with hedge=k the next k untried servers at once
+        batch = []
+        while ports and len(batch) < max(hedge, 1):
+            port = ports.pop(0)
+            if port not in tried:
+                tried.add(port)
+                batch.append(port)
+        if not batch:
+            break
+        attempts += len(batch)
+
+        if len(batch) > 1:
+            print(f"[Rider {rider_id}] Requesting a ride from servers on ports {', '.join(batch)} at once...")
+            winner, redirects = hedged_request(rider_id, batch, request, interceptor)
+            if winner is None:
+                print(f"[Rider {rider_id}] No drivers available on servers {', '.join(batch)}, trying next servers...")
+                ports[:0] = redirects
+                continue
+            port, stub, response = winner
+        else:
+            port = batch[0]
+            stub = connect(port, interceptor)
+            print(f"[Rider {rider_id}] Requesting a ride from server on port {port}...")
+            response = stub.RequestRide(request)
         print(f"[Rider {rider_id}] Ride response: {response.status}, Ride ID: {response.ride_id}, Assigned Driver: {response.assigned_driver}")
-        # Polling for ride status
+        # Follow the ride; the server pushes each status change and ends the stream when the ride is over
         if response.status == 'assigned':
-            while True:
-                status_response = stub.GetRideStatus(ride_sharing_pb2.RideStatusRequest(ride_id=response.ride_id))
-                print(f"[Rider {rider_id}] Current ride status: {status_response.status}")
-                if status_response.status in ['completed', 'cancelled', 'rejected']:
-                    if status_response.status == 'completed' :
-                        return
-                    else : 
-                        break
-                time.sleep(3)  # Wait before polling again
+            print(f"[Rider {rider_id}] Driver found after {attempts} attempt(s).")
+            if follow_ride(rider_id, stub, response.ride_id) == 'completed':
+                return
+        elif response.redirect_port:
+            # A sharded server knows which of its workers has free drivers; try that one next
+            print(f"[Rider {rider_id}] No drivers available on server {port}, redirected to {response.redirect_port}...")
+            ports.insert(0, response.redirect_port)
         else:
             print(f"[Rider {rider_id}] No drivers available on server {port}, trying next server...")
 
-    print(f"[Rider {rider_id}] No drivers available on any server.")
+    print(f"[Rider {rider_id}] No drivers available on any server after {attempts} attempt(s).")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Request a ride as a rider.")
+    parser.add_argument('--hedge', type=int, default=0,
+                        help='Ask this many servers at once and keep the first driver found (default: one at a time)')
+    parser.add_argument('--cached-routing', action='store_true',
+                        help="Rank servers from the load balancer's cached server list instead of asking it per ride")
+    args = parser.parse_args()
+    if args.cached_routing:
+        use_cached_routing()
+
     rider_id = input("Enter Rider ID: ")
-    pickup_location = input("Enter Pickup Location: ")
-    destination = input("Enter Destination: ")
-    request_ride(rider_id, pickup_location, destination)
+    pickup_location = input("Enter Pickup Location (lat,lng for the nearest driver): ")
+    destination = input("Enter Destination (lat,lng): ")
+    request_ride(rider_id, pickup_location, destination, hedge=args.hedge)
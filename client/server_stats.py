@@ -0,0 +1,62 @@
+import argparse
+import sys
+
+sys.path.append('../protofiles')  # Add the protofiles directory to the path
+import load_balancer_pb2
+import load_balancer_pb2_grpc
+import ride_sharing_pb2
+import ride_sharing_pb2_grpc
+
+sys.path.append('../helper')
+from channel_pool import get_pool
+
+pool = get_pool('driver_client')  # Operators use the driver client certificate to reach the servers
+
+
+def print_methods(methods):
+    print(f"{'method':<28} {'calls':>8} {'errors':>7} {'rate/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'cpu s':>8}")
+    for method in methods:
+        print(f"{method.method.rsplit('/', 1)[-1]:<28} {method.calls:>8} {method.errors:>7} {method.rate:>8.1f} "
+              f"{method.p50_ms:>8.2f} {method.p99_ms:>8.2f} {method.cpu_seconds:>8.3f}")
+
+
+def show_server(port):
+    channel = pool.channel(f'localhost:{port}')
+    stats = ride_sharing_pb2_grpc.RideSharingServiceStub(channel).GetServerStats(ride_sharing_pb2.ServerStatsRequest())
+    print(f"[Server {port}] up {stats.uptime_seconds:.0f} s, {stats.requests_per_second:.1f} requests/s, {stats.threads} threads")
+    print(f"  rides: {stats.active_rides} active, {stats.archived_rides} archived, {stats.unassigned_rides} queued, "
+          f"{stats.rejected_rides} with rejections")
+    print(f"  drivers: {stats.available_drivers} available, {stats.busy_drivers} busy, {stats.pending_offers} pending offers")
+    print(f"  streams: {stats.offer_streams} offer, {stats.ride_watch_streams} ride watch; {stats.pending_timeouts} pending timeouts "
+          f"(fired {stats.timeout_avg_lateness_ms:.1f} ms late on average, {stats.timeout_max_lateness_ms:.1f} ms at most)")
+    if stats.standbys:
+        print(f"  replication: {stats.standbys} standby stream(s)")
+    print_methods(stats.methods)
+
+
+def show_load_balancer():
+    channel = pool.channel('localhost:4000')
+    stats = load_balancer_pb2_grpc.LoadBalancerServiceStub(channel).GetServerStats(load_balancer_pb2.LoadBalancerStatsRequest())
+    print(f"[Load Balancer] up {stats.uptime_seconds:.0f} s, {stats.requests_per_second:.1f} requests/s, {stats.threads} threads")
+    for load in stats.servers:
+        state = 'healthy' if load.healthy else 'UNHEALTHY'
+        reported = f"reported {load.seconds_since_report:.0f} s ago" if load.seconds_since_report >= 0 else 'never reported'
+        standby = ''
+        if load.standby_port:
+            lag = f"{load.replication_lag_seconds * 1000:.0f} ms behind" if load.replication_lag_seconds >= 0 else 'syncing'
+            standby = f"; standby {load.standby_port}, {lag}"
+        print(f"  server {load.port}: {state}, {reported}; {stats.drivers_per_port.get(load.port, 0)} drivers "
+              f"({load.available_drivers} available), {load.active_rides} active rides, {load.queued_rpcs} queued calls{standby}")
+    print_methods(stats.methods)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Print live statistics of ride-sharing servers and the load balancer.")
+    parser.add_argument('ports', nargs='*', help='Ride-sharing server ports, e.g., 5050 5051')
+    parser.add_argument('--load-balancer', action='store_true', help='Also query the load balancer on port 4000')
+    args = parser.parse_args()
+
+    for port in args.ports:
+        show_server(port)
+    if args.load_balancer or not args.ports:
+        show_load_balancer()
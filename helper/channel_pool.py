@@ -0,0 +1,72 @@
+# channel_pool.py
+
+import threading
+
+import grpc
+
+CERTIFICATE_DIR = '../certificates'
+# Pings keep an idle stream (a driver waiting for offers) from being dropped by NATs and proxies
+KEEPALIVE_OPTIONS = [
+    ('grpc.keepalive_time_ms', 30000),
+    ('grpc.keepalive_timeout_ms', 10000),
+]
+
+_pools = {}  # certificate name -> ChannelPool shared by every caller in the process
+_pools_lock = threading.Lock()
+
+
+def get_pool(certificate, **options):
+    with _pools_lock:
+        pool = _pools.get(certificate)
+        if pool is None:
+            pool = _pools[certificate] = ChannelPool(certificate, **options)
+        return pool
+
+
+class ChannelPool:
+    # One long-lived secure channel per target, all built from credentials that are read
+    # from disk once. gRPC channels are thread-safe and multiplex any number of calls, so
+    # every stub and thread talking to a target shares its channel and the TLS handshake
+    # happens once per target instead of once per call. certificate names the key pair in
+    # CERTIFICATE_DIR, e.g. 'rider_client' for rider_client.crt and rider_client.key.
+    def __init__(self, certificate, certificate_dir=CERTIFICATE_DIR, options=KEEPALIVE_OPTIONS):
+        self.certificate = certificate
+        self.certificate_dir = certificate_dir
+        self.options = list(options)
+        self._credentials = None
+        self._channels = {}  # target -> grpc.Channel
+        self._lock = threading.Lock()
+
+    def credentials(self):
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = self._load_credentials()
+            return self._credentials
+
+    def _load_credentials(self):
+        with open(f'{self.certificate_dir}/{self.certificate}.crt', 'rb') as f:
+            client_cert = f.read()
+        with open(f'{self.certificate_dir}/{self.certificate}.key', 'rb') as f:
+            private_key = f.read()
+        with open(f'{self.certificate_dir}/ca.crt', 'rb') as f:
+            ca_cert = f.read()
+        return grpc.ssl_channel_credentials(root_certificates=ca_cert, private_key=private_key, certificate_chain=client_cert)
+
+    def channel(self, target, interceptor=None):
+        # target is 'host:port'; an interceptor wraps the shared channel without opening another
+        channel = self._channels.get(target)
+        if channel is None:
+            credentials = self.credentials()
+            with self._lock:
+                channel = self._channels.get(target)
+                if channel is None:
+                    channel = self._channels[target] = grpc.secure_channel(target, credentials, options=self.options)
+        if interceptor is not None:
+            return grpc.intercept_channel(channel, interceptor)
+        return channel
+
+    def close(self):
+        with self._lock:
+            channels, self._channels = list(self._channels.values()), {}
+        for channel in channels:
+            channel.close()
@@ -0,0 +1,112 @@
+# log_writer.py
+
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+DEFAULT_CAPACITY = 8192  # Records held in memory before the oldest are overwritten
+DEFAULT_FLUSH_INTERVAL = 0.5  # Seconds between flushes of a quiet buffer
+DEFAULT_BATCH_SIZE = 512  # Buffered records that wake the writer early
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024  # Rotate the log file once it grows past this size
+DEFAULT_BACKUPS = 3  # Rotated files kept as log.txt.1 ... log.txt.3
+
+
+class LogWriter:
+    # Callers push (timestamp, format, args) records onto a bounded ring buffer and return
+    # at once; a background thread formats and writes them in batches. Formatting happens
+    # only in the writer, so a record that is overwritten before it is written costs nothing
+    # beyond the append. When the buffer is full the oldest record is dropped and counted.
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 batch_size=DEFAULT_BATCH_SIZE, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._buffer = deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()  # One batch is written at a time
+        self._start_lock = threading.Lock()
+        self._thread = None  # Started with the first record
+        self._running = True
+        self.submitted = 0
+        self.written = 0
+        self.rotations = 0
+
+    def submit(self, message_format, *args):
+        if self._thread is None:
+            self._start()
+        self._buffer.append((time.time(), message_format, args))  # deque.append is thread-safe
+        self.submitted += 1
+        if len(self._buffer) == self.batch_size:  # Wake the writer once as the threshold is crossed
+            self._wake.set()
+
+    def dropped(self):
+        # Every record is either written, still buffered, or was overwritten while buffered
+        return max(0, self.submitted - self.written - len(self._buffer))
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'written': self.written,
+            'pending': len(self._buffer),
+            'dropped': self.dropped(),
+            'rotations': self.rotations,
+        }
+
+    def flush(self):
+        with self._flush_lock:
+            lines = []
+            while True:
+                try:
+                    timestamp, message_format, args = self._buffer.popleft()
+                except IndexError:
+                    break
+                lines.append(f"[{datetime.fromtimestamp(timestamp).isoformat()}] {message_format.format(*args)}\n")
+            if not lines:
+                return
+            with open(self.path, 'a') as f:
+                f.writelines(lines)
+                size = f.tell()
+            self.written += len(lines)
+            if self.max_bytes and size >= self.max_bytes:
+                self._rotate()
+
+    def close(self):
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)  # Clients exit with sys.exit; write what is left
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[Logger] Failed to write {self.path}: {e}")
+
+    def _rotate(self):
+        # log.txt -> log.txt.1 -> log.txt.2 ...; the oldest backup is discarded
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
@@ -1,31 +1,54 @@
 # logging_interceptor.py
 
 import grpc
-from datetime import datetime
+import random
+
+from log_writer import LogWriter
+
+_writers = {}  # log file -> LogWriter shared by every interceptor writing to it
+
+def get_writer(log_file, **options):
+    writer = _writers.get(log_file)
+    if writer is None:
+        writer = _writers.setdefault(log_file, LogWriter(log_file, **options))
+    return writer
 
 class LoggingInterceptor(grpc.UnaryUnaryClientInterceptor,
                           grpc.UnaryStreamClientInterceptor,
                           grpc.StreamUnaryClientInterceptor,
                           grpc.StreamStreamClientInterceptor):
-    def __init__(self, client_role):
+    # Records are handed to a background LogWriter, so a call only pays for a buffer append.
+    # sample_rate < 1 logs that fraction of calls; a skipped call costs one random() draw.
+    def __init__(self, client_role, log_file='log.txt', sample_rate=1.0, **writer_options):
         self.client_role = client_role  # 'driver' or 'rider'
-        self.log_file = 'log.txt'  # Specify the log file
+        self.role = client_role.capitalize()
+        self.log_file = log_file  # Specify the log file
+        self.sample_rate = sample_rate
+        self.sampled_out = 0
+        self.writer = get_writer(log_file, **writer_options)
+
+    def sampled(self):
+        if self.sample_rate >= 1 or random.random() < self.sample_rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+    def stats(self):
+        return dict(self.writer.stats(), sampled_out=self.sampled_out)
 
     def log_request(self, method_name):
-        timestamp = datetime.now().isoformat()
-        log_entry = f"[{timestamp}] {self.client_role.capitalize()} calling method: {method_name}\n"
-        self.append_to_log(log_entry)
+        self.writer.submit("{} calling method: {}", self.role, method_name)
 
     def log_response(self, method_name, response):
-        timestamp = datetime.now().isoformat()
-        log_entry = f"[{timestamp}] {self.client_role.capitalize()} received response from method: {method_name} - Response: {response}\n"
-        self.append_to_log(log_entry)
+        # The response is only turned into text by the writer thread
+        self.writer.submit("{} received response from method: {} - Response: {}", self.role, method_name, response)
 
     def append_to_log(self, log_entry):
-        with open(self.log_file, 'a') as f:  # Open the log file in append mode
-            f.write(log_entry)
+        self.writer.submit("{}", log_entry.rstrip('\n'))
 
     def intercept_unary_unary(self, continuation, client_call_details, request):
+        if not self.sampled():
+            return continuation(client_call_details, request)
         method_name = client_call_details.method
         self.log_request(method_name)
         response = continuation(client_call_details, request)
@@ -33,6 +56,9 @@ class LoggingInterceptor(grpc.UnaryUnaryClientInterceptor,
         return response
 
     def intercept_unary_stream(self, continuation, client_call_details, request):
+        if not self.sampled():
+            yield from continuation(client_call_details, request)
+            return
         method_name = client_call_details.method
         self.log_request(method_name)
         response_iterator = continuation(client_call_details, request)
@@ -41,6 +67,8 @@ class LoggingInterceptor(grpc.UnaryUnaryClientInterceptor,
             yield response
 
     def intercept_stream_unary(self, continuation, client_call_details, request_iterator):
+        if not self.sampled():
+            return continuation(client_call_details, request_iterator)
         method_name = client_call_details.method
         self.log_request(method_name)
         response = continuation(client_call_details, request_iterator)
@@ -48,6 +76,9 @@ class LoggingInterceptor(grpc.UnaryUnaryClientInterceptor,
         return response
 
     def intercept_stream_stream(self, continuation, client_call_details, request_iterator):
+        if not self.sampled():
+            yield from continuation(client_call_details, request_iterator)
+            return
         method_name = client_call_details.method
         self.log_request(method_name)
         response_iterator = continuation(client_call_details, request_iterator)
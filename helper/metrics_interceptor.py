@@ -0,0 +1,285 @@
+# metrics_interceptor.py
+
+import itertools
+import threading
+import time
+from concurrent import futures
+
+import grpc
+
+# Latency buckets in microseconds, HDR style: exact below 16us, then 8 buckets per power of
+# two (about 12% relative precision). 200 buckets reach past 60 seconds.
+SUB_BUCKETS = 8
+BUCKET_COUNT = 200
+STRIPES = 16  # Independent counter sets; each thread sticks to one so locks are rarely contended
+
+
+def bucket_index(micros):
+    if micros < 2 * SUB_BUCKETS:
+        return max(micros, 0)
+    shift = micros.bit_length() - 4
+    return min(shift * SUB_BUCKETS + (micros >> shift), BUCKET_COUNT - 1)
+
+
+def bucket_lower_bound(index):
+    # Smallest latency in microseconds that falls into bucket index
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return (index - shift * SUB_BUCKETS) << shift
+
+
+class MethodStats:
+    __slots__ = ('calls', 'codes', 'buckets', 'total_seconds', 'cpu_seconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.codes = {}  # status code name -> count
+        self.buckets = [0] * BUCKET_COUNT
+        self.total_seconds = 0.0
+        self.cpu_seconds = 0.0  # Handler CPU time of unary calls
+
+    def merge(self, other):
+        self.calls += other.calls
+        for code, count in other.codes.items():
+            self.codes[code] = self.codes.get(code, 0) + count
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.total_seconds += other.total_seconds
+        self.cpu_seconds += other.cpu_seconds
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of calls, in milliseconds
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return bucket_lower_bound(index + 1) / 1000
+        return 0.0
+
+
+class ServerMetrics:
+    # Per-method call counts, status codes, latency histograms and CPU time, plus the number
+    # of unary calls in flight. Each recording thread is pinned to one of STRIPES counter sets
+    # with its own lock; snapshot() merges them.
+    def __init__(self, stripes=STRIPES):
+        self._stripes = [(threading.Lock(), {}) for _ in range(stripes)]
+        self._in_flight = [0] * stripes  # Per stripe; a call starts and ends on the same thread
+        self._queue_lock = threading.Lock()
+        self._queued = 0  # Calls waiting for a worker thread, counted by a CountingExecutor
+        self._next_stripe = itertools.count()
+        self._local = threading.local()
+        self.started = time.time()
+        self._rate_lock = threading.Lock()
+        self._rate_time = time.monotonic()  # When rates() was last called
+        self._rate_calls = {}  # method -> calls at that time
+
+    def _stripe(self):
+        index = getattr(self._local, 'stripe', None)
+        if index is None:
+            index = self._local.stripe = next(self._next_stripe) % len(self._stripes)
+        return index
+
+    def begin(self):
+        index = self._stripe()
+        with self._stripes[index][0]:
+            self._in_flight[index] += 1
+
+    def in_flight(self):
+        return sum(self._in_flight)
+
+    def queued(self):
+        return self._queued
+
+    def add_queued(self, delta):
+        with self._queue_lock:
+            self._queued += delta
+
+    def record(self, method, code, seconds, cpu_seconds=0.0, finished=False):
+        # finished=True also ends a call that was counted by begin()
+        index = self._stripe()
+        lock, methods = self._stripes[index]
+        with lock:
+            if finished:
+                self._in_flight[index] -= 1
+            stats = methods.get(method)
+            if stats is None:
+                stats = methods[method] = MethodStats()
+            stats.calls += 1
+            stats.codes[code] = stats.codes.get(code, 0) + 1
+            stats.buckets[bucket_index(int(seconds * 1e6))] += 1
+            stats.total_seconds += seconds
+            stats.cpu_seconds += cpu_seconds
+
+    def snapshot(self):
+        merged = {}
+        for lock, methods in self._stripes:
+            with lock:
+                for method, stats in methods.items():
+                    merged.setdefault(method, MethodStats()).merge(stats)
+        return merged
+
+    def uptime(self):
+        return time.time() - self.started
+
+    def rates(self):
+        # (snapshot, {method: calls per second since the previous rates() call or start})
+        snapshot = self.snapshot()
+        now = time.monotonic()
+        with self._rate_lock:
+            elapsed = max(now - self._rate_time, 1e-9)
+            previous = self._rate_calls
+            self._rate_time = now
+            self._rate_calls = {method: stats.calls for method, stats in snapshot.items()}
+        return snapshot, {method: (stats.calls - previous.get(method, 0)) / elapsed for method, stats in snapshot.items()}
+
+    def method_rows(self):
+        # One dict per method with the fields of the RpcMethodStats message, and the total call rate
+        snapshot, rates = self.rates()
+        rows = [{
+            'method': method,
+            'calls': stats.calls,
+            'errors': stats.calls - stats.codes.get('OK', 0),
+            'rate': rates[method],
+            'p50_ms': stats.percentile(0.5),
+            'p99_ms': stats.percentile(0.99),
+            'cpu_seconds': stats.cpu_seconds,
+        } for method, stats in sorted(snapshot.items())]
+        return rows, sum(rates.values())
+
+    def summary(self, limit=None):
+        # One line per method, busiest (by CPU, then wall time) first
+        rows = sorted(self.snapshot().items(), key=lambda item: (item[1].cpu_seconds, item[1].total_seconds), reverse=True)
+        lines = []
+        for method, stats in rows[:limit]:
+            errors = stats.calls - stats.codes.get('OK', 0)
+            lines.append(f"{method.rsplit('/', 1)[-1]}: {stats.calls} calls, {errors} errors, "
+                         f"p50 {stats.percentile(0.5):.2f} ms, p99 {stats.percentile(0.99):.2f} ms, cpu {stats.cpu_seconds:.3f} s")
+        return lines
+
+
+def _code_name(context, error=None):
+    code = context.code()
+    if code is None:
+        code = grpc.StatusCode.UNKNOWN if error is not None else grpc.StatusCode.OK
+    return code.name
+
+
+def _wrap(handler, unary, stream):
+    # Rebuilds a method handler around the wrapped behaviour, keeping its (de)serializers
+    if handler.unary_unary:
+        return grpc.unary_unary_rpc_method_handler(unary(handler.unary_unary), request_deserializer=handler.request_deserializer,
+                                                   response_serializer=handler.response_serializer)
+    if handler.unary_stream:
+        return grpc.unary_stream_rpc_method_handler(stream(handler.unary_stream), request_deserializer=handler.request_deserializer,
+                                                    response_serializer=handler.response_serializer)
+    if handler.stream_unary:
+        return grpc.stream_unary_rpc_method_handler(unary(handler.stream_unary), request_deserializer=handler.request_deserializer,
+                                                    response_serializer=handler.response_serializer)
+    return grpc.stream_stream_rpc_method_handler(stream(handler.stream_stream), request_deserializer=handler.request_deserializer,
+                                                 response_serializer=handler.response_serializer)
+
+
+class CountingExecutor(futures.ThreadPoolExecutor):
+    # Thread pool for a threaded grpc.server that counts in metrics the calls submitted but
+    # not yet picked up by a worker, which the interceptor cannot see
+    def __init__(self, metrics, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+
+    def submit(self, fn, /, *args, **kwargs):
+        metrics = self.metrics
+
+        def started():
+            metrics.add_queued(-1)
+            return fn(*args, **kwargs)
+        metrics.add_queued(1)
+        return super().submit(started)
+
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+    # Records every call of a threaded grpc.server into a ServerMetrics. A streaming call is
+    # timed from its start until the stream ends.
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+        method = handler_call_details.method
+        metrics = self.metrics
+
+        def unary(behavior):
+            def wrapper(request, context):
+                metrics.begin()
+                started, cpu_started = time.perf_counter(), time.thread_time()
+                error = None
+                try:
+                    return behavior(request, context)
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    metrics.record(method, _code_name(context, error), time.perf_counter() - started, time.thread_time() - cpu_started,
+                                   finished=True)
+            return wrapper
+
+        def stream(behavior):
+            def wrapper(request, context):
+                started = time.perf_counter()
+                error = None
+                try:
+                    yield from behavior(request, context)
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    metrics.record(method, _code_name(context, error), time.perf_counter() - started)
+            return wrapper
+
+        return _wrap(handler, unary, stream)
+
+
+class AsyncMetricsInterceptor(grpc.aio.ServerInterceptor):
+    # The same recording for grpc.aio servers, whose handlers are coroutines and async generators
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        method = handler_call_details.method
+        metrics = self.metrics
+
+        def unary(behavior):
+            async def wrapper(request, context):
+                metrics.begin()
+                started, cpu_started = time.perf_counter(), time.thread_time()
+                error = None
+                try:
+                    return await behavior(request, context)
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    metrics.record(method, _code_name(context, error), time.perf_counter() - started, time.thread_time() - cpu_started,
+                                   finished=True)
+            return wrapper
+
+        def stream(behavior):
+            async def wrapper(request, context):
+                started = time.perf_counter()
+                error = None
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    metrics.record(method, _code_name(context, error), time.perf_counter() - started)
+            return wrapper
+
+        return _wrap(handler, unary, stream)
@@ -0,0 +1,104 @@
+# prometheus_exporter.py
+
+import http.server
+import os
+import threading
+
+from metrics_interceptor import bucket_lower_bound
+
+DEFAULT_EXPORT_INTERVAL = 15  # Seconds between rewrites of the metrics file
+
+
+def format_prometheus(prefix, gauges, metrics):
+    # Prometheus text exposition of a dict of gauges plus the RPC counters and latency
+    # histograms of a ServerMetrics. A gauge given as {'port="5050"': 3, ...} becomes one
+    # labelled series per entry. Only non-empty histogram buckets are listed.
+    lines = []
+    for name, value in gauges.items():
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        if isinstance(value, dict):
+            lines.extend(f"{prefix}_{name}{{{labels}}} {series}" for labels, series in value.items())
+        else:
+            lines.append(f"{prefix}_{name} {value}")
+    lines.append(f"# TYPE {prefix}_uptime_seconds gauge")
+    lines.append(f"{prefix}_uptime_seconds {metrics.uptime():.3f}")
+
+    snapshot = sorted(metrics.snapshot().items())
+    lines.append(f"# TYPE {prefix}_rpc_calls_total counter")
+    for method, stats in snapshot:
+        for code, count in sorted(stats.codes.items()):
+            lines.append(f'{prefix}_rpc_calls_total{{method="{method}",code="{code}"}} {count}')
+    lines.append(f"# TYPE {prefix}_rpc_cpu_seconds_total counter")
+    for method, stats in snapshot:
+        lines.append(f'{prefix}_rpc_cpu_seconds_total{{method="{method}"}} {stats.cpu_seconds:.6f}')
+    lines.append(f"# TYPE {prefix}_rpc_latency_seconds histogram")
+    for method, stats in snapshot:
+        cumulative = 0
+        for index, count in enumerate(stats.buckets):
+            if count:
+                cumulative += count
+                upper = bucket_lower_bound(index + 1) / 1e6
+                lines.append(f'{prefix}_rpc_latency_seconds_bucket{{method="{method}",le="{upper:g}"}} {cumulative}')
+        lines.append(f'{prefix}_rpc_latency_seconds_bucket{{method="{method}",le="+Inf"}} {stats.calls}')
+        lines.append(f'{prefix}_rpc_latency_seconds_sum{{method="{method}"}} {stats.total_seconds:.6f}')
+        lines.append(f'{prefix}_rpc_latency_seconds_count{{method="{method}"}} {stats.calls}')
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusExporter:
+    # Publishes the text returned by collect() at http://host:port/metrics and/or by
+    # rewriting a file every interval (for node_exporter's textfile collector).
+    def __init__(self, collect, path=None, port=None, interval=DEFAULT_EXPORT_INTERVAL):
+        self.collect = collect
+        self.path = path
+        self.port = port
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._http = None
+
+    def start(self):
+        if self.path:
+            threading.Thread(target=self._write_loop, name='metrics-file', daemon=True).start()
+        if self.port:
+            collect = self.collect
+
+            class Handler(http.server.BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] not in ('/', '/metrics'):
+                        self.send_error(404)
+                        return
+                    body = collect().encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass  # Scrapes are too frequent to print
+
+            self._http = http.server.ThreadingHTTPServer(('', int(self.port)), Handler)
+            threading.Thread(target=self._http.serve_forever, name='metrics-http', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+
+    def write_file(self):
+        # Write to a temporary file first so a reader never sees a half-written dump
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w') as f:
+            f.write(self.collect())
+        os.replace(temporary, self.path)
+
+    def _write_loop(self):
+        while True:
+            try:
+                self.write_file()
+            except Exception as e:
+                print(f"[Metrics] Failed to write {self.path}: {e}")
+            if self._stopped.wait(self.interval):
+                return
@@ -0,0 +1,72 @@
+# server_list.py
+
+import random
+import threading
+import time
+
+DEFAULT_LIST_TTL = 5  # Seconds a client routes from a fetched server list before asking again
+RETRY_INTERVAL = 1  # Seconds before a failed refresh is tried again while the stale list is used
+
+
+def rank_power_of_two(ports, free):
+    # Power of two choices: of two random ports with free drivers, the one with more comes first,
+    # then every other port by free drivers. Sampling two instead of taking the maximum keeps
+    # riders from piling onto one server while the counts are stale.
+    candidates = [port for port in ports if free[port]] or ports
+    first = max(random.sample(candidates, min(2, len(candidates))), key=free.get)
+    return [first] + sorted((port for port in ports if port != first), key=free.get, reverse=True)
+
+
+class ServerListCache:
+    # Keeps the load balancer's server list (healthy ports with free and total driver counts)
+    # for the TTL the load balancer sends with it, and routes riders and drivers from it
+    # locally. fetch() returns a ServerList message. Between refreshes, every rider and driver
+    # routed here is counted against the cached figures, as the load balancer does itself.
+    def __init__(self, fetch, ttl=None):
+        self.fetch = fetch
+        self.ttl = ttl  # Overrides the load balancer's TTL when set
+        self.free = {}  # port -> free drivers
+        self.drivers = {}  # port -> drivers
+        self.expires = 0.0
+        self.refreshes = 0
+        self.lock = threading.Lock()
+
+    def _refresh(self):
+        # Called with self.lock held
+        if time.monotonic() < self.expires:
+            return
+        try:
+            server_list = self.fetch()
+        except Exception as e:
+            if not self.free:
+                raise
+            print(f"[Server List] Refresh failed, routing from the previous list: {e}")
+            self.expires = time.monotonic() + RETRY_INTERVAL
+            return
+        self.free = {server.port: server.free_drivers for server in server_list.servers}
+        self.drivers = {server.port: server.drivers for server in server_list.servers}
+        ttl = self.ttl if self.ttl is not None else server_list.ttl_seconds
+        self.expires = time.monotonic() + ttl
+        self.refreshes += 1
+
+    def ports(self):
+        with self.lock:
+            self._refresh()
+            return list(self.free)
+
+    def rank_for_rider(self):
+        with self.lock:
+            self._refresh()
+            ranked = rank_power_of_two(list(self.free), self.free)
+            if self.free[ranked[0]]:
+                self.free[ranked[0]] -= 1
+        return ranked
+
+    def pick_for_driver(self):
+        # The server with the fewest drivers
+        with self.lock:
+            self._refresh()
+            port = min(self.drivers, key=self.drivers.get)
+            self.drivers[port] += 1
+            self.free[port] += 1
+        return port
@@ -24,25 +24,47 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13load_balancer.proto\" \n\x0cRiderRequest\x12\x10\n\x08rider_id\x18\x01 \x01(\t\"\"\n\rDriverRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\"*\n\x12ServerListResponse\x12\x14\n\x0cserver_ports\x18\x01 \x03(\t\")\n\x12\x44riverPortResponse\x12\x13\n\x0bserver_port\x18\x01 \x01(\t\"4\n\x11\x44riverExitRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\x12\x0c\n\x04port\x18\x02 \x01(\t\"$\n\x12\x44riverExitResponse\x12\x0e\n\x06status\x18\x01 \x01(\t2\xc8\x01\n\x13LoadBalancerService\x12;\n\x15GetServerPortForRider\x12\r.RiderRequest\x1a\x13.ServerListResponse\x12=\n\x16GetServerPortForDriver\x12\x0e.DriverRequest\x1a\x13.DriverPortResponse\x12\x35\n\nDriverExit\x12\x12.DriverExitRequest\x1a\x13.DriverExitResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13load_balancer.proto\" \n\x0cRiderRequest\x12\x10\n\x08rider_id\x18\x01 \x01(\t\"9\n\rDriverRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\x12\x15\n\rprevious_port\x18\x02 \x01(\t\"*\n\x12ServerListResponse\x12\x14\n\x0cserver_ports\x18\x01 \x03(\t\">\n\x12\x44riverPortResponse\x12\x13\n\x0bserver_port\x18\x01 \x01(\t\x12\x13\n\x0b\x66\x61iled_over\x18\x02 \x01(\x08\"4\n\x11\x44riverExitRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\x12\x0c\n\x04port\x18\x02 \x01(\t\"$\n\x12\x44riverExitResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"\x1a\n\x18LoadBalancerStatsRequest\"\x82\x01\n\x0eRpcMethodStats\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\r\n\x05\x63\x61lls\x18\x02 \x01(\x04\x12\x0e\n\x06\x65rrors\x18\x03 \x01(\x04\x12\x0c\n\x04rate\x18\x04 \x01(\x01\x12\x0e\n\x06p50_ms\x18\x05 \x01(\x01\x12\x0e\n\x06p99_ms\x18\x06 \x01(\x01\x12\x13\n\x0b\x63pu_seconds\x18\x07 \x01(\x01\"\xa8\x02\n\x11LoadBalancerStats\x12\x14\n\x0cserver_ports\x18\x01 \x03(\t\x12@\n\x10\x64rivers_per_port\x18\x02 \x03(\x0b\x32&.LoadBalancerStats.DriversPerPortEntry\x12\x0f\n\x07threads\x18\x03 \x01(\x04\x12\x16\n\x0euptime_seconds\x18\x04 \x01(\x01\x12\x1b\n\x13requests_per_second\x18\x05 \x01(\x01\x12 \n\x07methods\x18\x06 \x03(\x0b\x32\x0f.RpcMethodStats\x12\x1c\n\x07servers\x18\x07 \x03(\x0b\x32\x0b.ServerLoad\x1a\x35\n\x13\x44riversPerPortEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\r:\x02\x38\x01\"\xac\x01\n\nLoadReport\x12\x0c\n\x04port\x18\x01 \x01(\t\x12\x19\n\x11\x61vailable_drivers\x18\x02 \x01(\r\x12\x14\n\x0c\x62usy_drivers\x18\x03 \x01(\r\x12\x14\n\x0c\x61\x63tive_rides\x18\x04 \x01(\r\x12\x13\n\x0bqueued_rpcs\x18\x05 \x01(\r\x12\x13\n\x0bstandby_for\x18\x06 \x01(\t\x12\x1f\n\x17replication_lag_seconds\x18\x07 \x01(\x01\"$\n\x12LoadReportResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"\xdc\x01\n\nServerLoad\x12\x0c\n\x04port\x18\x01 \x01(\t\x12\x0f\n\x07healthy\x18\x02 \x01(\x08\x12\x19\n\x11\x61vailable_drivers\x18\x03 \x01(\r\x12\x14\n\x0c\x62usy_drivers\x18\x04 \x01(\r\x12\x14\n\x0c\x61\x63tive_rides\x18\x05 \x01(\r\x12\x13\n\x0bqueued_rpcs\x18\x06 \x01(\r\x12\x1c\n\x14seconds_since_report\x18\x07 \x01(\x01\x12\x14\n\x0cstandby_port\x18\x08 \x01(\t\x12\x1f\n\x17replication_lag_seconds\x18\t \x01(\x01\"\x13\n\x11ServerListRequest\"A\n\nServerList\x12\x1e\n\x07servers\x18\x01 \x03(\x0b\x32\r.ServerWeight\x12\x13\n\x0bttl_seconds\x18\x02 \x01(\x01\"C\n\x0cServerWeight\x12\x0c\n\x04port\x18\x01 \x01(\t\x12\x14\n\x0c\x66ree_drivers\x18\x02 \x01(\r\x12\x0f\n\x07\x64rivers\x18\x03 \x01(\r2\xeb\x02\n\x13LoadBalancerService\x12;\n\x15GetServerPortForRider\x12\r.RiderRequest\x1a\x13.ServerListResponse\x12=\n\x16GetServerPortForDriver\x12\x0e.DriverRequest\x1a\x13.DriverPortResponse\x12\x35\n\nDriverExit\x12\x12.DriverExitRequest\x1a\x13.DriverExitResponse\x12?\n\x0eGetServerStats\x12\x19.LoadBalancerStatsRequest\x1a\x12.LoadBalancerStats\x12.\n\nReportLoad\x12\x0b.LoadReport\x1a\x13.LoadReportResponse\x12\x30\n\rGetServerList\x12\x12.ServerListRequest\x1a\x0b.ServerListb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'load_balancer_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_LOADBALANCERSTATS_DRIVERSPERPORTENTRY']._loaded_options = None
+  _globals['_LOADBALANCERSTATS_DRIVERSPERPORTENTRY']._serialized_options = b'8\001'
   _globals['_RIDERREQUEST']._serialized_start=23
   _globals['_RIDERREQUEST']._serialized_end=55
   _globals['_DRIVERREQUEST']._serialized_start=57
-  _globals['_DRIVERREQUEST']._serialized_end=91
-  _globals['_SERVERLISTRESPONSE']._serialized_start=93
-  _globals['_SERVERLISTRESPONSE']._serialized_end=135
-  _globals['_DRIVERPORTRESPONSE']._serialized_start=137
-  _globals['_DRIVERPORTRESPONSE']._serialized_end=178
-  _globals['_DRIVEREXITREQUEST']._serialized_start=180
-  _globals['_DRIVEREXITREQUEST']._serialized_end=232
-  _globals['_DRIVEREXITRESPONSE']._serialized_start=234
-  _globals['_DRIVEREXITRESPONSE']._serialized_end=270
-  _globals['_LOADBALANCERSERVICE']._serialized_start=273
-  _globals['_LOADBALANCERSERVICE']._serialized_end=473
+  _globals['_DRIVERREQUEST']._serialized_end=114
+  _globals['_SERVERLISTRESPONSE']._serialized_start=116
+  _globals['_SERVERLISTRESPONSE']._serialized_end=158
+  _globals['_DRIVERPORTRESPONSE']._serialized_start=160
+  _globals['_DRIVERPORTRESPONSE']._serialized_end=222
+  _globals['_DRIVEREXITREQUEST']._serialized_start=224
+  _globals['_DRIVEREXITREQUEST']._serialized_end=276
+  _globals['_DRIVEREXITRESPONSE']._serialized_start=278
+  _globals['_DRIVEREXITRESPONSE']._serialized_end=314
+  _globals['_LOADBALANCERSTATSREQUEST']._serialized_start=316
+  _globals['_LOADBALANCERSTATSREQUEST']._serialized_end=342
+  _globals['_RPCMETHODSTATS']._serialized_start=345
+  _globals['_RPCMETHODSTATS']._serialized_end=475
+  _globals['_LOADBALANCERSTATS']._serialized_start=478
+  _globals['_LOADBALANCERSTATS']._serialized_end=774
+  _globals['_LOADBALANCERSTATS_DRIVERSPERPORTENTRY']._serialized_start=721
+  _globals['_LOADBALANCERSTATS_DRIVERSPERPORTENTRY']._serialized_end=774
+  _globals['_LOADREPORT']._serialized_start=777
+  _globals['_LOADREPORT']._serialized_end=949
+  _globals['_LOADREPORTRESPONSE']._serialized_start=951
+  _globals['_LOADREPORTRESPONSE']._serialized_end=987
+  _globals['_SERVERLOAD']._serialized_start=990
+  _globals['_SERVERLOAD']._serialized_end=1210
+  _globals['_SERVERLISTREQUEST']._serialized_start=1212
+  _globals['_SERVERLISTREQUEST']._serialized_end=1231
+  _globals['_SERVERLIST']._serialized_start=1233
+  _globals['_SERVERLIST']._serialized_end=1298
+  _globals['_SERVERWEIGHT']._serialized_start=1300
+  _globals['_SERVERWEIGHT']._serialized_end=1367
+  _globals['_LOADBALANCERSERVICE']._serialized_start=1370
+  _globals['_LOADBALANCERSERVICE']._serialized_end=1733
 # @@protoc_insertion_point(module_scope)
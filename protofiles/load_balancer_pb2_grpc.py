@@ -49,6 +49,21 @@ class LoadBalancerServiceStub(object):
                 request_serializer=load__balancer__pb2.DriverExitRequest.SerializeToString,
                 response_deserializer=load__balancer__pb2.DriverExitResponse.FromString,
                 _registered_method=True)
+        self.GetServerStats = channel.unary_unary(
+                '/LoadBalancerService/GetServerStats',
+                request_serializer=load__balancer__pb2.LoadBalancerStatsRequest.SerializeToString,
+                response_deserializer=load__balancer__pb2.LoadBalancerStats.FromString,
+                _registered_method=True)
+        self.ReportLoad = channel.unary_unary(
+                '/LoadBalancerService/ReportLoad',
+                request_serializer=load__balancer__pb2.LoadReport.SerializeToString,
+                response_deserializer=load__balancer__pb2.LoadReportResponse.FromString,
+                _registered_method=True)
+        self.GetServerList = channel.unary_unary(
+                '/LoadBalancerService/GetServerList',
+                request_serializer=load__balancer__pb2.ServerListRequest.SerializeToString,
+                response_deserializer=load__balancer__pb2.ServerList.FromString,
+                _registered_method=True)
 
 
 class LoadBalancerServiceServicer(object):
@@ -72,6 +87,27 @@ class LoadBalancerServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetServerStats(self, request, context):
+        """Live routing state and RPC statistics
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReportLoad(self, request, context):
+        """Periodic heartbeat from each ride-sharing server
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetServerList(self, request, context):
+        """Routing table that clients cache and route from themselves
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_LoadBalancerServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -90,6 +126,21 @@ def add_LoadBalancerServiceServicer_to_server(servicer, server):
                     request_deserializer=load__balancer__pb2.DriverExitRequest.FromString,
                     response_serializer=load__balancer__pb2.DriverExitResponse.SerializeToString,
             ),
+            'GetServerStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetServerStats,
+                    request_deserializer=load__balancer__pb2.LoadBalancerStatsRequest.FromString,
+                    response_serializer=load__balancer__pb2.LoadBalancerStats.SerializeToString,
+            ),
+            'ReportLoad': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReportLoad,
+                    request_deserializer=load__balancer__pb2.LoadReport.FromString,
+                    response_serializer=load__balancer__pb2.LoadReportResponse.SerializeToString,
+            ),
+            'GetServerList': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetServerList,
+                    request_deserializer=load__balancer__pb2.ServerListRequest.FromString,
+                    response_serializer=load__balancer__pb2.ServerList.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'LoadBalancerService', rpc_method_handlers)
@@ -181,3 +232,84 @@ class LoadBalancerService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def GetServerStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/LoadBalancerService/GetServerStats',
+            load__balancer__pb2.LoadBalancerStatsRequest.SerializeToString,
+            load__balancer__pb2.LoadBalancerStats.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReportLoad(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/LoadBalancerService/ReportLoad',
+            load__balancer__pb2.LoadReport.SerializeToString,
+            load__balancer__pb2.LoadReportResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetServerList(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/LoadBalancerService/GetServerList',
+            load__balancer__pb2.ServerListRequest.SerializeToString,
+            load__balancer__pb2.ServerList.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
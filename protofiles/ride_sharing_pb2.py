@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x12ride_sharing.proto\x12\x0cride_sharing\",\n\x17UnregisterDriverRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\"*\n\x18UnregisterDriverResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"*\n\x15RegisterDriverRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\"M\n\x0bRideRequest\x12\x10\n\x08rider_id\x18\x01 \x01(\t\x12\x17\n\x0fpickup_location\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65stination\x18\x03 \x01(\t\"H\n\x0cRideResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07ride_id\x18\x02 \x01(\t\x12\x17\n\x0f\x61ssigned_driver\x18\x03 \x01(\t\"$\n\x11RideStatusRequest\x12\x0f\n\x07ride_id\x18\x01 \x01(\t\"$\n\x12RideStatusResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"7\n\x11\x41\x63\x63\x65ptRideRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\x12\x0f\n\x07ride_id\x18\x02 \x01(\t\"5\n\x12\x41\x63\x63\x65ptRideResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07ride_id\x18\x02 \x01(\t\"7\n\x11RejectRideRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\x12\x0f\n\x07ride_id\x18\x02 \x01(\t\"$\n\x12RejectRideResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\";\n\x15RideCompletionRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\x12\x0f\n\x07ride_id\x18\x02 \x01(\t\"(\n\x16RideCompletionResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"(\n\x13\x41ssignedRideRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\"T\n\x13\x41ssignedRideDetails\x12\x17\n\x0fpickup_location\x18\x01 \x01(\t\x12\x13\n\x0b\x64\x65stination\x18\x02 \x01(\t\x12\x0f\n\x07ride_id\x18\x03 \x01(\t\"&\n\x11\x41ssignRideRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\"%\n\x12\x41ssignRideResponse\x12\x0f\n\x07ride_id\x18\x01 \x01(\t2\x91\x06\n\x12RideSharingService\x12\x44\n\x0bRequestRide\x12\x19.ride_sharing.RideRequest\x1a\x1a.ride_sharing.RideResponse\x12R\n\rGetRideStatus\x12\x1f.ride_sharing.RideStatusRequest\x1a .ride_sharing.RideStatusResponse\x12O\n\nAcceptRide\x12\x1f.ride_sharing.AcceptRideRequest\x1a .ride_sharing.AcceptRideResponse\x12O\n\nRejectRide\x12\x1f.ride_sharing.RejectRideRequest\x1a .ride_sharing.RejectRideResponse\x12Y\n\x0c\x43ompleteRide\x12#.ride_sharing.RideCompletionRequest\x1a$.ride_sharing.RideCompletionResponse\x12W\n\x0fGetAssignedRide\x12!.ride_sharing.AssignedRideRequest\x1a!.ride_sharing.AssignedRideDetails\x12W\n\x0eRegisterDriver\x12#.ride_sharing.RegisterDriverRequest\x1a .ride_sharing.AcceptRideResponse\x12O\n\nAssignRide\x12\x1f.ride_sharing.AssignRideRequest\x1a .ride_sharing.AssignRideResponse\x12\x61\n\x10UnregisterDriver\x12%.ride_sharing.UnregisterDriverRequest\x1a&.ride_sharing.UnregisterDriverResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x12ride_sharing.proto\x12\x0cride_sharing\",\n\x17UnregisterDriverRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\"*\n\x18UnregisterDriverResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"<\n\x15RegisterDriverRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\x12\x10\n\x08location\x18\x02 \x01(\t\"B\n\x1bUpdateDriverLocationRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\x12\x10\n\x08location\x18\x02 \x01(\t\".\n\x1cUpdateDriverLocationResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"M\n\x0bRideRequest\x12\x10\n\x08rider_id\x18\x01 \x01(\t\x12\x17\n\x0fpickup_location\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65stination\x18\x03 \x01(\t\"_\n\x0cRideResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07ride_id\x18\x02 \x01(\t\x12\x17\n\x0f\x61ssigned_driver\x18\x03 \x01(\t\x12\x15\n\rredirect_port\x18\x04 \x01(\t\"6\n\x11\x43\x61ncelRideRequest\x12\x0f\n\x07ride_id\x18\x01 \x01(\t\x12\x10\n\x08rider_id\x18\x02 \x01(\t\"$\n\x12\x43\x61ncelRideResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"$\n\x11RideStatusRequest\x12\x0f\n\x07ride_id\x18\x01 \x01(\t\"$\n\x12RideStatusResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\";\n\x10RideStatusUpdate\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x17\n\x0f\x61ssigned_driver\x18\x02 \x01(\t\"7\n\x11\x41\x63\x63\x65ptRideRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\x12\x0f\n\x07ride_id\x18\x02 \x01(\t\"L\n\x12\x41\x63\x63\x65ptRideResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07ride_id\x18\x02 \x01(\t\x12\x15\n\rredirect_port\x18\x03 \x01(\t\"7\n\x11RejectRideRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\x12\x0f\n\x07ride_id\x18\x02 \x01(\t\"$\n\x12RejectRideResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\";\n\x15RideCompletionRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\x12\x0f\n\x07ride_id\x18\x02 \x01(\t\"(\n\x16RideCompletionResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"(\n\x13\x41ssignedRideRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\"T\n\x13\x41ssignedRideDetails\x12\x17\n\x0fpickup_location\x18\x01 \x01(\t\x12\x13\n\x0b\x64\x65stination\x18\x02 \x01(\t\x12\x0f\n\x07ride_id\x18\x03 \x01(\t\"&\n\x11\x41ssignRideRequest\x12\x11\n\tdriver_id\x18\x01 \x01(\t\"%\n\x12\x41ssignRideResponse\x12\x0f\n\x07ride_id\x18\x01 \x01(\t\"\x14\n\x12ServerStatsRequest\"\x82\x01\n\x0eRpcMethodStats\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\r\n\x05\x63\x61lls\x18\x02 \x01(\x04\x12\x0e\n\x06\x65rrors\x18\x03 \x01(\x04\x12\x0c\n\x04rate\x18\x04 \x01(\x01\x12\x0e\n\x06p50_ms\x18\x05 \x01(\x01\x12\x0e\n\x06p99_ms\x18\x06 \x01(\x01\x12\x13\n\x0b\x63pu_seconds\x18\x07 \x01(\x01\"\xed\x03\n\x0bServerStats\x12\x14\n\x0c\x61\x63tive_rides\x18\x01 \x01(\x04\x12\x16\n\x0e\x61rchived_rides\x18\x02 \x01(\x04\x12\x19\n\x11\x61vailable_drivers\x18\x03 \x01(\x04\x12\x14\n\x0c\x62usy_drivers\x18\x04 \x01(\x04\x12\x16\n\x0epending_offers\x18\x05 \x01(\x04\x12\x18\n\x10unassigned_rides\x18\x06 \x01(\x04\x12\x16\n\x0erejected_rides\x18\x07 \x01(\x04\x12\x18\n\x10pending_timeouts\x18\x08 \x01(\x04\x12\x15\n\roffer_streams\x18\t \x01(\x04\x12\x1a\n\x12ride_watch_streams\x18\n \x01(\x04\x12\x0f\n\x07threads\x18\x0b \x01(\x04\x12\x16\n\x0euptime_seconds\x18\x0c \x01(\x01\x12\x1b\n\x13requests_per_second\x18\r \x01(\x01\x12-\n\x07methods\x18\x0e \x03(\x0b\x32\x1c.ride_sharing.RpcMethodStats\x12\x10\n\x08standbys\x18\x0f \x01(\r\x12\x1f\n\x17replication_lag_seconds\x18\x10 \x01(\x01\x12\x1f\n\x17timeout_avg_lateness_ms\x18\x11 \x01(\x01\x12\x1f\n\x17timeout_max_lateness_ms\x18\x12 \x01(\x01\"N\n\x16RegisterDriversRequest\x12\x34\n\x07\x64rivers\x18\x01 \x03(\x0b\x32#.ride_sharing.RegisterDriverRequest\"L\n\x17RegisterDriversResponse\x12\x31\n\x07results\x18\x01 \x03(\x0b\x32 .ride_sharing.AcceptRideResponse\"8\n\x0cRideRequests\x12(\n\x05rides\x18\x01 \x03(\x0b\x32\x19.ride_sharing.RideRequest\":\n\rRideResponses\x12)\n\x05rides\x18\x01 \x03(\x0b\x32\x1a.ride_sharing.RideResponse\"\'\n\x13RideStatusesRequest\x12\x10\n\x08ride_ids\x18\x01 \x03(\t\"J\n\x14RideStatusesResponse\x12\x32\n\x08statuses\x18\x01 \x03(\x0b\x32 .ride_sharing.RideStatusResponse\"\'\n\x0fStateLogRequest\x12\x14\n\x0cstandby_port\x18\x01 \x01(\t\"h\n\rStateLogBatch\x12\x10\n\x08sequence\x18\x01 \x01(\x04\x12\x0f\n\x07records\x18\x02 \x01(\x0c\x12\r\n\x05reset\x18\x03 \x01(\x08\x12\x0f\n\x07partial\x18\x04 \x01(\x08\x12\x14\n\x0c\x63ommitted_at\x18\x05 \x01(\x01\x32\xa2\x0c\n\x12RideSharingService\x12\x44\n\x0bRequestRide\x12\x19.ride_sharing.RideRequest\x1a\x1a.ride_sharing.RideResponse\x12R\n\rGetRideStatus\x12\x1f.ride_sharing.RideStatusRequest\x1a .ride_sharing.RideStatusResponse\x12O\n\nAcceptRide\x12\x1f.ride_sharing.AcceptRideRequest\x1a .ride_sharing.AcceptRideResponse\x12O\n\nRejectRide\x12\x1f.ride_sharing.RejectRideRequest\x1a .ride_sharing.RejectRideResponse\x12Y\n\x0c\x43ompleteRide\x12#.ride_sharing.RideCompletionRequest\x1a$.ride_sharing.RideCompletionResponse\x12W\n\x0fGetAssignedRide\x12!.ride_sharing.AssignedRideRequest\x1a!.ride_sharing.AssignedRideDetails\x12W\n\x0eRegisterDriver\x12#.ride_sharing.RegisterDriverRequest\x1a .ride_sharing.AcceptRideResponse\x12O\n\nAssignRide\x12\x1f.ride_sharing.AssignRideRequest\x1a .ride_sharing.AssignRideResponse\x12\x61\n\x10UnregisterDriver\x12%.ride_sharing.UnregisterDriverRequest\x1a&.ride_sharing.UnregisterDriverResponse\x12]\n\x13SubscribeRideOffers\x12!.ride_sharing.AssignedRideRequest\x1a!.ride_sharing.AssignedRideDetails0\x01\x12N\n\tWatchRide\x12\x1f.ride_sharing.RideStatusRequest\x1a\x1e.ride_sharing.RideStatusUpdate0\x01\x12m\n\x14UpdateDriverLocation\x12).ride_sharing.UpdateDriverLocationRequest\x1a*.ride_sharing.UpdateDriverLocationResponse\x12O\n\nCancelRide\x12\x1f.ride_sharing.CancelRideRequest\x1a .ride_sharing.CancelRideResponse\x12M\n\x0eGetServerStats\x12 .ride_sharing.ServerStatsRequest\x1a\x19.ride_sharing.ServerStats\x12^\n\x0fRegisterDrivers\x12$.ride_sharing.RegisterDriversRequest\x1a%.ride_sharing.RegisterDriversResponse\x12G\n\x0cRequestRides\x12\x1a.ride_sharing.RideRequests\x1a\x1b.ride_sharing.RideResponses\x12X\n\x0fGetRideStatuses\x12!.ride_sharing.RideStatusesRequest\x1a\".ride_sharing.RideStatusesResponse\x12N\n\x0eStreamStateLog\x12\x1d.ride_sharing.StateLogRequest\x1a\x1b.ride_sharing.StateLogBatch0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -36,35 +36,67 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_UNREGISTERDRIVERRESPONSE']._serialized_start=82
   _globals['_UNREGISTERDRIVERRESPONSE']._serialized_end=124
   _globals['_REGISTERDRIVERREQUEST']._serialized_start=126
-  _globals['_REGISTERDRIVERREQUEST']._serialized_end=168
-  _globals['_RIDEREQUEST']._serialized_start=170
-  _globals['_RIDEREQUEST']._serialized_end=247
-  _globals['_RIDERESPONSE']._serialized_start=249
-  _globals['_RIDERESPONSE']._serialized_end=321
-  _globals['_RIDESTATUSREQUEST']._serialized_start=323
-  _globals['_RIDESTATUSREQUEST']._serialized_end=359
-  _globals['_RIDESTATUSRESPONSE']._serialized_start=361
-  _globals['_RIDESTATUSRESPONSE']._serialized_end=397
-  _globals['_ACCEPTRIDEREQUEST']._serialized_start=399
-  _globals['_ACCEPTRIDEREQUEST']._serialized_end=454
-  _globals['_ACCEPTRIDERESPONSE']._serialized_start=456
-  _globals['_ACCEPTRIDERESPONSE']._serialized_end=509
-  _globals['_REJECTRIDEREQUEST']._serialized_start=511
-  _globals['_REJECTRIDEREQUEST']._serialized_end=566
-  _globals['_REJECTRIDERESPONSE']._serialized_start=568
-  _globals['_REJECTRIDERESPONSE']._serialized_end=604
-  _globals['_RIDECOMPLETIONREQUEST']._serialized_start=606
-  _globals['_RIDECOMPLETIONREQUEST']._serialized_end=665
-  _globals['_RIDECOMPLETIONRESPONSE']._serialized_start=667
-  _globals['_RIDECOMPLETIONRESPONSE']._serialized_end=707
-  _globals['_ASSIGNEDRIDEREQUEST']._serialized_start=709
-  _globals['_ASSIGNEDRIDEREQUEST']._serialized_end=749
-  _globals['_ASSIGNEDRIDEDETAILS']._serialized_start=751
-  _globals['_ASSIGNEDRIDEDETAILS']._serialized_end=835
-  _globals['_ASSIGNRIDEREQUEST']._serialized_start=837
-  _globals['_ASSIGNRIDEREQUEST']._serialized_end=875
-  _globals['_ASSIGNRIDERESPONSE']._serialized_start=877
-  _globals['_ASSIGNRIDERESPONSE']._serialized_end=914
-  _globals['_RIDESHARINGSERVICE']._serialized_start=917
-  _globals['_RIDESHARINGSERVICE']._serialized_end=1702
+  _globals['_REGISTERDRIVERREQUEST']._serialized_end=186
+  _globals['_UPDATEDRIVERLOCATIONREQUEST']._serialized_start=188
+  _globals['_UPDATEDRIVERLOCATIONREQUEST']._serialized_end=254
+  _globals['_UPDATEDRIVERLOCATIONRESPONSE']._serialized_start=256
+  _globals['_UPDATEDRIVERLOCATIONRESPONSE']._serialized_end=302
+  _globals['_RIDEREQUEST']._serialized_start=304
+  _globals['_RIDEREQUEST']._serialized_end=381
+  _globals['_RIDERESPONSE']._serialized_start=383
+  _globals['_RIDERESPONSE']._serialized_end=478
+  _globals['_CANCELRIDEREQUEST']._serialized_start=480
+  _globals['_CANCELRIDEREQUEST']._serialized_end=534
+  _globals['_CANCELRIDERESPONSE']._serialized_start=536
+  _globals['_CANCELRIDERESPONSE']._serialized_end=572
+  _globals['_RIDESTATUSREQUEST']._serialized_start=574
+  _globals['_RIDESTATUSREQUEST']._serialized_end=610
+  _globals['_RIDESTATUSRESPONSE']._serialized_start=612
+  _globals['_RIDESTATUSRESPONSE']._serialized_end=648
+  _globals['_RIDESTATUSUPDATE']._serialized_start=650
+  _globals['_RIDESTATUSUPDATE']._serialized_end=709
+  _globals['_ACCEPTRIDEREQUEST']._serialized_start=711
+  _globals['_ACCEPTRIDEREQUEST']._serialized_end=766
+  _globals['_ACCEPTRIDERESPONSE']._serialized_start=768
+  _globals['_ACCEPTRIDERESPONSE']._serialized_end=844
+  _globals['_REJECTRIDEREQUEST']._serialized_start=846
+  _globals['_REJECTRIDEREQUEST']._serialized_end=901
+  _globals['_REJECTRIDERESPONSE']._serialized_start=903
+  _globals['_REJECTRIDERESPONSE']._serialized_end=939
+  _globals['_RIDECOMPLETIONREQUEST']._serialized_start=941
+  _globals['_RIDECOMPLETIONREQUEST']._serialized_end=1000
+  _globals['_RIDECOMPLETIONRESPONSE']._serialized_start=1002
+  _globals['_RIDECOMPLETIONRESPONSE']._serialized_end=1042
+  _globals['_ASSIGNEDRIDEREQUEST']._serialized_start=1044
+  _globals['_ASSIGNEDRIDEREQUEST']._serialized_end=1084
+  _globals['_ASSIGNEDRIDEDETAILS']._serialized_start=1086
+  _globals['_ASSIGNEDRIDEDETAILS']._serialized_end=1170
+  _globals['_ASSIGNRIDEREQUEST']._serialized_start=1172
+  _globals['_ASSIGNRIDEREQUEST']._serialized_end=1210
+  _globals['_ASSIGNRIDERESPONSE']._serialized_start=1212
+  _globals['_ASSIGNRIDERESPONSE']._serialized_end=1249
+  _globals['_SERVERSTATSREQUEST']._serialized_start=1251
+  _globals['_SERVERSTATSREQUEST']._serialized_end=1271
+  _globals['_RPCMETHODSTATS']._serialized_start=1274
+  _globals['_RPCMETHODSTATS']._serialized_end=1404
+  _globals['_SERVERSTATS']._serialized_start=1407
+  _globals['_SERVERSTATS']._serialized_end=1900
+  _globals['_REGISTERDRIVERSREQUEST']._serialized_start=1902
+  _globals['_REGISTERDRIVERSREQUEST']._serialized_end=1980
+  _globals['_REGISTERDRIVERSRESPONSE']._serialized_start=1982
+  _globals['_REGISTERDRIVERSRESPONSE']._serialized_end=2058
+  _globals['_RIDEREQUESTS']._serialized_start=2060
+  _globals['_RIDEREQUESTS']._serialized_end=2116
+  _globals['_RIDERESPONSES']._serialized_start=2118
+  _globals['_RIDERESPONSES']._serialized_end=2176
+  _globals['_RIDESTATUSESREQUEST']._serialized_start=2178
+  _globals['_RIDESTATUSESREQUEST']._serialized_end=2217
+  _globals['_RIDESTATUSESRESPONSE']._serialized_start=2219
+  _globals['_RIDESTATUSESRESPONSE']._serialized_end=2293
+  _globals['_STATELOGREQUEST']._serialized_start=2295
+  _globals['_STATELOGREQUEST']._serialized_end=2334
+  _globals['_STATELOGBATCH']._serialized_start=2336
+  _globals['_STATELOGBATCH']._serialized_end=2440
+  _globals['_RIDESHARINGSERVICE']._serialized_start=2443
+  _globals['_RIDESHARINGSERVICE']._serialized_end=4013
 # @@protoc_insertion_point(module_scope)
@@ -80,6 +80,51 @@ class RideSharingServiceStub(object):
                 request_serializer=ride__sharing__pb2.UnregisterDriverRequest.SerializeToString,
                 response_deserializer=ride__sharing__pb2.UnregisterDriverResponse.FromString,
                 _registered_method=True)
+        self.SubscribeRideOffers = channel.unary_stream(
+                '/ride_sharing.RideSharingService/SubscribeRideOffers',
+                request_serializer=ride__sharing__pb2.AssignedRideRequest.SerializeToString,
+                response_deserializer=ride__sharing__pb2.AssignedRideDetails.FromString,
+                _registered_method=True)
+        self.WatchRide = channel.unary_stream(
+                '/ride_sharing.RideSharingService/WatchRide',
+                request_serializer=ride__sharing__pb2.RideStatusRequest.SerializeToString,
+                response_deserializer=ride__sharing__pb2.RideStatusUpdate.FromString,
+                _registered_method=True)
+        self.UpdateDriverLocation = channel.unary_unary(
+                '/ride_sharing.RideSharingService/UpdateDriverLocation',
+                request_serializer=ride__sharing__pb2.UpdateDriverLocationRequest.SerializeToString,
+                response_deserializer=ride__sharing__pb2.UpdateDriverLocationResponse.FromString,
+                _registered_method=True)
+        self.CancelRide = channel.unary_unary(
+                '/ride_sharing.RideSharingService/CancelRide',
+                request_serializer=ride__sharing__pb2.CancelRideRequest.SerializeToString,
+                response_deserializer=ride__sharing__pb2.CancelRideResponse.FromString,
+                _registered_method=True)
+        self.GetServerStats = channel.unary_unary(
+                '/ride_sharing.RideSharingService/GetServerStats',
+                request_serializer=ride__sharing__pb2.ServerStatsRequest.SerializeToString,
+                response_deserializer=ride__sharing__pb2.ServerStats.FromString,
+                _registered_method=True)
+        self.RegisterDrivers = channel.unary_unary(
+                '/ride_sharing.RideSharingService/RegisterDrivers',
+                request_serializer=ride__sharing__pb2.RegisterDriversRequest.SerializeToString,
+                response_deserializer=ride__sharing__pb2.RegisterDriversResponse.FromString,
+                _registered_method=True)
+        self.RequestRides = channel.unary_unary(
+                '/ride_sharing.RideSharingService/RequestRides',
+                request_serializer=ride__sharing__pb2.RideRequests.SerializeToString,
+                response_deserializer=ride__sharing__pb2.RideResponses.FromString,
+                _registered_method=True)
+        self.GetRideStatuses = channel.unary_unary(
+                '/ride_sharing.RideSharingService/GetRideStatuses',
+                request_serializer=ride__sharing__pb2.RideStatusesRequest.SerializeToString,
+                response_deserializer=ride__sharing__pb2.RideStatusesResponse.FromString,
+                _registered_method=True)
+        self.StreamStateLog = channel.unary_stream(
+                '/ride_sharing.RideSharingService/StreamStateLog',
+                request_serializer=ride__sharing__pb2.StateLogRequest.SerializeToString,
+                response_deserializer=ride__sharing__pb2.StateLogBatch.FromString,
+                _registered_method=True)
 
 
 class RideSharingServiceServicer(object):
@@ -140,6 +185,67 @@ class RideSharingServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SubscribeRideOffers(self, request, context):
+        """Pushes each ride offered to the driver; an empty ride_id is a keepalive
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def WatchRide(self, request, context):
+        """Pushes each status transition of a ride; the stream ends on "completed" or "cancelled"
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def UpdateDriverLocation(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CancelRide(self, request, context):
+        """Called by the rider to withdraw a ride that has not started, e.g. the extra rides of a hedged request
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetServerStats(self, request, context):
+        """Live gauges of the server's stores and per-method RPC statistics
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def RegisterDrivers(self, request, context):
+        """Batch variants for fleet onboarding and simulators: one call, one pass over the server's
+        indexes, and one result per item in request order
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def RequestRides(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetRideStatuses(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamStateLog(self, request, context):
+        """Called by a standby: the server's state as a snapshot, then every batch of changes it commits
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_RideSharingServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -188,6 +294,51 @@ def add_RideSharingServiceServicer_to_server(servicer, server):
                     request_deserializer=ride__sharing__pb2.UnregisterDriverRequest.FromString,
                     response_serializer=ride__sharing__pb2.UnregisterDriverResponse.SerializeToString,
             ),
+            'SubscribeRideOffers': grpc.unary_stream_rpc_method_handler(
+                    servicer.SubscribeRideOffers,
+                    request_deserializer=ride__sharing__pb2.AssignedRideRequest.FromString,
+                    response_serializer=ride__sharing__pb2.AssignedRideDetails.SerializeToString,
+            ),
+            'WatchRide': grpc.unary_stream_rpc_method_handler(
+                    servicer.WatchRide,
+                    request_deserializer=ride__sharing__pb2.RideStatusRequest.FromString,
+                    response_serializer=ride__sharing__pb2.RideStatusUpdate.SerializeToString,
+            ),
+            'UpdateDriverLocation': grpc.unary_unary_rpc_method_handler(
+                    servicer.UpdateDriverLocation,
+                    request_deserializer=ride__sharing__pb2.UpdateDriverLocationRequest.FromString,
+                    response_serializer=ride__sharing__pb2.UpdateDriverLocationResponse.SerializeToString,
+            ),
+            'CancelRide': grpc.unary_unary_rpc_method_handler(
+                    servicer.CancelRide,
+                    request_deserializer=ride__sharing__pb2.CancelRideRequest.FromString,
+                    response_serializer=ride__sharing__pb2.CancelRideResponse.SerializeToString,
+            ),
+            'GetServerStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetServerStats,
+                    request_deserializer=ride__sharing__pb2.ServerStatsRequest.FromString,
+                    response_serializer=ride__sharing__pb2.ServerStats.SerializeToString,
+            ),
+            'RegisterDrivers': grpc.unary_unary_rpc_method_handler(
+                    servicer.RegisterDrivers,
+                    request_deserializer=ride__sharing__pb2.RegisterDriversRequest.FromString,
+                    response_serializer=ride__sharing__pb2.RegisterDriversResponse.SerializeToString,
+            ),
+            'RequestRides': grpc.unary_unary_rpc_method_handler(
+                    servicer.RequestRides,
+                    request_deserializer=ride__sharing__pb2.RideRequests.FromString,
+                    response_serializer=ride__sharing__pb2.RideResponses.SerializeToString,
+            ),
+            'GetRideStatuses': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetRideStatuses,
+                    request_deserializer=ride__sharing__pb2.RideStatusesRequest.FromString,
+                    response_serializer=ride__sharing__pb2.RideStatusesResponse.SerializeToString,
+            ),
+            'StreamStateLog': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamStateLog,
+                    request_deserializer=ride__sharing__pb2.StateLogRequest.FromString,
+                    response_serializer=ride__sharing__pb2.StateLogBatch.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'ride_sharing.RideSharingService', rpc_method_handlers)
@@ -442,3 +593,246 @@ class RideSharingService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def SubscribeRideOffers(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/ride_sharing.RideSharingService/SubscribeRideOffers',
+            ride__sharing__pb2.AssignedRideRequest.SerializeToString,
+            ride__sharing__pb2.AssignedRideDetails.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def WatchRide(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/ride_sharing.RideSharingService/WatchRide',
+            ride__sharing__pb2.RideStatusRequest.SerializeToString,
+            ride__sharing__pb2.RideStatusUpdate.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def UpdateDriverLocation(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ride_sharing.RideSharingService/UpdateDriverLocation',
+            ride__sharing__pb2.UpdateDriverLocationRequest.SerializeToString,
+            ride__sharing__pb2.UpdateDriverLocationResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def CancelRide(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ride_sharing.RideSharingService/CancelRide',
+            ride__sharing__pb2.CancelRideRequest.SerializeToString,
+            ride__sharing__pb2.CancelRideResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetServerStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ride_sharing.RideSharingService/GetServerStats',
+            ride__sharing__pb2.ServerStatsRequest.SerializeToString,
+            ride__sharing__pb2.ServerStats.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def RegisterDrivers(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ride_sharing.RideSharingService/RegisterDrivers',
+            ride__sharing__pb2.RegisterDriversRequest.SerializeToString,
+            ride__sharing__pb2.RegisterDriversResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def RequestRides(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ride_sharing.RideSharingService/RequestRides',
+            ride__sharing__pb2.RideRequests.SerializeToString,
+            ride__sharing__pb2.RideResponses.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetRideStatuses(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ride_sharing.RideSharingService/GetRideStatuses',
+            ride__sharing__pb2.RideStatusesRequest.SerializeToString,
+            ride__sharing__pb2.RideStatusesResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamStateLog(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/ride_sharing.RideSharingService/StreamStateLog',
+            ride__sharing__pb2.StateLogRequest.SerializeToString,
+            ride__sharing__pb2.StateLogBatch.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,107 @@
+# batch_dispatcher.py
+
+import threading
+import numpy as np
+
+DEFAULT_BATCH_WINDOW = 0.2  # Seconds of ride requests collected into one dispatch round
+
+
+def solve_assignment(cost):
+    # Minimum-cost assignment on a rectangular cost matrix (Hungarian method with
+    # shortest augmenting paths). Returns (row, col) pairs; every row is matched when
+    # rows <= cols, otherwise every column is. The inner column scan is vectorized.
+    # An infinite cost means the pair is not allowed, and such pairs are left out.
+    cost = np.asarray(cost, dtype=float)
+    allowed = np.isfinite(cost)
+    if not allowed.all():
+        # Costlier than every allowed pair together, so the fewest forbidden pairs are used
+        forbidden = np.abs(cost[allowed]).sum() + 1
+        cost = np.where(allowed, cost, forbidden)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        return []
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)  # p[j] = 1-based row matched to column j, 0 if free
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    pairs = [(int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j]]
+    if transposed:
+        pairs = [(col, row) for row, col in pairs]
+    return sorted((row, col) for row, col in pairs if allowed[row, col])
+
+
+class BatchDispatcher:
+    # Collects ride ids for one window, then hands the whole batch to dispatch(ride_ids),
+    # which returns {ride_id: driver_id or None}. Each submitter gets its result through
+    # the on_done(ride_id, driver_id) callback it passed in.
+    def __init__(self, dispatch, window=DEFAULT_BATCH_WINDOW):
+        self.window = window
+        self._dispatch = dispatch
+        self._cond = threading.Condition()
+        self._pending = []
+        self._running = True
+        self.batches = 0
+        self.dispatched = 0
+        self._thread = threading.Thread(target=self._run, name='batch-dispatcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, ride_id, on_done):
+        with self._cond:
+            self._pending.append((ride_id, on_done))
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+            # The window opens with the first request and closes after self.window seconds
+            with self._cond:
+                self._cond.wait_for(lambda: not self._running, timeout=self.window)
+                batch, self._pending = self._pending, []
+            try:
+                results = self._dispatch([ride_id for ride_id, _ in batch])
+            except Exception as e:
+                print(f"[Server] Batch dispatch failed: {e}")
+                results = {}
+            self.batches += 1
+            self.dispatched += len(batch)
+            for ride_id, on_done in batch:
+                on_done(ride_id, results.get(ride_id))
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The server modules import the generated protobuf code and the helpers relative to the
+# server directory; make those imports work wherever pytest is started from
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ('server', 'protofiles', 'helper'):
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,138 @@
+# driver_registry.py
+
+import random
+
+from spatial_index import GridIndex
+
+
+class DriverRegistry:
+    # Available drivers are kept in a list plus a driver -> position map, so a driver is
+    # removed by swapping it with the last entry and a random pick is a single index.
+    # Busy drivers live in a plain set. Every transition below is O(1).
+    # Drivers that reported a location are also kept in a grid index while they are available.
+    # on_available_change(count), if given, is called whenever the available count changes,
+    # and on_change(driver_id) whenever a driver's status or location changes.
+    def __init__(self, on_available_change=None, on_change=None):
+        self._available = []
+        self._position = {}
+        self._busy = set()
+        self._locations = {}  # driver_id -> (lat, lng), kept while the driver is registered
+        self._grid = GridIndex()  # Available drivers with a known location
+        self._on_available_change = on_available_change
+        self._on_change = on_change
+
+    def __contains__(self, driver_id):
+        return driver_id in self._position or driver_id in self._busy
+
+    def __len__(self):
+        return len(self._available) + len(self._busy)
+
+    def status(self, driver_id):
+        if driver_id in self._position:
+            return 'available'
+        if driver_id in self._busy:
+            return 'busy'
+        return None
+
+    def available_count(self):
+        return len(self._available)
+
+    def busy_count(self):
+        return len(self._busy)
+
+    def register(self, driver_id, location=None):
+        # Registering again resets the driver to available, as before
+        self._busy.discard(driver_id)
+        self._add_available(driver_id)
+        if location is not None:
+            self.set_location(driver_id, location)
+        self._changed(driver_id)
+
+    def unregister(self, driver_id):
+        self._locations.pop(driver_id, None)
+        if self._remove_available(driver_id):
+            self._changed(driver_id)
+            return True
+        if driver_id in self._busy:
+            self._busy.remove(driver_id)
+            self._changed(driver_id)
+            return True
+        return False
+
+    def location(self, driver_id):
+        return self._locations.get(driver_id)
+
+    def set_location(self, driver_id, location):
+        if driver_id not in self:
+            return False
+        self._locations[driver_id] = location
+        if driver_id in self._position:
+            self._grid.insert(driver_id, *location)
+        self._changed(driver_id)
+        return True
+
+    def mark_busy(self, driver_id):
+        if self._remove_available(driver_id):
+            self._busy.add(driver_id)
+            self._changed(driver_id)
+            return True
+        return driver_id in self._busy
+
+    def mark_available(self, driver_id):
+        if driver_id in self._busy:
+            self._busy.remove(driver_id)
+            self._add_available(driver_id)
+            self._changed(driver_id)
+            return True
+        return driver_id in self._position
+
+    def pick_random(self, exclude=()):
+        count = len(self._available)
+        if count == 0:
+            return None
+        if not exclude:
+            return self._available[random.randrange(count)]
+
+        # Exclusions are usually a handful of drivers, so a few random draws almost always hit
+        for _ in range(8):
+            driver_id = self._available[random.randrange(count)]
+            if driver_id not in exclude:
+                return driver_id
+
+        # Most of the pool is excluded, which means the pool is about as small as the exclusions
+        candidates = [driver_id for driver_id in self._available if driver_id not in exclude]
+        return random.choice(candidates) if candidates else None
+
+    def located_count(self):
+        return len(self._grid)
+
+    def nearest(self, location, k=1, exclude=()):
+        # Up to k (driver_id, distance_km) pairs among available drivers with a known location
+        return self._grid.nearest(location[0], location[1], k, exclude)
+
+    def _changed(self, driver_id):
+        if self._on_change is not None:
+            self._on_change(driver_id)
+
+    def _add_available(self, driver_id):
+        if driver_id not in self._position:
+            self._position[driver_id] = len(self._available)
+            self._available.append(driver_id)
+            location = self._locations.get(driver_id)
+            if location is not None:
+                self._grid.insert(driver_id, *location)
+            if self._on_available_change is not None:
+                self._on_available_change(len(self._available))
+
+    def _remove_available(self, driver_id):
+        index = self._position.pop(driver_id, None)
+        if index is None:
+            return False
+        self._grid.remove(driver_id)
+        last = self._available.pop()
+        if last != driver_id:
+            self._available[index] = last
+            self._position[last] = index
+        if self._on_available_change is not None:
+            self._on_available_change(len(self._available))
+        return True
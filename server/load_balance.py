@@ -1,5 +1,6 @@
 import grpc
 from concurrent import futures
+import asyncio
 import time
 import argparse
 import threading
@@ -10,33 +11,83 @@ import load_balancer_pb2
 import load_balancer_pb2_grpc
 
 sys.path.append('../helper')  # Add the helper directory to the path
-from logging_interceptor import LoggingInterceptor  # Import the logging interceptor
+from metrics_interceptor import ServerMetrics, MetricsInterceptor, AsyncMetricsInterceptor
+from prometheus_exporter import PrometheusExporter, format_prometheus
+from server_list import DEFAULT_LIST_TTL, rank_power_of_two
 
 
+DEFAULT_HEARTBEAT_TIMEOUT = 15  # Seconds without a load report before a server is marked unhealthy
+RIDER_ROUTING = ('p2c', 'round-robin')  # Power-of-two-choices on free drivers, or plain rotation
+
 # Global variables
 round_robin_index = 0
-driver_count = {}  # Keeps track of driver counts per server
+driver_count = {}  # Keeps track of driver counts per server; reset from each server's load report
 
 class LoadBalancer(load_balancer_pb2_grpc.LoadBalancerServiceServicer):
-    def __init__(self, server_ports):
+    def __init__(self, server_ports, metrics=None, heartbeat_timeout=DEFAULT_HEARTBEAT_TIMEOUT, rider_routing='p2c',
+                 list_ttl=DEFAULT_LIST_TTL):
         self.server_ports = server_ports
+        self.metrics = metrics  # Per-method RPC statistics, filled in by the MetricsInterceptor
+        self.heartbeat_timeout = heartbeat_timeout
+        self.list_ttl = list_ttl  # Seconds clients may cache the GetServerList answer
+        self.loads = {}  # port -> (time.monotonic() of the last report, LoadReport)
+        self.unhealthy = set()  # Ports whose heartbeats stopped
+        self.standbys = {}  # primary port -> (time.monotonic() of the last report, LoadReport) of its standby
+        self.failed_over = {}  # primary port -> port of the standby that replaced it
+        self.rider_routing = rider_routing
+        self.riders_sent = {port: 0 for port in server_ports}  # Riders sent to each server since its last report
         self.lock = threading.Lock()
         # Initialize driver count for each server port
         for port in server_ports:
             driver_count[port] = 0
 
+    def healthy_ports(self):
+        # Called with self.lock held. A server that has not reported yet is assumed healthy;
+        # if every server is down, all of them are returned rather than none
+        now = time.monotonic()
+        healthy = []
+        for port in self.server_ports:
+            load = self.loads.get(port)
+            if load is not None and now - load[0] > self.heartbeat_timeout:
+                if port not in self.unhealthy:
+                    self.unhealthy.add(port)
+                    print(f"[Load Balancer] No load report from server {port} for {now - load[0]:.0f}s, marking it unhealthy")
+            else:
+                healthy.append(port)
+        return healthy or list(self.server_ports)
+
     def get_next_server_ports(self):
         global round_robin_index
         with self.lock:
             # Start from the current round-robin index and create the port list in circular order
             ordered_servers = self.server_ports[round_robin_index:] + self.server_ports[:round_robin_index]
             round_robin_index = (round_robin_index + 1) % len(self.server_ports)  # Update round-robin index
+            healthy = set(self.healthy_ports())
+            # Skip servers that are down, and try servers that reported no free drivers last
+            ordered_servers = [port for port in ordered_servers if port in healthy]
+            ordered_servers.sort(key=lambda port: port in self.loads and self.loads[port][1].available_drivers == 0)
         return ordered_servers
 
+    def free_drivers(self, port):
+        # Called with self.lock held. Free drivers the server last reported, less the riders
+        # sent there since; before its first report, the drivers we sent it
+        load = self.loads.get(port)
+        if load is None:
+            return max(driver_count[port] - self.riders_sent[port], 0)
+        return max(load[1].available_drivers - self.riders_sent[port], 0)
+
+    def rank_servers_for_rider(self):
+        # Healthy servers by free drivers, the first chosen by power of two choices
+        with self.lock:
+            healthy = self.healthy_ports()
+            ranked = rank_power_of_two(healthy, {port: self.free_drivers(port) for port in healthy})
+            self.riders_sent[ranked[0]] += 1
+        return ranked
+
     def get_least_loaded_server(self):
         with self.lock:
-            # Find the server port with the fewest drivers
-            return min(driver_count, key=driver_count.get)
+            # Find the healthy server port with the fewest drivers
+            return min(self.healthy_ports(), key=driver_count.get)
 
     def assign_driver_to_port(self, port):
         with self.lock:
@@ -44,32 +95,180 @@ class LoadBalancer(load_balancer_pb2_grpc.LoadBalancerServiceServicer):
 
     def remove_driver_from_port(self, port):
         with self.lock:
-            if driver_count[port] > 0:
+            # A driver registered before a failover still names the primary's port
+            port = self.failed_over.get(port, port)
+            if driver_count.get(port, 0) > 0:
                 driver_count[port] -= 1
 
     def GetServerPortForRider(self, request, context):
-        server_ports = self.get_next_server_ports()
+        if self.rider_routing == 'p2c':
+            server_ports = self.rank_servers_for_rider()
+        else:
+            server_ports = self.get_next_server_ports()
         print(f"[Load Balancer] Assigned server ports {server_ports} to rider {request.rider_id}")
         return load_balancer_pb2.ServerListResponse(server_ports=server_ports)
 
     def GetServerPortForDriver(self, request, context):
+        if request.previous_port:
+            response = self.reconnect_driver(request.previous_port)
+            if response is not None:
+                print(f"[Load Balancer] Driver {request.driver_id} lost port {request.previous_port}, sent to port {response.server_port}")
+                return response
         # Get the server with the least number of drivers
         port = self.get_least_loaded_server()
         self.assign_driver_to_port(port)
         print(f"[Load Balancer] Assigned server port {port} to driver {request.driver_id}")
         return load_balancer_pb2.DriverPortResponse(server_port=port)
     
+    def reconnect_driver(self, previous_port):
+        # A driver whose server stopped answering keeps its registration if a standby took over
+        # that server, or is about to; returns None if it has to register somewhere new
+        with self.lock:
+            if previous_port in self.failed_over:
+                return load_balancer_pb2.DriverPortResponse(server_port=self.failed_over[previous_port], failed_over=True)
+            if self.live_standby(previous_port) is not None:
+                return load_balancer_pb2.DriverPortResponse(server_port=previous_port)  # Wait for the failover
+        return None
+
+    def live_standby(self, port):
+        # Called with self.lock held: the last report of the standby of port, unless it stopped reporting
+        reported, report = self.standbys.get(port, (None, None))
+        if reported is None or time.monotonic() - reported > self.heartbeat_timeout:
+            return None
+        return report
+
     def DriverExit(self, request, context):
         # Handle the driver exit notification
         print(f"[Load Balancer] Driver {request.driver_id} exiting from port {request.port}")
         self.remove_driver_from_port(request.port)
         return load_balancer_pb2.DriverExitResponse(status="Driver unregistered successfully.")
 
-def serve(server_ports):
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    interceptor = LoggingInterceptor(client_role='load_balancer')
-    # server = grpc.intercept_server(server, interceptor)
+    def ReportLoad(self, request, context):
+        if request.standby_for:
+            return self.standby_report(request)
+        if request.port not in driver_count:
+            return load_balancer_pb2.LoadReportResponse(status='unknown_server')
+        with self.lock:
+            self.loads[request.port] = (time.monotonic(), request)
+            # The server's own count replaces ours, so drivers that vanished without DriverExit are dropped
+            driver_count[request.port] = request.available_drivers + request.busy_drivers
+            self.riders_sent[request.port] = 0  # Already reflected in available_drivers
+            if request.port in self.unhealthy:
+                self.unhealthy.remove(request.port)
+                print(f"[Load Balancer] Server {request.port} is reporting again, marking it healthy")
+        return load_balancer_pb2.LoadReportResponse(status='ok')
 
+    def standby_report(self, request):
+        # A standby reports for the primary it replicates. Once the primary's heartbeats have
+        # stopped, the standby takes the primary's place in every routing decision and is told
+        # to promote itself; a primary that comes back later is no longer routed to.
+        primary = request.standby_for
+        with self.lock:
+            if self.failed_over.get(primary) == request.port:
+                return load_balancer_pb2.LoadReportResponse(status='promote')  # The first answer was lost
+            if primary not in driver_count:
+                return load_balancer_pb2.LoadReportResponse(status='unknown_server')
+            now = time.monotonic()
+            self.standbys[primary] = (now, request)
+            load = self.loads.get(primary)
+            if load is None or now - load[0] <= self.heartbeat_timeout or request.replication_lag_seconds < 0:
+                return load_balancer_pb2.LoadReportResponse(status='standby')
+
+            self.server_ports[self.server_ports.index(primary)] = request.port
+            driver_count[request.port] = driver_count.pop(primary)
+            self.riders_sent[request.port] = self.riders_sent.pop(primary)
+            del self.loads[primary]
+            del self.standbys[primary]
+            self.unhealthy.discard(primary)
+            self.failed_over[primary] = request.port
+        print(f"[Load Balancer] No load report from server {primary} for {now - load[0]:.0f}s, "
+              f"failing over to its standby on port {request.port} ({request.replication_lag_seconds * 1000:.0f} ms behind)")
+        return load_balancer_pb2.LoadReportResponse(status='promote')
+
+    def GetServerList(self, request, context):
+        # Clients that route themselves fetch this once per TTL instead of calling per session
+        with self.lock:
+            servers = [load_balancer_pb2.ServerWeight(port=port, free_drivers=self.free_drivers(port), drivers=driver_count[port])
+                       for port in self.healthy_ports()]
+        return load_balancer_pb2.ServerList(servers=servers, ttl_seconds=self.list_ttl)
+
+    def server_loads(self):
+        with self.lock:
+            self.healthy_ports()  # Notice servers whose heartbeats stopped
+            now = time.monotonic()
+            loads = []
+            for port in self.server_ports:
+                reported, report = self.loads.get(port, (None, load_balancer_pb2.LoadReport()))
+                standby = self.live_standby(port)
+                loads.append(load_balancer_pb2.ServerLoad(
+                    port=port,
+                    healthy=port not in self.unhealthy,
+                    available_drivers=report.available_drivers,
+                    busy_drivers=report.busy_drivers,
+                    active_rides=report.active_rides,
+                    queued_rpcs=report.queued_rpcs,
+                    seconds_since_report=now - reported if reported is not None else -1.0,
+                    standby_port=standby.port if standby else '',
+                    replication_lag_seconds=standby.replication_lag_seconds if standby else -1.0,
+                ))
+        return loads
+
+    def GetServerStats(self, request, context):
+        rows, rate = self.metrics.method_rows() if self.metrics is not None else ([], 0.0)
+        servers = self.server_loads()
+        with self.lock:
+            drivers_per_port = dict(driver_count)
+        return load_balancer_pb2.LoadBalancerStats(
+            server_ports=self.server_ports,
+            drivers_per_port=drivers_per_port,
+            threads=threading.active_count(),
+            uptime_seconds=self.metrics.uptime() if self.metrics is not None else 0.0,
+            requests_per_second=rate,
+            methods=[load_balancer_pb2.RpcMethodStats(**row) for row in rows],
+            servers=servers,
+        )
+
+    def prometheus_text(self):
+        servers = self.server_loads()
+        with self.lock:
+            drivers = {f'port="{port}"': count for port, count in driver_count.items()}
+        gauges = {
+            'servers': len(self.server_ports),
+            'drivers': drivers,
+            'server_healthy': {f'port="{load.port}"': int(load.healthy) for load in servers},
+            'server_available_drivers': {f'port="{load.port}"': load.available_drivers for load in servers},
+            'server_active_rides': {f'port="{load.port}"': load.active_rides for load in servers},
+            'server_queued_rpcs': {f'port="{load.port}"': load.queued_rpcs for load in servers},
+            'server_replication_lag_seconds': {f'port="{load.port}"': load.replication_lag_seconds
+                                               for load in servers if load.standby_port},
+            'threads': threading.active_count(),
+        }
+        return format_prometheus('load_balancer', gauges, self.metrics)
+
+class AsyncLoadBalancer(load_balancer_pb2_grpc.LoadBalancerServiceServicer):
+    # Serves a LoadBalancer on grpc.aio; its handlers only take a short lock, so they run on the loop
+    def __init__(self, core):
+        self.core = core
+
+    async def GetServerPortForRider(self, request, context):
+        return self.core.GetServerPortForRider(request, context)
+
+    async def GetServerPortForDriver(self, request, context):
+        return self.core.GetServerPortForDriver(request, context)
+
+    async def DriverExit(self, request, context):
+        return self.core.DriverExit(request, context)
+
+    async def GetServerStats(self, request, context):
+        return self.core.GetServerStats(request, context)
+
+    async def ReportLoad(self, request, context):
+        return self.core.ReportLoad(request, context)
+
+    async def GetServerList(self, request, context):
+        return self.core.GetServerList(request, context)
+
+def load_server_credentials():
      # Load SSL certificates for server
     with open('../certificates/server.crt', 'rb') as f:
         server_cert = f.read()
@@ -79,13 +278,31 @@ def serve(server_ports):
         ca_cert = f.read()
 
     # Use mTLS for mutual authentication (client and server)
-    server_credentials = grpc.ssl_server_credentials(
+    return grpc.ssl_server_credentials(
         [(private_key, server_cert)],
         root_certificates=ca_cert,
         require_client_auth=True
     )
-    load_balancer_pb2_grpc.add_LoadBalancerServiceServicer_to_server(LoadBalancer(server_ports), server)
-    server.add_secure_port('[::]:4000', server_credentials)  # Load Balancer on port 4000
+
+def print_metrics(metrics):
+    for line in metrics.summary():
+        print(f"[Load Balancer] RPC {line}")
+
+def start_exporter(load_balancer, metrics_file=None, metrics_port=None):
+    # Optional Prometheus text dump of the routing state and RPC metrics
+    if not (metrics_file or metrics_port):
+        return None
+    return PrometheusExporter(load_balancer.prometheus_text, path=metrics_file, port=metrics_port).start()
+
+def serve(server_ports, max_workers=10, metrics_file=None, metrics_port=None, heartbeat_timeout=DEFAULT_HEARTBEAT_TIMEOUT,
+          rider_routing='p2c', list_ttl=DEFAULT_LIST_TTL):
+    metrics = ServerMetrics()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers), interceptors=[MetricsInterceptor(metrics)])
+
+    load_balancer = LoadBalancer(server_ports, metrics, heartbeat_timeout, rider_routing, list_ttl)
+    load_balancer_pb2_grpc.add_LoadBalancerServiceServicer_to_server(load_balancer, server)
+    exporter = start_exporter(load_balancer, metrics_file, metrics_port)
+    server.add_secure_port('[::]:4000', load_server_credentials())  # Load Balancer on port 4000
     server.start()
     print(f"[Load Balancer] Load Balancer is running on port 4000 with servers: {server_ports}")
     try:
@@ -93,13 +310,53 @@ def serve(server_ports):
             time.sleep(86400)
     except KeyboardInterrupt:
         server.stop(0)
+        if exporter is not None:
+            exporter.stop()
+        print_metrics(metrics)
+
+async def serve_async(server_ports, metrics_file=None, metrics_port=None, heartbeat_timeout=DEFAULT_HEARTBEAT_TIMEOUT,
+                      rider_routing='p2c', list_ttl=DEFAULT_LIST_TTL):
+    metrics = ServerMetrics()
+    server = grpc.aio.server(interceptors=[AsyncMetricsInterceptor(metrics)])
+    load_balancer = LoadBalancer(server_ports, metrics, heartbeat_timeout, rider_routing, list_ttl)
+    load_balancer_pb2_grpc.add_LoadBalancerServiceServicer_to_server(AsyncLoadBalancer(load_balancer), server)
+    exporter = start_exporter(load_balancer, metrics_file, metrics_port)
+    server.add_secure_port('[::]:4000', load_server_credentials())  # Load Balancer on port 4000
+    await server.start()
+    print(f"[Load Balancer] Load Balancer (asyncio) is running on port 4000 with servers: {server_ports}")
+    try:
+        await server.wait_for_termination()
+    finally:
+        await server.stop(0)
+        if exporter is not None:
+            exporter.stop()
+        print_metrics(metrics)
 
 if __name__ == '__main__':
     # Parse command-line arguments for live server ports
     parser = argparse.ArgumentParser(description="Start the load balancer for ride-sharing servers.")
     parser.add_argument('--ports', nargs='+', help='List of live server ports, e.g., --ports 5001 5002 5003', required=True)
+    parser.add_argument('--max-workers', type=int, default=10, help='Worker threads of the threaded server')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Serve with grpc.aio on an event loop instead of a thread pool')
+    parser.add_argument('--metrics-file', help='Rewrite this file with Prometheus text metrics every 15 seconds')
+    parser.add_argument('--metrics-port', type=int, help='Serve Prometheus text metrics over HTTP on this port')
+    parser.add_argument('--heartbeat-timeout', type=float, default=DEFAULT_HEARTBEAT_TIMEOUT,
+                        help='Seconds without a load report before a server stops receiving riders and drivers')
+    parser.add_argument('--rider-routing', choices=RIDER_ROUTING, default='p2c',
+                        help='Order servers for riders by free drivers (p2c) or by plain rotation (round-robin)')
+    parser.add_argument('--list-ttl', type=float, default=DEFAULT_LIST_TTL,
+                        help='Seconds clients routing with --cached-routing may use a server list before fetching it again')
     
     args = parser.parse_args()
 
     # Serve the load balancer with the provided ports
-    serve(args.ports)
+    if args.use_async:
+        try:
+            asyncio.run(serve_async(args.ports, metrics_file=args.metrics_file, metrics_port=args.metrics_port,
+                                    heartbeat_timeout=args.heartbeat_timeout, rider_routing=args.rider_routing, list_ttl=args.list_ttl))
+        except KeyboardInterrupt:
+            pass
+    else:
+        serve(args.ports, max_workers=args.max_workers, metrics_file=args.metrics_file, metrics_port=args.metrics_port,
+              heartbeat_timeout=args.heartbeat_timeout, rider_routing=args.rider_routing, list_ttl=args.list_ttl)
@@ -0,0 +1,67 @@
+# load_reporter.py
+
+import threading
+import sys
+
+import grpc
+
+sys.path.append('../protofiles')
+import load_balancer_pb2
+import load_balancer_pb2_grpc
+
+DEFAULT_LOAD_BALANCER = 'localhost:4000'
+DEFAULT_REPORT_INTERVAL = 2  # Seconds between load reports; fresher reports route riders better
+
+
+def load_client_credentials():
+    # The server identifies itself to the load balancer with its own certificate
+    with open('../certificates/server.crt', 'rb') as f:
+        server_cert = f.read()
+    with open('../certificates/server.key', 'rb') as f:
+        private_key = f.read()
+    with open('../certificates/ca.crt', 'rb') as f:
+        ca_cert = f.read()
+    return grpc.ssl_channel_credentials(root_certificates=ca_cert, private_key=private_key, certificate_chain=server_cert)
+
+
+class LoadReporter:
+    # Sends collect() -> LoadReport fields to the load balancer every interval seconds from a
+    # daemon thread. A missing load balancer is reported once, not on every heartbeat.
+    # on_status(status), if given, is called with the load balancer's answer to each report.
+    def __init__(self, port, collect, address=DEFAULT_LOAD_BALANCER, interval=DEFAULT_REPORT_INTERVAL, on_status=None):
+        self.port = str(port)
+        self.collect = collect
+        self.on_status = on_status
+        self.address = address
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='load-reporter', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        channel = grpc.secure_channel(self.address, load_client_credentials())
+        stub = load_balancer_pb2_grpc.LoadBalancerServiceStub(channel)
+        reachable = None
+        while not self._stopped.is_set():
+            try:
+                response = stub.ReportLoad(load_balancer_pb2.LoadReport(port=self.port, **self.collect()), timeout=self.interval)
+                if not reachable:
+                    print(f"[Server] Reporting load to the load balancer at {self.address}: {response.status}")
+                reachable = True
+                if self.on_status is not None:
+                    self.on_status(response.status)
+            except grpc.RpcError as e:
+                if reachable is not False:
+                    print(f"[Server] Load balancer at {self.address} unreachable: {e.code().name}")
+                reachable = False
+            except Exception as e:
+                # A failing collect() or on_status must not end the heartbeats for good
+                print(f"[Server] Load report failed: {e!r}")
+            self._stopped.wait(self.interval)
+        channel.close()
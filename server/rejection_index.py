@@ -0,0 +1,44 @@
+# rejection_index.py
+
+import time
+from collections import OrderedDict
+
+DEFAULT_REJECTION_TTL = 600  # Seconds a ride's rejections are remembered at most
+
+
+class RejectionIndex:
+    # Maps ride_id -> drivers who rejected it (or let it time out). Rides are kept in order
+    # of their first rejection so expired entries are evicted from the front, and a ride is
+    # dropped outright once it can no longer be reassigned.
+    def __init__(self, ttl=DEFAULT_REJECTION_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._rides = OrderedDict()  # ride_id -> (first_rejected_at, set of driver ids)
+
+    def __len__(self):
+        return len(self._rides)
+
+    def rejection_count(self):
+        return sum(len(drivers) for _, drivers in self._rides.values())
+
+    def add(self, ride_id, driver_id):
+        self.evict_expired()
+        entry = self._rides.get(ride_id)
+        if entry is None:
+            entry = self._rides[ride_id] = (self._clock(), set())
+        entry[1].add(driver_id)
+
+    def rejected_by(self, ride_id):
+        entry = self._rides.get(ride_id)
+        return entry[1] if entry else frozenset()
+
+    def drop(self, ride_id):
+        self._rides.pop(ride_id, None)
+
+    def evict_expired(self):
+        cutoff = self._clock() - self.ttl
+        while self._rides:
+            ride_id, (first_rejected_at, _) = next(iter(self._rides.items()))
+            if first_rejected_at > cutoff:
+                break
+            self._rides.popitem(last=False)
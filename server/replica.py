@@ -0,0 +1,88 @@
+# replica.py
+
+import sys
+import threading
+import time
+
+import grpc
+
+sys.path.append('../protofiles')
+import ride_sharing_pb2
+import ride_sharing_pb2_grpc
+
+sys.path.append('../helper')
+from channel_pool import get_pool
+
+RETRY_INTERVAL = 1  # Seconds between attempts to reach the primary
+
+
+class StandbyReplica:
+    # Follows the StreamStateLog of a primary server into a StateLog from a daemon thread:
+    # the primary's records as a snapshot first, then every batch it commits. The replica
+    # is complete once a whole snapshot has been applied (synced). A lost stream is retried,
+    # and the snapshot that starts the new stream replaces the replica; until it has fully
+    # arrived, the previous replica is kept. promote() stops following.
+    def __init__(self, primary_port, state_log, port=''):
+        self.primary_port = str(primary_port)
+        self.state_log = state_log
+        self.port = str(port)
+        self.synced = False
+        self.committed_at = None  # The primary's commit time of the newest applied batch
+        self.applied = 0  # Batches applied, heartbeats included
+        self._stopped = threading.Event()
+        self._call = None
+        self._thread = threading.Thread(target=self._run, name='standby-replica', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def lag(self):
+        # Seconds since the primary committed the newest batch applied here; the primary sends
+        # a heartbeat batch every sync interval, so this grows only when the standby falls
+        # behind or the primary is gone. Negative until the replica is complete.
+        committed_at = self.committed_at
+        if not self.synced or committed_at is None:
+            return -1.0
+        return max(0.0, time.time() - committed_at)
+
+    def promote(self):
+        # Stops following; the state log then holds the last state received from the primary
+        self._stopped.set()
+        call = self._call
+        if call is not None:
+            call.cancel()
+        self._thread.join()
+
+    def _run(self):
+        # The server identifies itself to the primary with its own certificate
+        channel = get_pool('server').channel(f'localhost:{self.primary_port}')
+        stub = ride_sharing_pb2_grpc.RideSharingServiceStub(channel)
+        connected = None
+        while not self._stopped.is_set():
+            try:
+                self._call = stub.StreamStateLog(ride_sharing_pb2.StateLogRequest(standby_port=self.port))
+                snapshot = []  # Parts of the snapshot that opens the stream
+                for batch in self._call:
+                    if not connected:
+                        print(f"[Server] Replicating the server on port {self.primary_port}")
+                        connected = True
+                    if batch.reset or snapshot:
+                        snapshot.append(batch.records)
+                        if batch.partial:
+                            continue
+                        self.state_log.apply(b'\n'.join(snapshot), reset=True, sequence=batch.sequence)
+                        snapshot = []
+                        self.committed_at = batch.committed_at  # Before synced, which lets lag() read it
+                        self.synced = True
+                    elif batch.records:
+                        self.state_log.apply(batch.records, sequence=batch.sequence)
+                    self.committed_at = batch.committed_at
+                    self.applied += 1
+            except grpc.RpcError as e:
+                if self._stopped.is_set():
+                    return
+                if connected is not False:
+                    print(f"[Server] Lost the replication stream from port {self.primary_port}: {e.code().name}")
+                connected = False
+            self._stopped.wait(RETRY_INTERVAL)
@@ -0,0 +1,67 @@
+# ride_archive.py
+
+import json
+import time
+from collections import deque
+
+DEFAULT_ARCHIVE_RETENTION = 3600  # Seconds a finished ride can still be looked up
+SEGMENT_SIZE = 4096  # Rides per archive segment; segments expire as a whole
+
+
+class RideArchive:
+    # Finished rides are kept as compact tuples rather than the live ride dicts. Ride ids are
+    # appended to fixed-size segments in finishing order, so expiring old rides means dropping
+    # whole segments from the front. Optionally every archived ride is also appended to a
+    # JSON-lines file that outlives the retention window.
+    def __init__(self, retention=DEFAULT_ARCHIVE_RETENTION, path=None, clock=time.monotonic):
+        self.retention = retention
+        self._clock = clock
+        self._records = {}  # ride_id -> (status, assigned_driver, rider_id)
+        self._segments = deque()  # [finished_at of the newest ride, list of ride ids]
+        self._file = open(path, 'a') if path else None
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, ride_id):
+        return ride_id in self._records
+
+    def add(self, ride_id, ride):
+        now = self._clock()
+        self._records[ride_id] = (ride['status'], ride['assigned_driver'] or '', ride['rider_id'])
+        if not self._segments or len(self._segments[-1][1]) >= SEGMENT_SIZE:
+            self._segments.append([now, []])
+        segment = self._segments[-1]
+        segment[0] = now
+        segment[1].append(ride_id)
+        if self._file is not None:
+            self._file.write(json.dumps({
+                'ride_id': ride_id,
+                'rider_id': ride['rider_id'],
+                'pickup_location': ride['pickup_location'],
+                'destination': ride['destination'],
+                'assigned_driver': ride['assigned_driver'],
+                'status': ride['status'],
+                'finished_at': time.time(),
+            }) + '\n')
+        self.evict_expired()
+
+    def get(self, ride_id):
+        # Returns (status, assigned_driver, rider_id) or None
+        return self._records.get(ride_id)
+
+    def evict_expired(self):
+        cutoff = self._clock() - self.retention
+        while self._segments and self._segments[0][0] <= cutoff:
+            _, ride_ids = self._segments.popleft()
+            for ride_id in ride_ids:
+                self._records.pop(ride_id, None)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
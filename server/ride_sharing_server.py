@@ -1,71 +1,422 @@
 import grpc
-from concurrent import futures
+import asyncio
 import time
 import uuid
 import threading
-import random
+import argparse
+import os
+import multiprocessing
+import queue
+import signal
 import sys
+from collections import OrderedDict
 
 sys.path.append('../protofiles')
 import ride_sharing_pb2
 import ride_sharing_pb2_grpc
 
 sys.path.append('../helper')  
-from logging_interceptor import LoggingInterceptor  
+from metrics_interceptor import ServerMetrics, MetricsInterceptor, AsyncMetricsInterceptor, CountingExecutor
+from prometheus_exporter import PrometheusExporter, format_prometheus
+from load_reporter import LoadReporter, DEFAULT_LOAD_BALANCER, DEFAULT_REPORT_INTERVAL
+
+from timeout_scheduler import TimeoutScheduler, AsyncioScheduler
+from driver_registry import DriverRegistry
+from rejection_index import RejectionIndex, DEFAULT_REJECTION_TTL
+from subscriptions import Subscriptions
+from ride_archive import RideArchive, DEFAULT_ARCHIVE_RETENTION
+from spatial_index import parse_location, haversine_km
+from batch_dispatcher import BatchDispatcher, solve_assignment
+from shard_table import ShardTable, WorkerShard
+from state_log import StateLog, DEFAULT_SYNC_INTERVAL
+from replica import StandbyReplica
+import numpy as np
+
+DEFAULT_ACCEPT_TIMEOUT = 10  # Seconds a driver has to accept an assigned ride
+DEFAULT_QUEUE_TIMEOUT = 30  # Seconds a ride may wait in the unassigned queue before it is cancelled
+DEFAULT_KEEPALIVE_INTERVAL = 15  # Seconds between keepalive messages on an idle offer stream
+DEFAULT_MAX_WORKERS = 100  # Every open stream holds one worker thread
+UNARY_WORKER_SHARE = 0.2  # Share of the threaded server's workers that streams may not take
+HOUSEKEEPING_INTERVAL = 60  # Seconds between evicting expired state and reporting store sizes
+TERMINAL_STATUSES = ('completed', 'cancelled')
+BATCH_CANDIDATES = 8  # Nearest drivers per ride considered in a batch dispatch round
+REPLICATION_BACKLOG = 1000  # Batches a standby may fall behind before its stream is dropped
+REPLICATION_IDLE_TIMEOUT = 5  # Seconds without a batch (heartbeats included) before a state log stream ends
+RESTORE_GRACE = 30  # Seconds a driver restored from the state log has to register, subscribe or poll again
 
 class RideSharingService(ride_sharing_pb2_grpc.RideSharingServiceServicer):
-    def __init__(self):
-        self.rides = {}  # Holds active rides
-        self.drivers = {}  # Holds available drivers
-        self.rejected_rides = {}  # Holds rejected rides for each driver
+    def __init__(self, accept_timeout=DEFAULT_ACCEPT_TIMEOUT, rejection_ttl=DEFAULT_REJECTION_TTL,
+                 queue_timeout=DEFAULT_QUEUE_TIMEOUT, keepalive_interval=DEFAULT_KEEPALIVE_INTERVAL,
+                 archive_retention=DEFAULT_ARCHIVE_RETENTION, archive_file=None, batch_window=None, scheduler=None,
+                 shard=None, metrics=None, state_log=None, max_streams=None):
+        self.rides = {}  # Holds active rides only
+        self.archive = RideArchive(retention=archive_retention, path=archive_file)  # Recently finished rides
+        # When this is one worker of a sharded server, its free driver count is published for the others
+        self.shard = shard
+        # Optional write-ahead log; transitions mark the rides and drivers they change
+        self.state_log = state_log
+        self.replica = None  # StandbyReplica while this server is a standby
+        self.drivers = DriverRegistry(on_available_change=shard.publish if shard else None,
+                                      on_change=state_log.driver_changed if state_log else None)  # Indexes available and busy drivers
+        self.rejected_rides = RejectionIndex(ttl=rejection_ttl)  # Drivers who rejected each ride
+        self.pending_offers = {}  # driver_id -> ride_id the driver has been offered but not answered
+        self.restored_drivers = set()  # Drivers restored from the state log and not heard from since
+        self.unassigned_rides = OrderedDict()  # FIFO of ride_ids waiting for a driver, oldest first
+        self.accept_timeout = accept_timeout
+        self.queue_timeout = queue_timeout
+        self.keepalive_interval = keepalive_interval
+        self.offer_subscribers = Subscriptions()  # driver_id -> open SubscribeRideOffers streams
+        self.ride_watchers = Subscriptions()  # ride_id -> open WatchRide streams
+        # Threaded server only: streams beyond this are refused so they cannot take every worker
+        # thread, and the client polls GetAssignedRide or GetRideStatus instead
+        self.max_streams = max_streams
+        self.open_streams = 0
+        self.stopping = False  # Set on shutdown, when closing streams says nothing about the drivers
+        self.metrics = metrics  # Per-method RPC statistics, filled in by the server's MetricsInterceptor
+        self.scheduler = scheduler or TimeoutScheduler()  # Owns every acceptance deadline
+        self.lock = threading.RLock()  # Shared by the RPC workers and the scheduler thread
+        self.scheduler.schedule(HOUSEKEEPING_INTERVAL, self.housekeeping)
+        # Optional batch mode: requests are matched together once per window instead of one by one
+        self.dispatcher = BatchDispatcher(self.dispatch_batch, batch_window) if batch_window else None
 
     def RequestRide(self, request, context):
+        ride_id = self.create_ride(request)
+        if self.dispatcher is not None:
+            # Block this request until its dispatch window closes
+            done = threading.Event()
+            result = {}
+            def on_done(ride_id, driver_id):
+                result['driver'] = driver_id
+                done.set()
+            self.dispatcher.submit(ride_id, on_done)
+            done.wait()
+            with self.lock:
+                return self.ride_response(ride_id, result.get('driver'))
+
+        with self.lock:
+            # Try to assign a driver
+            available_driver = self.get_available_driver(ride_id)  # Pass ride_id to avoid rejected rides
+            if available_driver:
+                self.offer_ride(ride_id, available_driver)
+            return self.ride_response(ride_id, available_driver)
+
+    def create_ride(self, request):
         ride_id = str(uuid.uuid4())
-        self.rides[ride_id] = {
-            'rider_id': request.rider_id,
-            'pickup_location': request.pickup_location,
-            'destination': request.destination,
-            'assigned_driver': None,
-            'status': 'waiting_for_acceptance',
-            'accept_thread': None
-        }
-        
-        # Try to assign a driver
-        available_driver = self.get_available_driver(ride_id)  # Pass ride_id to avoid rejected rides
-        if available_driver:
-            self.rides[ride_id]['assigned_driver'] = available_driver
-            self.rides[ride_id]['status'] = 'waiting_for_acceptance'
-            self.start_timeout_thread(ride_id, available_driver)  # Start timeout handling
-            response = ride_sharing_pb2.RideResponse(
-                status='assigned',
-                ride_id=ride_id,
-                assigned_driver=available_driver
-            )
-            print(f"[Server] Ride assigned: {ride_id} to Driver {available_driver}")
-            return response
+        with self.lock:
+            self.rides[ride_id] = {
+                'rider_id': request.rider_id,
+                'pickup_location': request.pickup_location,
+                'destination': request.destination,
+                'pickup_point': parse_location(request.pickup_location),  # (lat, lng) or None
+                'assigned_driver': None,
+                'status': 'waiting_for_acceptance',
+                'timeout': None
+            }
+            self.ride_changed(ride_id)
+        return ride_id
+
+    def RequestRides(self, request, context):
+        # A whole batch of rides is created and matched under one hold of the lock
+        with self.lock:
+            ride_ids = [self.create_ride(ride) for ride in request.rides]
+            if self.dispatcher is not None:
+                # The batch is already a window; match it together right away
+                assignments = self.dispatch_batch(ride_ids)
+            else:
+                assignments = {}
+                for ride_id in ride_ids:
+                    driver_id = self.get_available_driver(ride_id)
+                    if driver_id:
+                        self.offer_ride(ride_id, driver_id)
+                        assignments[ride_id] = driver_id
+                print(f"[Server] Requested a batch of {len(ride_ids)} rides, {len(assignments)} assigned.")
+            responses = [self.ride_result(ride_id, assignments.get(ride_id)) for ride_id in ride_ids]
+        return ride_sharing_pb2.RideResponses(rides=responses)
+
+    def ride_response(self, ride_id, driver_id):
+        if driver_id:
+            print(f"[Server] Ride assigned: {ride_id} to Driver {driver_id}")
         else:
-            response = ride_sharing_pb2.RideResponse(status='no_drivers_available')
-            print(f"[Server] No drivers available for rider {request.rider_id}")
-            return response
+            print(f"[Server] No drivers available for rider {self.rides[ride_id]['rider_id']}")
+        return self.ride_result(ride_id, driver_id)
+
+    def ride_result(self, ride_id, driver_id):
+        if driver_id:
+            return ride_sharing_pb2.RideResponse(status='assigned', ride_id=ride_id, assigned_driver=driver_id)
+        del self.rides[ride_id]  # The rider moves on to the next server, nobody is waiting on this ride
+        self.ride_changed(ride_id)
+        # Point the rider at the worker that currently has the most free drivers
+        redirect_port = self.shard.redirect_port() if self.shard else ''
+        return ride_sharing_pb2.RideResponse(status='no_drivers_available', redirect_port=redirect_port)
+
+    def dispatch_batch(self, ride_ids):
+        # Matches a window of new rides at once, minimising their total pickup distance.
+        # Rides without a "lat,lng" pickup, or left over, are then matched one by one as usual.
+        assignments = {}
+        with self.lock:
+            located = [ride_id for ride_id in ride_ids if self.rides[ride_id]['pickup_point'] is not None]
+            columns = {}  # Candidate driver_id -> column of the cost matrix
+            for ride_id in located:
+                for driver_id, _ in self.nearest_drivers(ride_id, k=BATCH_CANDIDATES):
+                    columns.setdefault(driver_id, len(columns))
+            if columns:
+                driver_ids = list(columns)
+                locations = np.array([self.drivers.location(driver_id) for driver_id in driver_ids])
+                cost = np.empty((len(located), len(driver_ids)))
+                for row, ride_id in enumerate(located):
+                    pickup = self.rides[ride_id]['pickup_point']
+                    cost[row] = haversine_km(pickup[0], pickup[1], locations[:, 0], locations[:, 1])
+                for row, col in solve_assignment(cost):
+                    self.offer_ride(located[row], driver_ids[col])
+                    assignments[located[row]] = driver_ids[col]
+
+            for ride_id in ride_ids:
+                if ride_id not in assignments:
+                    driver_id = self.get_available_driver(ride_id)
+                    if driver_id:
+                        self.offer_ride(ride_id, driver_id)
+                        assignments[ride_id] = driver_id
+        print(f"[Server] Dispatched a batch of {len(ride_ids)} rides, {len(assignments)} assigned.")
+        return assignments
+
+    def offer_ride(self, ride_id, driver_id, event='assigned'):
+        # The driver is held out of the available pool until they answer or the offer times out
+        ride = self.rides[ride_id]
+        ride['assigned_driver'] = driver_id
+        ride['status'] = 'waiting_for_acceptance'
+        self.drivers.mark_busy(driver_id)
+        self.pending_offers[driver_id] = ride_id
+        self.start_acceptance_timeout(ride_id, driver_id)  # Start timeout handling
+        self.ride_changed(ride_id)
+        self.offer_subscribers.publish(driver_id, self.get_offer_details(driver_id))
+        self.notify_ride(ride_id, event)
+
+    def notify_ride(self, ride_id, status):
+        # Called with the lock held, so watchers see transitions in order
+        update = ride_sharing_pb2.RideStatusUpdate(status=status, assigned_driver=self.rides[ride_id]['assigned_driver'] or '')
+        self.ride_watchers.publish(ride_id, update)
+        if status in TERMINAL_STATUSES:
+            self.ride_watchers.close(ride_id)
+
+    def withdraw_offer(self, ride):
+        # Undo offer_ride after a rejection or timeout; the driver goes back to the pool
+        driver_id = ride['assigned_driver']
+        self.cancel_acceptance_timeout(ride)
+        ride_id = self.pending_offers.pop(driver_id, None)
+        self.drivers.mark_available(driver_id)
+        ride['assigned_driver'] = None
+        if ride_id is not None:
+            self.ride_changed(ride_id)
+
+    def finish_ride(self, ride_id, status):
+        # Moves a ride that reached a terminal state out of the hot store into the archive
+        ride = self.rides[ride_id]
+        ride['status'] = status
+        self.rejected_rides.drop(ride_id)
+        self.notify_ride(ride_id, status)
+        del self.rides[ride_id]
+        self.ride_changed(ride_id)
+        self.archive.add(ride_id, ride)
+
+    def ride_changed(self, ride_id):
+        # Called with self.lock held after every transition of a ride
+        if self.state_log is not None:
+            self.state_log.ride_changed(ride_id)
+
+    def store_sizes(self):
+        with self.lock:
+            return {'active_rides': len(self.rides), 'archived_rides': len(self.archive)}
+
+    def server_stats(self):
+        # Gauges for GetServerStats and the Prometheus export
+        with self.lock:
+            sizes = self.store_sizes()
+            timeouts = self.scheduler.stats()
+            return {
+                'active_rides': sizes['active_rides'],
+                'archived_rides': sizes['archived_rides'],
+                'available_drivers': self.drivers.available_count(),
+                'busy_drivers': self.drivers.busy_count(),
+                'pending_offers': len(self.pending_offers),
+                'unassigned_rides': len(self.unassigned_rides),
+                'rejected_rides': len(self.rejected_rides),
+                'pending_timeouts': timeouts['pending'],
+                'timeout_avg_lateness_ms': timeouts['avg_lateness_ms'],
+                'timeout_max_lateness_ms': timeouts['max_lateness_ms'],
+                'offer_streams': len(self.offer_subscribers),
+                'ride_watch_streams': len(self.ride_watchers),
+                'threads': threading.active_count(),
+                'standbys': self.state_log.standby_count() if self.state_log is not None else 0,
+                'replication_lag_seconds': self.replica.lag() if self.replica is not None else 0.0,
+            }
+
+    def load_report(self):
+        # Heartbeat fields for the load balancer
+        with self.lock:
+            report = {
+                'available_drivers': self.drivers.available_count(),
+                'busy_drivers': self.drivers.busy_count(),
+                'active_rides': len(self.rides),
+            }
+        # Calls being handled plus, in the threaded server, calls waiting for a worker thread
+        report['queued_rpcs'] = self.metrics.in_flight() + self.metrics.queued() if self.metrics is not None else 0
+        return report
+
+    def GetServerStats(self, request, context):
+        rows, rate = self.metrics.method_rows() if self.metrics is not None else ([], 0.0)
+        return ride_sharing_pb2.ServerStats(
+            uptime_seconds=self.metrics.uptime() if self.metrics is not None else 0.0,
+            requests_per_second=rate,
+            methods=[ride_sharing_pb2.RpcMethodStats(**row) for row in rows],
+            **self.server_stats()
+        )
+
+    def prometheus_text(self):
+        return format_prometheus('ride_sharing', self.server_stats(), self.metrics)
+
+    def housekeeping(self):
+        with self.lock:
+            self.archive.evict_expired()
+            self.archive.flush()
+            self.rejected_rides.evict_expired()
+            sizes = self.store_sizes()
+        print(f"[Server] Store sizes: {sizes['active_rides']} active rides, {sizes['archived_rides']} archived rides")
+        if self.metrics is not None:
+            for line in self.metrics.summary(limit=5):
+                print(f"[Server] RPC {line}")
+        self.scheduler.schedule(HOUSEKEEPING_INTERVAL, self.housekeeping)
+
+    def state_records(self, ride_ids, driver_ids):
+        # Called by the state log with self.lock held: the current record of each changed ride
+        # and driver, or None once it is gone. Deadlines are stored as wall-clock times.
+        now, wall = time.monotonic(), time.time()
+        rides = {}
+        for ride_id in ride_ids:
+            ride = self.rides.get(ride_id)
+            if ride is None:
+                rides[ride_id] = None
+                continue
+            timeout = ride['timeout']
+            deadline = wall + timeout.deadline - now if timeout is not None and not timeout.cancelled else None
+            rides[ride_id] = [ride['rider_id'], ride['pickup_location'], ride['destination'], ride['assigned_driver'],
+                              ride['status'], deadline, sorted(self.rejected_rides.rejected_by(ride_id))]
+        drivers = {}
+        for driver_id in driver_ids:
+            status = self.drivers.status(driver_id)
+            location = self.drivers.location(driver_id) or (None, None)
+            drivers[driver_id] = [status, *location] if status else None
+        return rides, drivers
+
+    def recover(self, source=None):
+        # Rebuilds the stores from the state log, if there is one, and starts logging to it.
+        # On a promoted standby the log holds the replica rather than what was read from disk.
+        if self.state_log is None:
+            return
+        rides, drivers = self.state_log.load()
+        self.restore(rides, drivers)
+        self.state_log.start(self.lock, self.state_records)
+        recovery = self.state_log.recovery
+        if source:
+            print(f"[Server] Took over {len(self.rides)} active rides and {len(drivers)} drivers from {source}")
+        elif self.state_log.directory is not None:
+            print(f"[Server] Recovered {len(self.rides)} active rides and {len(drivers)} drivers from "
+                  f"{self.state_log.directory} in {recovery['seconds']:.2f}s ({recovery['replayed_records']} logged records replayed)")
+
+    def StreamStateLog(self, request, context):
+        # A standby follows this server's state: a snapshot first, then every committed batch
+        if self.state_log is None:
+            context.abort(grpc.StatusCode.FAILED_PRECONDITION, 'Start the server with --replicate to serve standbys')
+        batches = queue.Queue(maxsize=REPLICATION_BACKLOG)
+        snapshot = self.state_log.subscribe(batches.put_nowait)  # Raises queue.Full once the standby falls behind
+        print(f"[Server] Standby on port {request.standby_port} is following the state log.")
+        try:
+            for batch in snapshot:
+                yield ride_sharing_pb2.StateLogBatch(**batch)
+            while True:
+                try:
+                    batch = batches.get(timeout=REPLICATION_IDLE_TIMEOUT)
+                except queue.Empty:
+                    return  # Dropped for falling behind; the standby reconnects and starts over
+                yield ride_sharing_pb2.StateLogBatch(**batch)
+        finally:
+            self.state_log.unsubscribe(batches.put_nowait)
+            print(f"[Server] Standby on port {request.standby_port} stopped following the state log.")
 
-    def start_timeout_thread(self, ride_id, driver_id):
-        def timeout_handler():
-            time.sleep(10)  # Timeout period in seconds
+    def restore(self, rides, drivers):
+        # Deadlines that passed while the server was down fire right away
+        with self.lock:
+            for driver_id, (status, lat, lng) in drivers.items():
+                self.drivers.register(driver_id, (lat, lng) if lat is not None else None)
+                if status == 'busy':
+                    self.drivers.mark_busy(driver_id)
+            wall = time.time()
+            queued = []
+            for ride_id, (rider_id, pickup, destination, driver_id, status, deadline, rejected) in rides.items():
+                if status == 'waiting_for_acceptance' and driver_id is None:
+                    continue  # Its RequestRide was still being matched and failed with the server
+                ride = self.rides[ride_id] = {
+                    'rider_id': rider_id,
+                    'pickup_location': pickup,
+                    'destination': destination,
+                    'pickup_point': parse_location(pickup),
+                    'assigned_driver': driver_id,
+                    'status': status,
+                    'timeout': None
+                }
+                for rejected_by in rejected:
+                    self.rejected_rides.add(ride_id, rejected_by)
+                if status == 'waiting_for_acceptance':
+                    self.pending_offers[driver_id] = ride_id
+                    self.drivers.mark_busy(driver_id)
+                    delay = self.accept_timeout if deadline is None else max(0.0, deadline - wall)
+                    ride['timeout'] = self.scheduler.schedule(delay, self.handle_acceptance_timeout, ride_id, driver_id)
+                elif status == 'waiting_for_driver':
+                    delay = self.queue_timeout if deadline is None else max(0.0, deadline - wall)
+                    queued.append((delay, ride_id))
+                    ride['timeout'] = self.scheduler.schedule(delay, self.handle_queue_timeout, ride_id)
+            for _, ride_id in sorted(queued):  # Oldest first, as they were queued
+                self.unassigned_rides[ride_id] = None
+            # A restored driver has no offer stream, so one that never comes back would hold its
+            # offers and be reported as available for good
+            self.restored_drivers.update(drivers)
+            if drivers:
+                self.scheduler.schedule(RESTORE_GRACE, self.drop_silent_drivers)
+
+    def drop_silent_drivers(self):
+        # Unregisters the restored drivers that did not reconnect within RESTORE_GRACE
+        with self.lock:
+            silent, self.restored_drivers = self.restored_drivers, set()
+            for driver_id in silent:
+                if self.drivers.status(driver_id) is not None:
+                    print(f"[Server] Driver {driver_id} did not reconnect after the restart.")
+                    self.unregister_driver(driver_id)
+
+    def start_acceptance_timeout(self, ride_id, driver_id):
+        # Replaces any earlier deadline for this ride; the scheduler fires handle_acceptance_timeout
+        ride = self.rides[ride_id]
+        self.cancel_acceptance_timeout(ride)
+        ride['timeout'] = self.scheduler.schedule(self.accept_timeout, self.handle_acceptance_timeout, ride_id, driver_id)
+
+    def cancel_acceptance_timeout(self, ride):
+        if ride['timeout'] is not None:
+            ride['timeout'].cancel()
+            ride['timeout'] = None
+
+    def handle_acceptance_timeout(self, ride_id, driver_id):
+        with self.lock:
             ride = self.rides.get(ride_id)
-            if ride and ride['status'] == 'waiting_for_acceptance':
+            # The ride may have been accepted, rejected or reassigned while this deadline was firing
+            if ride and ride['status'] == 'waiting_for_acceptance' and ride['assigned_driver'] == driver_id:
                 print(f"[Server] Timeout: Driver {driver_id} did not respond in time.")
+                ride['timeout'] = None
                 self.add_to_rejected_rides(driver_id, ride_id)
+                self.withdraw_offer(ride)
                 self.reassign_ride(ride_id)
-
-        # Create and start the timeout thread
-        thread = threading.Thread(target=timeout_handler)
-        thread.start()
-        self.rides[ride_id]['accept_thread'] = thread
+                self.dispatch_queued_ride(driver_id)  # The freed driver may take another queued ride
     
     def add_to_rejected_rides(self, driver_id, ride_id):
-        if driver_id not in self.rejected_rides:
-            self.rejected_rides[driver_id] = set()
-        self.rejected_rides[driver_id].add(ride_id)
+        self.rejected_rides.add(ride_id, driver_id)
+        self.ride_changed(ride_id)
         # print(f"[Server] Ride {ride_id} added to rejected rides for Driver {driver_id}.")
 
     def reassign_ride(self, ride_id):
@@ -73,17 +424,71 @@ class RideSharingService(ride_sharing_pb2_grpc.RideSharingServiceServicer):
         if ride:
             new_driver = self.get_available_driver(ride_id)  # Check for rejected rides
             if new_driver:
-                ride['assigned_driver'] = new_driver
+                self.offer_ride(ride_id, new_driver, event='reassigned')  # Starts a new timeout
                 print(f"[Server] Reassigned ride {ride_id} to Driver {new_driver}.")
-                ride['status'] = 'waiting_for_acceptance'
-                self.start_timeout_thread(ride_id, new_driver)  # Start new timeout
             else:
-                ride['status'] = 'cancelled'  # No available drivers
+                self.queue_ride(ride_id)  # Wait for the next driver to free up
+
+    def queue_ride(self, ride_id):
+        ride = self.rides[ride_id]
+        ride['status'] = 'waiting_for_driver'
+        self.unassigned_rides[ride_id] = None
+        self.cancel_acceptance_timeout(ride)
+        ride['timeout'] = self.scheduler.schedule(self.queue_timeout, self.handle_queue_timeout, ride_id)
+        self.ride_changed(ride_id)
+        self.notify_ride(ride_id, 'waiting_for_driver')
+        print(f"[Server] No available drivers, ride {ride_id} queued.")
+
+    def handle_queue_timeout(self, ride_id):
+        with self.lock:
+            if ride_id in self.unassigned_rides:
+                del self.unassigned_rides[ride_id]
+                self.rides[ride_id]['timeout'] = None
+                self.finish_ride(ride_id, 'cancelled')  # No driver freed up in time
                 print(f"[Server] Ride {ride_id} cancelled due to no available drivers.")
 
+    def dispatch_queued_ride(self, driver_id):
+        # Offer the oldest queued ride this driver has not already rejected; a driver who is
+        # gone or already holds an offer or a ride gets nothing
+        if self.drivers.status(driver_id) != 'available':
+            return None
+        for ride_id in self.unassigned_rides:
+            if driver_id not in self.rejected_rides.rejected_by(ride_id):
+                del self.unassigned_rides[ride_id]
+                self.offer_ride(ride_id, driver_id, event='reassigned')
+                return ride_id
+        return None
+
     def RegisterDriver(self, request, context):
-        self.register_driver(request.driver_id)
+        if self.shard and not self.shard.owns(request.driver_id):
+            # Each driver lives on exactly one worker so their rides are matched there
+            return ride_sharing_pb2.AcceptRideResponse(status='wrong_shard', redirect_port=self.shard.owner_port(request.driver_id))
+        self.register_driver(request.driver_id, parse_location(request.location))
         return ride_sharing_pb2.AcceptRideResponse(status='driver_registered')
+
+    def RegisterDrivers(self, request, context):
+        # Onboards a fleet under one hold of the lock; each driver is answered as RegisterDriver would
+        results = []
+        with self.lock:
+            for driver in request.drivers:
+                if self.shard and not self.shard.owns(driver.driver_id):
+                    results.append(ride_sharing_pb2.AcceptRideResponse(status='wrong_shard',
+                                                                       redirect_port=self.shard.owner_port(driver.driver_id)))
+                    continue
+                self.add_driver(driver.driver_id, parse_location(driver.location))
+                results.append(ride_sharing_pb2.AcceptRideResponse(status='driver_registered'))
+        registered = sum(result.status == 'driver_registered' for result in results)
+        print(f"[Server] Registered a batch of {registered} drivers ({len(results) - registered} on other workers).")
+        return ride_sharing_pb2.RegisterDriversResponse(results=results)
+
+    def UpdateDriverLocation(self, request, context):
+        location = parse_location(request.location)
+        if location is None:
+            return ride_sharing_pb2.UpdateDriverLocationResponse(status='invalid_location')
+        with self.lock:
+            if self.drivers.set_location(request.driver_id, location):
+                return ride_sharing_pb2.UpdateDriverLocationResponse(status='location_updated')
+        return ride_sharing_pb2.UpdateDriverLocationResponse(status='driver_not_found')
     
     def AssignRide(self, request, context):
         ride_id = self.assign_ride(request.driver_id)
@@ -92,103 +497,393 @@ class RideSharingService(ride_sharing_pb2_grpc.RideSharingServiceServicer):
         return ride_sharing_pb2.AssignRideResponse(ride_id="")
 
     def GetRideStatus(self, request, context):
-        ride = self.rides.get(request.ride_id)
+        with self.lock:
+            return ride_sharing_pb2.RideStatusResponse(status=self.ride_status(request.ride_id))
+
+    def GetRideStatuses(self, request, context):
+        with self.lock:
+            statuses = [ride_sharing_pb2.RideStatusResponse(status=self.ride_status(ride_id)) for ride_id in request.ride_ids]
+        return ride_sharing_pb2.RideStatusesResponse(statuses=statuses)
+
+    def ride_status(self, ride_id):
+        # Called with self.lock held; finished rides are answered from the archive
+        ride = self.rides.get(ride_id)
         if ride:
-            return ride_sharing_pb2.RideStatusResponse(status=ride['status'])
-        return ride_sharing_pb2.RideStatusResponse(status='no_such_ride')
+            return ride['status']
+        archived = self.archive.get(ride_id)
+        if archived:
+            return archived[0]
+        return 'no_such_ride'
+
+    def WatchRide(self, request, context):
+        ride_id = request.ride_id
+        if not self.reserve_stream():
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, 'Too many open streams; poll GetRideStatus instead')
+        try:
+            updates = queue.Queue()
+            current, watching = self.open_ride_watch(ride_id, updates.put)
+            yield current
+            if not watching:
+                return
+            context.add_callback(lambda: updates.put(None))  # Wake the loop if the rider disconnects
+            try:
+                while True:
+                    update = updates.get()
+                    if update is None:
+                        return
+                    yield update
+            finally:
+                self.ride_watchers.unsubscribe(ride_id, updates.put)
+        finally:
+            self.release_stream()
+
+    def reserve_stream(self):
+        # Takes one of the max_streams slots; False when they are all held
+        with self.lock:
+            if self.max_streams is not None and self.open_streams >= self.max_streams:
+                return False
+            self.open_streams += 1
+            return True
+
+    def release_stream(self):
+        with self.lock:
+            self.open_streams -= 1
+
+    def open_ride_watch(self, ride_id, sink):
+        # Returns the ride's current state and whether sink now receives its later transitions
+        with self.lock:
+            ride = self.rides.get(ride_id)
+            archived = self.archive.get(ride_id)
+            if ride is None and archived:
+                return ride_sharing_pb2.RideStatusUpdate(status=archived[0], assigned_driver=archived[1]), False
+            if ride is None:
+                return ride_sharing_pb2.RideStatusUpdate(status='no_such_ride'), False
+            # Subscribe under the lock so no transition slips between the snapshot and the stream
+            status = 'assigned' if ride['status'] == 'waiting_for_acceptance' else ride['status']
+            current = ride_sharing_pb2.RideStatusUpdate(status=status, assigned_driver=ride['assigned_driver'] or '')
+            if status in TERMINAL_STATUSES:
+                return current, False
+            self.ride_watchers.subscribe(ride_id, sink)
+            return current, True
 
     def AcceptRide(self, request, context):
-        ride = self.rides.get(request.ride_id)
-        if ride and ride['assigned_driver'] == request.driver_id:
-            ride['status'] = 'in_progress'
-            ride['accept_thread'].join()  # Ensure timeout thread is finished
-            self.drivers[request.driver_id] = 'busy'
-            response = ride_sharing_pb2.AcceptRideResponse(status='ride_accepted', ride_id=request.ride_id)
-            print(f"[Server] Driver {request.driver_id} accepted ride {request.ride_id}")
-            return response
-        return ride_sharing_pb2.AcceptRideResponse(status='ride_already_accepted')
+        with self.lock:
+            ride = self.rides.get(request.ride_id)
+            if ride and ride['assigned_driver'] == request.driver_id and ride['status'] == 'waiting_for_acceptance':
+                ride['status'] = 'in_progress'
+                self.cancel_acceptance_timeout(ride)  # Drop the pending deadline, no need to wait for it
+                self.rejected_rides.drop(request.ride_id)  # An accepted ride is never reassigned
+                self.pending_offers.pop(request.driver_id, None)  # Driver stays busy for the ride
+                self.ride_changed(request.ride_id)
+                self.notify_ride(request.ride_id, 'in_progress')
+                response = ride_sharing_pb2.AcceptRideResponse(status='ride_accepted', ride_id=request.ride_id)
+                print(f"[Server] Driver {request.driver_id} accepted ride {request.ride_id}")
+                return response
+            return ride_sharing_pb2.AcceptRideResponse(status='ride_already_accepted')
 
     def RejectRide(self, request, context):
-        ride = self.rides.get(request.ride_id)
-        if ride and ride['assigned_driver'] == request.driver_id:
-            ride['assigned_driver'] = None
-            ride['status'] = 'waiting_for_acceptance'
-            ride['accept_thread'].join()  # Ensure timeout thread is finished
-            
-            # Add the rejected ride to the driver's list of rejected rides
-            if request.driver_id not in self.rejected_rides:
-                self.rejected_rides[request.driver_id] = set()
-            self.rejected_rides[request.driver_id].add(request.ride_id)
-
-            self.start_timeout_thread(request.ride_id, self.get_available_driver())  # Attempt to reassign
-            response = ride_sharing_pb2.RejectRideResponse(status='ride_rejected')
-            print(f"[Server] Driver {request.driver_id} rejected ride {request.ride_id}")
-            return response
-        return ride_sharing_pb2.RejectRideResponse(status='no_such_ride')
+        with self.lock:
+            ride = self.rides.get(request.ride_id)
+            if ride and ride['assigned_driver'] == request.driver_id and ride['status'] == 'waiting_for_acceptance':
+                self.add_to_rejected_rides(request.driver_id, request.ride_id)
+                self.withdraw_offer(ride)
+
+                print(f"[Server] Driver {request.driver_id} rejected ride {request.ride_id}")
+                self.reassign_ride(request.ride_id)  # Attempt to reassign
+                self.dispatch_queued_ride(request.driver_id)  # The freed driver may take another queued ride
+                return ride_sharing_pb2.RejectRideResponse(status='ride_rejected')
+            return ride_sharing_pb2.RejectRideResponse(status='no_such_ride')
 
     def CompleteRide(self, request, context):
-        ride = self.rides.get(request.ride_id)
-        if ride and ride['assigned_driver'] == request.driver_id:
-            ride['status'] = 'completed'
-            self.drivers[request.driver_id] = 'available'
-            response = ride_sharing_pb2.RideCompletionResponse(status='ride_completed')
-            print(f"[Server] Ride {request.ride_id} completed by Driver {request.driver_id}")
-            return response
-        return ride_sharing_pb2.RideCompletionResponse(status='ride_not_found')
+        with self.lock:
+            ride = self.rides.get(request.ride_id)
+            if ride and ride['assigned_driver'] == request.driver_id and ride['status'] == 'in_progress':
+                dropoff = parse_location(ride['destination'])
+                if dropoff is not None:
+                    self.drivers.set_location(request.driver_id, dropoff)  # The driver is now at the destination
+                self.drivers.mark_available(request.driver_id)
+                self.finish_ride(request.ride_id, 'completed')
+                response = ride_sharing_pb2.RideCompletionResponse(status='ride_completed')
+                print(f"[Server] Ride {request.ride_id} completed by Driver {request.driver_id}")
+                self.dispatch_queued_ride(request.driver_id)
+                return response
+            return ride_sharing_pb2.RideCompletionResponse(status='ride_not_found')
+
+    def CancelRide(self, request, context):
+        with self.lock:
+            ride = self.rides.get(request.ride_id)
+            if ride is None or ride['rider_id'] != request.rider_id:
+                return ride_sharing_pb2.CancelRideResponse(status='no_such_ride')
+            if ride['status'] == 'in_progress':
+                return ride_sharing_pb2.CancelRideResponse(status='ride_in_progress')
+            driver_id = ride['assigned_driver']
+            if driver_id is not None:
+                self.withdraw_offer(ride)  # The offered driver goes back to the pool
+            else:
+                self.unassigned_rides.pop(request.ride_id, None)
+                self.cancel_acceptance_timeout(ride)  # Drops the queue deadline
+            self.finish_ride(request.ride_id, 'cancelled')
+            print(f"[Server] Ride {request.ride_id} cancelled by rider {request.rider_id}")
+            if driver_id is not None:
+                self.dispatch_queued_ride(driver_id)
+            return ride_sharing_pb2.CancelRideResponse(status='ride_cancelled')
 
     def get_available_driver(self, ride_id=None):
-        available_drivers = [driver_id for driver_id, status in self.drivers.items() if status == 'available']
-        if ride_id:
-            # Exclude drivers who have rejected the current ride
-            rejected_drivers = {driver_id for driver_id in self.rejected_rides if ride_id in self.rejected_rides[driver_id]}
-            available_drivers = list(set(available_drivers) - rejected_drivers)
-        
-        if available_drivers:
-            return random.choice(available_drivers)  # Select a random available driver
-        return None
+        # Prefer the nearest driver to the pickup; fall back to any available driver
+        nearest = self.nearest_drivers(ride_id, k=1) if ride_id else []
+        if nearest:
+            return nearest[0][0]
+        # Exclude drivers who have rejected the current ride
+        rejected_drivers = self.rejected_rides.rejected_by(ride_id) if ride_id else ()
+        return self.drivers.pick_random(exclude=rejected_drivers)  # Select a random available driver
 
-    def register_driver(self, driver_id):
-        self.drivers[driver_id] = 'available'
-        print(f"[Server] Driver {driver_id} registered.")
+    def nearest_drivers(self, ride_id, k):
+        # Up to k (driver_id, distance_km) pairs of located drivers who have not rejected the ride
+        pickup = self.rides[ride_id]['pickup_point']
+        if pickup is None:
+            return []
+        return self.drivers.nearest(pickup, k=k, exclude=self.rejected_rides.rejected_by(ride_id))
+
+    def register_driver(self, driver_id, location=None):
+        with self.lock:
+            self.add_driver(driver_id, location)
+            print(f"[Server] Driver {driver_id} registered.")
+
+    def add_driver(self, driver_id, location):
+        # Called with self.lock held; a queued ride is offered to the new driver right away
+        self.restored_drivers.discard(driver_id)
+        if driver_id not in self.pending_offers:  # Keep a driver with an open offer reserved
+            self.drivers.register(driver_id, location)
+        elif location is not None:
+            self.drivers.set_location(driver_id, location)
+        self.dispatch_queued_ride(driver_id)
 
     def UnregisterDriver(self, request, context):
         self.unregister_driver(request.driver_id)
         return ride_sharing_pb2.UnregisterDriverResponse(status='driver_unregistered')
 
     def unregister_driver(self, driver_id):
-        if driver_id in self.drivers:
-            del self.drivers[driver_id]
-            print(f"[Server] Driver {driver_id} unregistered.")
+        with self.lock:
+            # A driver leaving with an unanswered offer is treated as rejecting it
+            ride_id = self.pending_offers.get(driver_id)
+            if ride_id is not None:
+                self.add_to_rejected_rides(driver_id, ride_id)
+                self.withdraw_offer(self.rides[ride_id])
+            if self.drivers.unregister(driver_id):
+                print(f"[Server] Driver {driver_id} unregistered.")
+            if ride_id is not None:
+                self.reassign_ride(ride_id)  # Offered to the next driver or queued, as after a rejection
+        self.offer_subscribers.close(driver_id)  # Ends the driver's offer stream
 
     def GetAssignedRide(self, request, context):
-        for ride_id, ride in self.rides.items():
-            if ride['assigned_driver'] == request.driver_id and ride['status'] == 'waiting_for_acceptance':
-                return ride_sharing_pb2.AssignedRideDetails(
-                    pickup_location=ride['pickup_location'],
-                    destination=ride['destination'],
-                    ride_id=ride_id
-                )
+        with self.lock:
+            self.restored_drivers.discard(request.driver_id)  # A polling driver is still there
+            return self.get_offer_details(request.driver_id)
+
+    def get_offer_details(self, driver_id):
+        ride_id = self.pending_offers.get(driver_id)
+        if ride_id is not None:
+            ride = self.rides[ride_id]
+            return ride_sharing_pb2.AssignedRideDetails(
+                pickup_location=ride['pickup_location'],
+                destination=ride['destination'],
+                ride_id=ride_id
+            )
         return ride_sharing_pb2.AssignedRideDetails()  # Return empty if no rides are assigned
 
+    def SubscribeRideOffers(self, request, context):
+        driver_id = request.driver_id
+        if not self.reserve_stream():
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, 'Too many open streams; poll GetAssignedRide instead')
+        offers = queue.Queue()
+        offer = self.open_offer_stream(driver_id, offers.put)
+        context.add_callback(lambda: offers.put(None))  # Wake the loop if the driver disconnects
+        try:
+            if offer.ride_id:
+                yield offer
+            while True:
+                try:
+                    offer = offers.get(timeout=self.keepalive_interval)
+                except queue.Empty:
+                    yield ride_sharing_pb2.AssignedRideDetails()  # Keepalive
+                    continue
+                if offer is None:
+                    return
+                yield offer
+        finally:
+            self.close_offer_stream(driver_id, offers.put)
+            self.release_stream()
+
+    def open_offer_stream(self, driver_id, sink):
+        # Subscribes sink to the driver's offers; returns an offer made before the driver
+        # subscribed (sent straight away) or an empty message
+        with self.lock:
+            self.offer_subscribers.subscribe(driver_id, sink)
+            self.restored_drivers.discard(driver_id)
+            offer = self.get_offer_details(driver_id)
+        print(f"[Server] Driver {driver_id} subscribed to ride offers.")
+        return offer
+
+    def close_offer_stream(self, driver_id, sink):
+        # A driver whose last offer stream ends without UnregisterDriver has crashed or lost
+        # its connection; it is unregistered so it is no longer reported or offered rides,
+        # and an offer it holds goes to the next driver. A reconnecting driver registers again.
+        with self.lock:
+            self.offer_subscribers.unsubscribe(driver_id, sink)
+            if self.stopping or driver_id in self.offer_subscribers or self.drivers.status(driver_id) is None:
+                return
+            print(f"[Server] Driver {driver_id} dropped its offer stream.")
+            self.unregister_driver(driver_id)
+
     def assign_ride(self, driver_id):
-        # Logic to assign a ride (this is a placeholder)
-        ride_id = None
-        for id, ride in self.rides.items():
-            if ride['assigned_driver'] is None:  # Check if ride is available for assignment
-                ride['assigned_driver'] = driver_id
-                ride['status'] = 'waiting_for_acceptance'
-                ride_id = id
+        # Pull model: an available driver takes the oldest unassigned ride
+        with self.lock:
+            if self.drivers.status(driver_id) != 'available':
+                return None
+            ride_id = self.dispatch_queued_ride(driver_id)
+            if ride_id:
                 print(f"[Server] Assigned ride {ride_id} to driver {driver_id}.")
-                break
         return ride_id
 
-def serve():
-    if len(sys.argv) < 2:
-        print("Please provide the port number as a command-line argument.")
-        sys.exit(1)
-    port = sys.argv[1]
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    interceptor = LoggingInterceptor(client_role='server')  # Adjust role as needed
+class AsyncRideSharingService(ride_sharing_pb2_grpc.RideSharingServiceServicer):
+    # Serves a RideSharingService on grpc.aio. The unary handlers of the core never block,
+    # so they are called directly on the event loop; streams and batch waits use asyncio
+    # queues and futures instead of parking a thread.
+    def __init__(self, core):
+        self.core = core
+
+    async def RequestRide(self, request, context):
+        if self.core.dispatcher is None:
+            return self.core.RequestRide(request, context)
+        loop = asyncio.get_running_loop()
+        result = loop.create_future()
+        ride_id = self.core.create_ride(request)
+        self.core.dispatcher.submit(ride_id, lambda ride_id, driver_id: loop.call_soon_threadsafe(result.set_result, driver_id))
+        driver_id = await result
+        with self.core.lock:
+            return self.core.ride_response(ride_id, driver_id)
+
+    async def GetRideStatus(self, request, context):
+        return self.core.GetRideStatus(request, context)
+
+    async def GetRideStatuses(self, request, context):
+        return self.core.GetRideStatuses(request, context)
+
+    async def RegisterDrivers(self, request, context):
+        return self.core.RegisterDrivers(request, context)
+
+    async def RequestRides(self, request, context):
+        return self.core.RequestRides(request, context)
+
+    async def AcceptRide(self, request, context):
+        return self.core.AcceptRide(request, context)
+
+    async def RejectRide(self, request, context):
+        return self.core.RejectRide(request, context)
+
+    async def CompleteRide(self, request, context):
+        return self.core.CompleteRide(request, context)
+
+    async def GetAssignedRide(self, request, context):
+        return self.core.GetAssignedRide(request, context)
+
+    async def RegisterDriver(self, request, context):
+        return self.core.RegisterDriver(request, context)
+
+    async def AssignRide(self, request, context):
+        return self.core.AssignRide(request, context)
+
+    async def UnregisterDriver(self, request, context):
+        return self.core.UnregisterDriver(request, context)
+
+    async def UpdateDriverLocation(self, request, context):
+        return self.core.UpdateDriverLocation(request, context)
+
+    async def CancelRide(self, request, context):
+        return self.core.CancelRide(request, context)
+
+    async def GetServerStats(self, request, context):
+        return self.core.GetServerStats(request, context)
+
+    async def StreamStateLog(self, request, context):
+        state_log = self.core.state_log
+        if state_log is None:
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, 'Start the server with --replicate to serve standbys')
+        loop = asyncio.get_running_loop()
+        batches = asyncio.Queue()
+
+        def sink(batch):
+            # Called on the state log's thread
+            if batches.qsize() >= REPLICATION_BACKLOG:
+                raise queue.Full()
+            loop.call_soon_threadsafe(batches.put_nowait, batch)
+
+        # Encoding the snapshot can take a while for a big store, so keep it off the loop
+        snapshot = await loop.run_in_executor(None, state_log.subscribe, sink)
+        print(f"[Server] Standby on port {request.standby_port} is following the state log.")
+        try:
+            for batch in snapshot:
+                yield ride_sharing_pb2.StateLogBatch(**batch)
+            while True:
+                try:
+                    batch = await asyncio.wait_for(batches.get(), timeout=REPLICATION_IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    return
+                yield ride_sharing_pb2.StateLogBatch(**batch)
+        finally:
+            state_log.unsubscribe(sink)
+            print(f"[Server] Standby on port {request.standby_port} stopped following the state log.")
+
+    async def SubscribeRideOffers(self, request, context):
+        driver_id = request.driver_id
+        offers = asyncio.Queue()
+        sink = self._sink(offers)
+        offer = self.core.open_offer_stream(driver_id, sink)
+        try:
+            if offer.ride_id:
+                yield offer
+            while True:
+                try:
+                    offer = await asyncio.wait_for(offers.get(), timeout=self.core.keepalive_interval)
+                except asyncio.TimeoutError:
+                    yield ride_sharing_pb2.AssignedRideDetails()  # Keepalive
+                    continue
+                if offer is None:
+                    return
+                yield offer
+        finally:
+            self.core.close_offer_stream(driver_id, sink)
+
+    async def WatchRide(self, request, context):
+        updates = asyncio.Queue()
+        sink = self._sink(updates)
+        current, watching = self.core.open_ride_watch(request.ride_id, sink)
+        yield current
+        if not watching:
+            return
+        try:
+            while True:
+                update = await updates.get()
+                if update is None:
+                    return
+                yield update
+        finally:
+            self.core.ride_watchers.unsubscribe(request.ride_id, sink)
+
+    @staticmethod
+    def _sink(target):
+        # Publishers may run on other threads (batch dispatcher), so hand messages to the loop
+        loop = asyncio.get_running_loop()
+        return lambda message: loop.call_soon_threadsafe(target.put_nowait, message)
+
+
+SERVER_OPTIONS = [
+    ('grpc.keepalive_time_ms', 30000),  # Ping idle streaming clients so dead drivers are noticed
+    ('grpc.keepalive_timeout_ms', 10000),
+    ('grpc.http2.min_ping_interval_without_data_ms', 10000),
+]
+
+def load_server_credentials():
     # Load SSL certificates for server
     with open('../certificates/server.crt', 'rb') as f:
         server_cert = f.read()
@@ -198,27 +893,274 @@ def serve():
         ca_cert = f.read()
 
     # Use mTLS for mutual authentication (client and server)
-    server_credentials = grpc.ssl_server_credentials(
+    return grpc.ssl_server_credentials(
         [(private_key, server_cert)],
         root_certificates=ca_cert,
         require_client_auth=True
     )
 
+def start_exporter(service, metrics_file=None, metrics_port=None):
+    # Optional Prometheus text dump of the service's gauges and RPC metrics
+    if not (metrics_file or metrics_port):
+        return None
+    targets = [target for target in (metrics_file, metrics_port and f"http://localhost:{metrics_port}/metrics") if target]
+    print(f"[Server] Exporting metrics to {' and '.join(targets)}")
+    return PrometheusExporter(service.prometheus_text, path=metrics_file, port=metrics_port).start()
+
+def start_reporter(port, collect, load_balancer=DEFAULT_LOAD_BALANCER, report_interval=DEFAULT_REPORT_INTERVAL):
+    # Heartbeats to the load balancer; an interval of 0 turns them off
+    if not load_balancer or not report_interval:
+        return None
+    return LoadReporter(port, collect, address=load_balancer, interval=report_interval).start()
+
+def open_state_log(state_dir, state_sync_interval=DEFAULT_SYNC_INTERVAL, replicate=False):
+    # Rides and drivers survive a restart only when they are logged to a state directory;
+    # a log kept only in memory is enough to feed standbys
+    if not (state_dir or replicate):
+        return None
+    return StateLog(state_dir, sync_interval=state_sync_interval)
+
+def start_standby(port, service, primary_port, load_balancer=DEFAULT_LOAD_BALANCER, report_interval=DEFAULT_REPORT_INTERVAL):
+    # Standby mode: the service's state log follows the primary, and the standby's load reports
+    # name the primary it covers. Returns an Event that is set once the load balancer answers
+    # "promote" because the primary's heartbeats stopped, and the standby's reporter.
+    service.state_log.load()  # Opens a state directory; its old records are replaced by the primary's
+    replica = service.replica = StandbyReplica(primary_port, service.state_log, port).start()
+    promoted = threading.Event()
+
+    def on_status(status):
+        if status == 'promote':
+            promoted.set()
+
+    def collect():
+        return {'standby_for': str(primary_port), 'replication_lag_seconds': replica.lag()}
+
+    reporter = LoadReporter(port, collect, address=load_balancer, interval=report_interval, on_status=on_status).start()
+    print(f"[Server] Standby for the server on port {primary_port}; port {port} opens once it takes over")
+    return promoted, reporter
+
+def promote_standby(service, reporter):
+    reporter.stop()
+    service.replica.promote()
+    primary_port = service.replica.primary_port
+    service.replica = None
+    print(f"[Server] The server on port {primary_port} stopped reporting; taking over")
+    service.recover(source=f'the replica of port {primary_port}')
+
+def interrupt(signum, frame):
+    # SIGTERM, e.g. from serve_sharded or a process manager, shuts the server down like Ctrl+C
+    raise KeyboardInterrupt
+
+def serve(port, max_workers=DEFAULT_MAX_WORKERS, metrics_file=None, metrics_port=None,
+          load_balancer=DEFAULT_LOAD_BALANCER, report_interval=DEFAULT_REPORT_INTERVAL,
+          state_dir=None, state_sync_interval=DEFAULT_SYNC_INTERVAL, replicate=False, standby_of=None, **service_options):
+    signal.signal(signal.SIGTERM, interrupt)
+    metrics = ServerMetrics()
+    executor = CountingExecutor(metrics, max_workers=max_workers)  # Counts calls waiting for a free worker thread
+    server = grpc.server(executor, options=SERVER_OPTIONS, interceptors=[MetricsInterceptor(metrics)])
+
     # Add RideSharing service to the server
-    ride_sharing_pb2_grpc.add_RideSharingServiceServicer_to_server(RideSharingService(), server)
+    state_log = open_state_log(state_dir, state_sync_interval, replicate or standby_of)
+    # Keep some workers for unary calls; drivers and riders refused a stream poll instead
+    max_streams = max_workers - max(1, int(max_workers * UNARY_WORKER_SHARE))
+    service = RideSharingService(metrics=metrics, state_log=state_log, max_streams=max_streams, **service_options)
+    ride_sharing_pb2_grpc.add_RideSharingServiceServicer_to_server(service, server)
+    exporter = start_exporter(service, metrics_file, metrics_port)
+    if standby_of:
+        promoted, standby_reporter = start_standby(port, service, standby_of, load_balancer, report_interval)
+        try:
+            promoted.wait()
+        except KeyboardInterrupt:
+            standby_reporter.stop()
+            if exporter is not None:
+                exporter.stop()
+            return
+        promote_standby(service, standby_reporter)
+    else:
+        service.recover()  # Before serving, so no call sees a half-restored store
 
     # Use the provided port from command-line arguments
-    server.add_secure_port(f'[::]:{port}', server_credentials)
+    server.add_secure_port(f'[::]:{port}', load_server_credentials())
 
     server.start()
     print(f"[Server] Ride Sharing Service is running on port {port}...")
+
+    reporter = start_reporter(port, service.load_report, load_balancer, report_interval)
     
     try:
         while True:
             time.sleep(86400)  # Keep the server running
     except KeyboardInterrupt:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)  # A later SIGTERM must not cut the shutdown short
+        if reporter is not None:
+            reporter.stop()
+        service.stopping = True
         server.stop(0)
+        if exporter is not None:
+            exporter.stop()
+        with service.lock:
+            service.archive.close()  # Writes out the finished rides still buffered
+        if state_log is not None:
+            state_log.close()
+
+async def serve_async(port, metrics_file=None, metrics_port=None,
+                      load_balancer=DEFAULT_LOAD_BALANCER, report_interval=DEFAULT_REPORT_INTERVAL,
+                      state_dir=None, state_sync_interval=DEFAULT_SYNC_INTERVAL, replicate=False, standby_of=None,
+                      **service_options):
+    # Every RPC and every stream is a coroutine on one event loop, so open streams cost no threads
+    metrics = ServerMetrics()
+    server = grpc.aio.server(options=SERVER_OPTIONS, interceptors=[AsyncMetricsInterceptor(metrics)])
+    state_log = open_state_log(state_dir, state_sync_interval, replicate or standby_of)
+    core = RideSharingService(scheduler=AsyncioScheduler(), metrics=metrics, state_log=state_log, **service_options)
+    ride_sharing_pb2_grpc.add_RideSharingServiceServicer_to_server(AsyncRideSharingService(core), server)
+    exporter = start_exporter(core, metrics_file, metrics_port)
+    if standby_of:
+        promoted, standby_reporter = start_standby(port, core, standby_of, load_balancer, report_interval)
+        try:
+            while not promoted.is_set():
+                await asyncio.sleep(0.1)
+        finally:
+            if not promoted.is_set():
+                standby_reporter.stop()
+                if exporter is not None:
+                    exporter.stop()
+        promote_standby(core, standby_reporter)
+    else:
+        core.recover()
+    server.add_secure_port(f'[::]:{port}', load_server_credentials())
+
+    await server.start()
+    print(f"[Server] Ride Sharing Service (asyncio) is running on port {port}...")
+    reporter = start_reporter(port, core.load_report, load_balancer, report_interval)
+    stopped = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)  # Shut down like Ctrl+C
+    try:
+        await stopped.wait()
+    finally:
+        if reporter is not None:
+            reporter.stop()
+        core.stopping = True
+        await server.stop(0)
+        if exporter is not None:
+            exporter.stop()
+        with core.lock:
+            core.archive.close()  # Writes out the finished rides still buffered
+        if state_log is not None:
+            state_log.close()
+
+def run_worker(index, ports, table_name, use_async, max_workers, server_options, service_options):
+    # Entry point of one worker process of a sharded server. server_options are the
+    # metrics and load report settings; service_options go to RideSharingService.
+    table = ShardTable(len(ports), name=table_name)
+    shard = WorkerShard(index, ports, table)
+    if service_options.get('archive_file'):
+        service_options['archive_file'] = f"{service_options['archive_file']}.{index}"  # One file per worker
+    if service_options.get('state_dir'):
+        service_options['state_dir'] = os.path.join(service_options['state_dir'], f'worker-{index}')
+    if server_options.get('metrics_file'):
+        root, extension = os.path.splitext(server_options['metrics_file'])
+        server_options['metrics_file'] = f"{root}.{index}{extension}"  # metrics.prom -> metrics.0.prom
+    if server_options.get('metrics_port'):
+        server_options['metrics_port'] = int(server_options['metrics_port']) + index
+    try:
+        if use_async:
+            asyncio.run(serve_async(ports[index], shard=shard, **server_options, **service_options))
+        else:
+            serve(ports[index], max_workers=max_workers, shard=shard, **server_options, **service_options)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        table.close()
+
+def serve_sharded(port, workers, use_async=False, max_workers=DEFAULT_MAX_WORKERS, metrics_file=None, metrics_port=None,
+                  load_balancer=DEFAULT_LOAD_BALANCER, report_interval=DEFAULT_REPORT_INTERVAL, **service_options):
+    # One process per worker, each on its own port (port, port + 1, ...) and its own GIL.
+    # Drivers are split across workers by driver ID; a ride is matched on the worker of its driver.
+    ports = [str(int(port) + i) for i in range(workers)]
+    table = ShardTable(workers)
+    context = multiprocessing.get_context('spawn')  # Workers must not inherit the parent's gRPC state
+    processes = [
+        context.Process(target=run_worker, name=f'ride-worker-{i}',
+                        args=(i, ports, table.name, use_async, max_workers,
+                              dict(metrics_file=metrics_file, metrics_port=metrics_port,
+                                   load_balancer=load_balancer, report_interval=report_interval), service_options))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    print(f"[Server] Started {workers} worker processes on ports {' '.join(ports)}")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+    finally:
+        table.close()
+        table.unlink()
 
 if __name__ == '__main__':
-    serve()
+    parser = argparse.ArgumentParser(description="Start a ride-sharing server.")
+    parser.add_argument('port', help='Port to serve on, e.g., 5050')
+    parser.add_argument('--accept-timeout', type=float, default=DEFAULT_ACCEPT_TIMEOUT,
+                        help='Seconds a driver has to accept an assigned ride before it is reassigned')
+    parser.add_argument('--rejection-ttl', type=float, default=DEFAULT_REJECTION_TTL,
+                        help='Seconds the drivers who rejected a ride are remembered for it')
+    parser.add_argument('--queue-timeout', type=float, default=DEFAULT_QUEUE_TIMEOUT,
+                        help='Seconds a rejected ride waits for a free driver before it is cancelled')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help='Worker threads; each open offer or ride status stream holds one, up to 80%% of them')
+    parser.add_argument('--archive-retention', type=float, default=DEFAULT_ARCHIVE_RETENTION,
+                        help='Seconds a finished ride can still be looked up with GetRideStatus')
+    parser.add_argument('--archive-file', help='Append every finished ride to this JSON-lines file')
+    parser.add_argument('--state-dir',
+                        help='Log rides and drivers to this directory and recover them from it on startup')
+    parser.add_argument('--state-sync-ms', type=float, default=DEFAULT_SYNC_INTERVAL * 1000,
+                        help='Milliseconds between fsynced batches of the state log')
+    parser.add_argument('--replicate', action='store_true',
+                        help='Keep a state log (in memory unless --state-dir is given) that standbys can follow')
+    parser.add_argument('--standby-of', metavar='PORT',
+                        help='Run as a standby that replicates the server on PORT and replaces it when its heartbeats stop')
+    parser.add_argument('--batch-window-ms', type=float,
+                        help='Collect ride requests for this many milliseconds and match them together')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Serve with grpc.aio on an event loop instead of a thread pool')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes, served on consecutive ports starting at port')
+    parser.add_argument('--metrics-file', help='Rewrite this file with Prometheus text metrics every 15 seconds')
+    parser.add_argument('--metrics-port', type=int, help='Serve Prometheus text metrics over HTTP on this port')
+    parser.add_argument('--load-balancer', default=DEFAULT_LOAD_BALANCER, help='Address of the load balancer to send load reports to')
+    parser.add_argument('--report-interval', type=float, default=DEFAULT_REPORT_INTERVAL,
+                        help='Seconds between load reports to the load balancer; 0 disables them')
+    args = parser.parse_args()
+    if (args.replicate or args.standby_of) and args.workers > 1:
+        parser.error('--replicate and --standby-of work with a single server process, not with --workers')
+    if args.standby_of and not (args.load_balancer and args.report_interval):
+        parser.error('--standby-of needs load reports; the load balancer decides when the standby takes over')
 
+    service_options = dict(
+        accept_timeout=args.accept_timeout,
+        rejection_ttl=args.rejection_ttl,
+        queue_timeout=args.queue_timeout,
+        archive_retention=args.archive_retention,
+        archive_file=args.archive_file,
+        batch_window=args.batch_window_ms / 1000 if args.batch_window_ms else None,
+        state_dir=args.state_dir,
+        state_sync_interval=args.state_sync_ms / 1000,
+        replicate=args.replicate,
+        standby_of=args.standby_of,
+    )
+    server_options = dict(metrics_file=args.metrics_file, metrics_port=args.metrics_port,
+                          load_balancer=args.load_balancer, report_interval=args.report_interval)
+    if args.workers > 1:
+        serve_sharded(args.port, args.workers, use_async=args.use_async, max_workers=args.max_workers,
+                      **server_options, **service_options)
+    elif args.use_async:
+        try:
+            asyncio.run(serve_async(args.port, **server_options, **service_options))
+        except KeyboardInterrupt:
+            pass
+    else:
+        serve(args.port, max_workers=args.max_workers, **server_options, **service_options)
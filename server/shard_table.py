@@ -0,0 +1,68 @@
+# shard_table.py
+
+import zlib
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def shard_for(key, shards):
+    # Stable across processes and restarts, unlike the salted built-in hash()
+    return zlib.crc32(key.encode()) % shards
+
+
+class ShardTable:
+    # One int64 slot per worker process in a shared memory block, holding that worker's
+    # available driver count. Every worker writes only its own slot, so no lock is needed;
+    # a reader may see a count that is a moment old, which is fine for routing hints.
+    def __init__(self, shards, name=None):
+        create = name is None
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=shards * 8)
+        self.name = self._shm.name
+        self.counts = np.ndarray((shards,), dtype=np.int64, buffer=self._shm.buf)
+        if create:
+            self.counts[:] = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def set(self, shard, count):
+        self.counts[shard] = count
+
+    def most_available(self, exclude=None):
+        # Shard with the most free drivers other than exclude, or None if nobody has one
+        counts = self.counts.copy()
+        if exclude is not None:
+            counts[exclude] = 0
+        shard = int(np.argmax(counts))
+        return shard if counts[shard] > 0 else None
+
+    def close(self):
+        self.counts = None  # Release the buffer export before closing the mapping
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+
+class WorkerShard:
+    # What one worker process knows about the others: every worker's port and the shared
+    # availability table. Drivers belong to the worker picked by shard_for(driver_id).
+    def __init__(self, index, ports, table):
+        self.index = index
+        self.ports = ports
+        self.table = table
+
+    def owner_port(self, driver_id):
+        return self.ports[shard_for(driver_id, len(self.ports))]
+
+    def owns(self, driver_id):
+        return shard_for(driver_id, len(self.ports)) == self.index
+
+    def publish(self, available):
+        self.table.set(self.index, available)
+
+    def redirect_port(self):
+        # Port of the worker with the most free drivers, or '' if no other worker has any
+        shard = self.table.most_available(exclude=self.index)
+        return self.ports[shard] if shard is not None else ''
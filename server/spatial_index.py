@@ -0,0 +1,129 @@
+# spatial_index.py
+
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+DEFAULT_CELL_SIZE = 0.01  # Degrees per grid cell, roughly 1 km of latitude
+MAX_RING_SEARCH = 64  # Past this many rings a full vectorized scan is cheaper than walking empty cells
+
+
+def parse_location(text):
+    # Accepts "lat,lng" and returns (lat, lng), or None for free-form locations
+    try:
+        lat, lng = (float(part) for part in text.split(','))
+    except (AttributeError, ValueError):
+        return None
+    if -90 <= lat <= 90 and -180 <= lng <= 180:
+        return lat, lng
+    return None
+
+
+def haversine_km(lat, lng, lats, lngs):
+    # Great-circle distance from one point to arrays of points
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    # Buckets ids into square lat/lng cells. A nearest-neighbour query walks rings of cells
+    # outwards from the query cell and stops once no unvisited cell can hold anything closer
+    # than the k-th best candidate found so far. Candidates are ranked with NumPy.
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = {}  # (row, col) -> {id: (lat, lng)}
+        self._where = {}  # id -> (row, col)
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, item_id):
+        return item_id in self._where
+
+    def _cell(self, lat, lng):
+        return int(math.floor(lat / self.cell_size)), int(math.floor(lng / self.cell_size))
+
+    def insert(self, item_id, lat, lng):
+        self.remove(item_id)
+        cell = self._cell(lat, lng)
+        self._cells.setdefault(cell, {})[item_id] = (lat, lng)
+        self._where[item_id] = cell
+
+    def remove(self, item_id):
+        cell = self._where.pop(item_id, None)
+        if cell is None:
+            return False
+        bucket = self._cells[cell]
+        del bucket[item_id]
+        if not bucket:
+            del self._cells[cell]
+        return True
+
+    def nearest(self, lat, lng, k=1, exclude=()):
+        # Returns up to k (id, distance_km) pairs, closest first
+        if not self._where:
+            return []
+        row, col = self._cell(lat, lng)
+        # Smallest width of one ring of cells in km; longitude cells narrow towards the poles
+        ring_km = self.cell_size * KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + self.cell_size, 90))), 0.01)
+        ids, lats, lngs = [], [], []
+        seen = 0
+        ring = 0
+        while True:
+            if ring > MAX_RING_SEARCH:
+                return self._rank(lat, lng, *self._all_points(exclude), k)
+            for cell in self._ring_cells(row, col, ring):
+                bucket = self._cells.get(cell)
+                if bucket:
+                    seen += len(bucket)
+                    for item_id, (item_lat, item_lng) in bucket.items():
+                        if item_id not in exclude:
+                            ids.append(item_id)
+                            lats.append(item_lat)
+                            lngs.append(item_lng)
+            if seen == len(self._where):
+                break
+            if len(ids) >= k:
+                best = self._rank(lat, lng, ids, lats, lngs, k)
+                # Anything in ring + 1 or beyond is at least ring * ring_km away
+                if best[-1][1] <= ring * ring_km:
+                    return best
+            ring += 1
+        return self._rank(lat, lng, ids, lats, lngs, k)
+
+    def _all_points(self, exclude):
+        ids, lats, lngs = [], [], []
+        for bucket in self._cells.values():
+            for item_id, (item_lat, item_lng) in bucket.items():
+                if item_id not in exclude:
+                    ids.append(item_id)
+                    lats.append(item_lat)
+                    lngs.append(item_lng)
+        return ids, lats, lngs
+
+    @staticmethod
+    def _rank(lat, lng, ids, lats, lngs, k):
+        if not ids:
+            return []
+        distances = haversine_km(lat, lng, np.asarray(lats), np.asarray(lngs))
+        if len(ids) > k:
+            order = np.argpartition(distances, k - 1)[:k]
+            order = order[np.argsort(distances[order])]
+        else:
+            order = np.argsort(distances)
+        return [(ids[i], float(distances[i])) for i in order]
+
+    @staticmethod
+    def _ring_cells(row, col, ring):
+        if ring == 0:
+            yield row, col
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield row - ring, c
+            yield row + ring, c
+        for r in range(row - ring + 1, row + ring):
+            yield r, col - ring
+            yield r, col + ring
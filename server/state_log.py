@@ -0,0 +1,328 @@
+# state_log.py
+
+import json
+import os
+import pickle
+import re
+import threading
+import time
+
+DEFAULT_SYNC_INTERVAL = 0.05  # Seconds between group commits of the write-ahead log
+DEFAULT_SNAPSHOT_EVERY = 100000  # Logged records between compact snapshots
+SNAPSHOT_CHUNK = 10000  # Records per message when the state is sent to a standby
+SNAPSHOT_FILE = 'snapshot.pkl'
+LOG_FILE = re.compile(r'^wal\.(\d+)\.log$')
+
+
+class StateLog:
+    # Durable copy of the active rides and registered drivers of one RideSharingService.
+    # The service only marks the rides and drivers a transition changed; once per sync
+    # interval a background thread captures their current records under the service lock,
+    # appends them to the write-ahead log as one batch closed by a commit marker and fsyncs
+    # the file. A ride that changes several times within an interval costs one record.
+    # The log keeps the latest record of everything it wrote, so every snapshot_every
+    # records it starts a new log file and dumps those records as a snapshot without
+    # touching the service lock. Recovery reads one snapshot and replays at most about
+    # snapshot_every records, however long the history behind them.
+    #
+    # Layout: snapshot.pkl holds the state as of the start of wal.<generation>.log; later
+    # log files are replayed in order, and a batch without its commit marker is ignored.
+    # Without a directory nothing is written to disk and the log only feeds standbys.
+    #
+    # Standbys subscribe with a sink: they get the current records as a snapshot, then every
+    # committed batch, and an empty heartbeat batch in every interval without changes. On a
+    # standby, apply() takes those batches in place of the service's own changes.
+    def __init__(self, directory=None, sync_interval=DEFAULT_SYNC_INTERVAL, snapshot_every=DEFAULT_SNAPSHOT_EVERY):
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.rides = {}  # ride_id -> record, as of the last committed batch
+        self.drivers = {}  # driver_id -> record
+        self._changed_rides = set()  # Marked with the service lock held
+        self._changed_drivers = set()
+        self._generation = 0
+        self._file = None
+        self._since_snapshot = 0
+        self._flush_lock = threading.Lock()  # One batch or snapshot is written at a time
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = None
+        self._capture = None
+        self._loaded = False
+        self._sinks = []  # sink(batch) of each standby following the log
+        self.sequence = 0  # Batches committed, or applied on a standby
+        self.batches = 0
+        self.records = 0
+        self.snapshots = 0
+        self.recovery = None  # Filled in by load()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def ride_changed(self, ride_id):
+        self._changed_rides.add(ride_id)
+
+    def driver_changed(self, driver_id):
+        self._changed_drivers.add(driver_id)
+
+    def load(self):
+        # Reads the snapshot, replays the committed batches logged after it and returns
+        # (rides, drivers). The newest log file is cut back to its last commit marker and
+        # stays open for appending. Later calls return the records as they are now.
+        if not self._loaded:
+            started = time.perf_counter()
+            snapshot, replayed = self._load_files() if self.directory is not None else (False, 0)
+            self._loaded = True
+            self.recovery = {
+                'seconds': time.perf_counter() - started,
+                'snapshot': snapshot,
+                'replayed_records': replayed,
+                'rides': len(self.rides),
+                'drivers': len(self.drivers),
+            }
+        return dict(self.rides), dict(self.drivers)
+
+    def _load_files(self):
+        # Returns whether there was a snapshot and how many logged records were replayed
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        has_snapshot = os.path.exists(snapshot_path)
+        if has_snapshot:
+            with open(snapshot_path, 'rb') as f:
+                snapshot = pickle.load(f)
+            self._generation = snapshot['generation']
+            self.rides = snapshot['rides']
+            self.drivers = snapshot['drivers']
+        replayed = 0
+        end = 0
+        for generation in self._log_generations():
+            if generation < self._generation:
+                os.remove(self._log_path(generation))  # Already covered by the snapshot
+                continue
+            count, end = self._replay(self._log_path(generation))
+            replayed += count
+            self._generation = generation
+        path = self._log_path(self._generation)
+        if os.path.exists(path) and os.path.getsize(path) > end:
+            os.truncate(path, end)  # Drop a batch torn by the crash
+        self._file = open(path, 'ab')
+        self._since_snapshot = replayed
+        return has_snapshot, replayed
+
+    def start(self, lock, capture):
+        # capture(ride_ids, driver_ids) returns ({ride_id: record}, {driver_id: record}) with
+        # None for those that are gone; it is called with lock held, the same lock the
+        # service holds whenever it marks a change
+        self.load()
+        self._lock = lock
+        self._capture = capture
+        self._thread = threading.Thread(target=self._run, name='state-log', daemon=True)
+        self._thread.start()
+        return self
+
+    def flush(self):
+        # Commits one batch of everything marked since the previous one; returns its record count
+        with self._flush_lock:
+            lines = self._collect()
+            if lines:
+                self._commit(lines)
+            elif self._sinks:
+                self._publish(b'')  # Heartbeat, so a standby can tell a quiet primary from a lost one
+            return len(lines)
+
+    def apply(self, records, reset=False, sequence=None):
+        # On a standby: applies a batch of JSON-lines records received from the primary;
+        # reset replaces every record, as the first batch of a new stream does
+        lines = [line for line in records.decode().split('\n') if line]
+        with self._flush_lock:
+            if reset:
+                self.rides.clear()
+                self.drivers.clear()
+            self._apply(json.loads(line) for line in lines)
+            if self._file is not None:
+                if reset:
+                    self._snapshot()  # The replica no longer follows from the old log files
+                elif lines:
+                    self._write(lines)
+            if lines:
+                self.batches += 1
+                self.records += len(lines)
+            if sequence is not None:
+                self.sequence = sequence
+
+    def subscribe(self, sink, chunk=SNAPSHOT_CHUNK):
+        # Returns the current records as snapshot batches of up to chunk records each; sink
+        # receives every batch committed after them. A sink that raises is dropped.
+        with self._flush_lock:
+            lines = [json.dumps([kind, key, record], separators=(',', ':'))
+                     for kind, latest in (('r', self.rides), ('d', self.drivers)) for key, record in latest.items()]
+            parts = [lines[i:i + chunk] for i in range(0, len(lines), chunk)] or [[]]
+            snapshot = [self._batch('\n'.join(part).encode(), reset=i == 0, partial=i < len(parts) - 1)
+                        for i, part in enumerate(parts)]
+            self._sinks.append(sink)
+        return snapshot
+
+    def unsubscribe(self, sink):
+        with self._flush_lock:
+            if sink in self._sinks:
+                self._sinks.remove(sink)
+
+    def standby_count(self):
+        return len(self._sinks)
+
+    def _collect(self):
+        # The lines of the next batch: the current record of each marked ride and driver that
+        # differs from the last one logged
+        with self._lock:
+            ride_ids, driver_ids = self._changed_rides, self._changed_drivers
+            if not ride_ids and not driver_ids:
+                return []
+            self._changed_rides, self._changed_drivers = set(), set()
+            rides, drivers = self._capture(ride_ids, driver_ids)
+
+        lines = []
+        for kind, records, latest in (('r', rides, self.rides), ('d', drivers, self.drivers)):
+            for key, record in records.items():
+                if record is None:
+                    if latest.pop(key, None) is None:
+                        continue  # Created and gone within one interval, never logged
+                elif latest.get(key) == record:
+                    continue
+                else:
+                    latest[key] = record
+                lines.append(json.dumps([kind, key, record], separators=(',', ':')))
+        return lines
+
+    def _commit(self, lines):
+        # Called with self._flush_lock held. Standbys get a batch only once it is on disk here.
+        if self._file is not None:
+            self._write(lines)
+        self.sequence += 1
+        self.batches += 1
+        self.records += len(lines)
+        if self._sinks:
+            self._publish('\n'.join(lines).encode())
+
+    def _write(self, lines):
+        self._file.write(('\n'.join(lines) + '\n["c"]\n').encode())
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._since_snapshot += len(lines)
+        if self._since_snapshot >= self.snapshot_every:
+            self._snapshot()
+
+    def _batch(self, records, reset=False, partial=False):
+        # Fields of a StateLogBatch message
+        return {'sequence': self.sequence, 'records': records, 'reset': reset, 'partial': partial,
+                'committed_at': time.time()}
+
+    def _publish(self, records):
+        batch = self._batch(records)
+        for sink in list(self._sinks):
+            try:
+                sink(batch)
+            except Exception as e:
+                self._sinks.remove(sink)
+                print(f"[State Log] Dropped a standby that fell behind: {e!r}")
+
+    def snapshot(self):
+        with self._flush_lock:
+            self._snapshot()
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'records': self.records,
+            'snapshots': self.snapshots,
+            'records_since_snapshot': self._since_snapshot,
+            'generation': self._generation,
+        }
+
+    def close(self):
+        # Stops the writer and commits whatever is still marked
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+            self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        while not self._stopped.wait(self.sync_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[State Log] Write failed: {e}")
+
+    def _snapshot(self):
+        # Opens the next log file first, so a crash before the snapshot is in place leaves
+        # the old snapshot and both log files to replay
+        generation = self._generation + 1
+        self._file.close()
+        self._file = open(self._log_path(generation), 'ab')
+        previous = self._generation
+        self._generation = generation
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump({'generation': generation, 'rides': self.rides, 'drivers': self.drivers,
+                         'created': time.time()}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+        self._sync_directory()
+        for old in self._log_generations():
+            if old <= previous:
+                os.remove(self._log_path(old))
+        self._since_snapshot = 0
+        self.snapshots += 1
+
+    def _replay(self, path):
+        # Applies the committed batches of one log file; returns (records applied, byte
+        # offset just past the last commit marker)
+        applied = 0
+        end = 0
+        offset = 0
+        batch = []
+        with open(path, 'rb') as f:
+            for line in f:
+                offset += len(line)
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry[0] != 'c':
+                    batch.append(entry)
+                    continue
+                self._apply(batch)
+                applied += len(batch)
+                batch = []
+                end = offset
+        return applied, end
+
+    def _apply(self, entries):
+        for kind, key, record in entries:
+            latest = self.rides if kind == 'r' else self.drivers
+            if record is None:
+                latest.pop(key, None)
+            else:
+                latest[key] = record
+
+    def _log_generations(self):
+        generations = []
+        for name in os.listdir(self.directory):
+            match = LOG_FILE.match(name)
+            if match:
+                generations.append(int(match.group(1)))
+        return sorted(generations)
+
+    def _log_path(self, generation):
+        return os.path.join(self.directory, f'wal.{generation}.log')
+
+    def _sync_directory(self):
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
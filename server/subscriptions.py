@@ -0,0 +1,44 @@
+# subscriptions.py
+
+import threading
+
+
+class Subscriptions:
+    # Maps a key (driver id, ride id, ...) to the sinks listening on it. A sink is any
+    # callable taking one message, e.g. queue.Queue.put for a streaming RPC handler.
+    # Publishing never blocks on a slow subscriber. Closing a key sends None to its sinks.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sinks = {}
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._sinks
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(sinks) for sinks in self._sinks.values())
+
+    def subscribe(self, key, sink):
+        with self._lock:
+            self._sinks.setdefault(key, set()).add(sink)
+
+    def unsubscribe(self, key, sink):
+        with self._lock:
+            sinks = self._sinks.get(key)
+            if sinks is not None:
+                sinks.discard(sink)
+                if not sinks:
+                    del self._sinks[key]
+
+    def publish(self, key, message):
+        with self._lock:
+            sinks = list(self._sinks.get(key, ()))
+        for sink in sinks:
+            sink(message)
+
+    def close(self, key):
+        with self._lock:
+            sinks = self._sinks.pop(key, ())
+        for sink in sinks:
+            sink(None)
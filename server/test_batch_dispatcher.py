@@ -0,0 +1,77 @@
+import itertools
+
+import numpy as np
+
+from batch_dispatcher import solve_assignment
+
+
+def brute_force(cost):
+    # Cheapest total over every way of matching the smaller side completely
+    rows, cols = cost.shape
+    if rows <= cols:
+        return min(sum(cost[row, col] for row, col in enumerate(perm)) for perm in itertools.permutations(range(cols), rows))
+    return min(sum(cost[row, col] for col, row in enumerate(perm)) for perm in itertools.permutations(range(rows), cols))
+
+
+def total(cost, pairs):
+    return sum(cost[row, col] for row, col in pairs)
+
+
+def check_matching(pairs, rows, cols):
+    assert len({row for row, _ in pairs}) == len(pairs) == min(rows, cols)
+    assert len({col for _, col in pairs}) == len(pairs)
+
+
+def test_matches_brute_force_on_small_matrices():
+    rng = np.random.default_rng(7)
+    for _ in range(200):
+        size = int(rng.integers(1, 7))
+        cost = rng.uniform(0, 10, (size, size))
+        if rng.random() < 0.3:
+            cost = np.round(cost)  # Ties
+
+        pairs = solve_assignment(cost)
+
+        check_matching(pairs, size, size)
+        assert np.isclose(total(cost, pairs), brute_force(cost))
+
+
+def test_rectangular_matrices():
+    rng = np.random.default_rng(11)
+    for rows, cols in [(2, 5), (3, 6), (1, 4), (5, 2), (6, 3)]:
+        cost = rng.uniform(0, 10, (rows, cols))
+
+        pairs = solve_assignment(cost)
+
+        check_matching(pairs, rows, cols)
+        assert np.isclose(total(cost, pairs), brute_force(cost))
+
+
+def test_more_drivers_than_rides_picks_the_close_ones():
+    cost = np.array([[9.0, 1.0, 8.0, 7.0],
+                     [2.0, 1.5, 9.0, 9.0]])
+
+    assert solve_assignment(cost) == [(0, 1), (1, 0)]
+
+
+def test_empty_matrix():
+    assert solve_assignment(np.empty((0, 3))) == []
+
+
+def test_infinite_costs_are_never_matched():
+    inf = np.inf
+
+    assert solve_assignment([[inf, 1.0], [2.0, inf]]) == [(0, 1), (1, 0)]
+    assert solve_assignment([[1.0, inf], [2.0, inf]]) in ([(0, 0)], [(1, 0)])
+    assert solve_assignment([[inf, inf], [1.0, 2.0]]) == [(1, 0)]
+    assert solve_assignment([[inf, inf], [inf, inf]]) == []
+
+
+def test_infinite_costs_keep_as_many_pairs_as_possible():
+    inf = np.inf
+    # Row 0 can only take column 0; the cheaper (1, 0) would leave it unmatched
+    cost = np.array([[5.0, inf, inf],
+                     [1.0, 3.0, inf],
+                     [inf, 2.0, 4.0]])
+
+    assert solve_assignment(cost) == [(0, 0), (1, 1), (2, 2)]
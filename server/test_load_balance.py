@@ -0,0 +1,32 @@
+import time
+
+import load_balancer_pb2
+from load_balance import LoadBalancer, driver_count
+
+
+def test_driver_exit_after_failover_counts_against_the_standby():
+    balancer = LoadBalancer(['7050', '7051'], heartbeat_timeout=0.05)
+    for driver_id in ('d1', 'd2'):
+        assert balancer.GetServerPortForDriver(load_balancer_pb2.DriverRequest(driver_id=driver_id), None).server_port in ('7050', '7051')
+    balancer.ReportLoad(load_balancer_pb2.LoadReport(port='7050', available_drivers=1), None)
+    balancer.ReportLoad(load_balancer_pb2.LoadReport(port='7051', available_drivers=1), None)
+    time.sleep(0.1)  # Both primaries stop reporting
+    report = load_balancer_pb2.LoadReport(port='7060', standby_for='7050', available_drivers=1, replication_lag_seconds=0.01)
+    assert balancer.ReportLoad(report, None).status == 'promote'
+
+    # d1 registered on 7050 and leaves after its standby took over
+    response = balancer.DriverExit(load_balancer_pb2.DriverExitRequest(driver_id='d1', port='7050'), None)
+
+    assert response.status == 'Driver unregistered successfully.'
+    assert '7050' not in driver_count
+    assert (driver_count['7060'], driver_count['7051']) == (0, 1)
+
+
+def test_driver_exit_from_unknown_port_is_ignored():
+    balancer = LoadBalancer(['7052'])
+    balancer.GetServerPortForDriver(load_balancer_pb2.DriverRequest(driver_id='d1'), None)
+
+    balancer.DriverExit(load_balancer_pb2.DriverExitRequest(driver_id='d2', port='9999'), None)
+
+    assert driver_count['7052'] == 1
+    assert '9999' not in driver_count
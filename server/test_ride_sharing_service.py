@@ -0,0 +1,339 @@
+import threading
+
+import pytest
+
+import ride_sharing_pb2
+from metrics_interceptor import ServerMetrics, CountingExecutor
+from ride_sharing_server import RideSharingService
+
+PICKUP = '12.9000,77.5900'
+
+
+@pytest.fixture
+def service():
+    # Long deadlines, so only the tests fire them
+    service = RideSharingService(accept_timeout=3600, queue_timeout=3600)
+    yield service
+    service.scheduler.stop()
+
+
+def register(service, driver_id, location=PICKUP):
+    service.RegisterDriver(ride_sharing_pb2.RegisterDriverRequest(driver_id=driver_id, location=location), None)
+
+
+def request_ride(service, rider_id='rider', pickup=PICKUP):
+    return service.RequestRide(ride_sharing_pb2.RideRequest(rider_id=rider_id, pickup_location=pickup, destination='12.98,77.60'), None)
+
+
+def accept(service, driver_id, ride_id):
+    return service.AcceptRide(ride_sharing_pb2.AcceptRideRequest(driver_id=driver_id, ride_id=ride_id), None).status
+
+
+def reject(service, driver_id, ride_id):
+    return service.RejectRide(ride_sharing_pb2.RejectRideRequest(driver_id=driver_id, ride_id=ride_id), None).status
+
+
+def two_offers(service):
+    # d1 is offered ride a and d2 ride b
+    register(service, 'd1')
+    register(service, 'd2', '12.9500,77.5900')
+    a = request_ride(service, 'rider-a').ride_id
+    b = request_ride(service, 'rider-b').ride_id
+    assert service.pending_offers == {'d1': a, 'd2': b}
+    return a, b
+
+
+def status(service, ride_id):
+    return service.GetRideStatus(ride_sharing_pb2.RideStatusRequest(ride_id=ride_id), None).status
+
+
+def queued_rides(service, count):
+    # count rides queued in request order, as reassign_ride queues a ride nobody can take
+    ride_ids = []
+    with service.lock:
+        for i in range(count):
+            ride_id = service.create_ride(ride_sharing_pb2.RideRequest(rider_id=f'rider-{i}', pickup_location=PICKUP,
+                                                                       destination='12.98,77.60'))
+            service.queue_ride(ride_id)
+            ride_ids.append(ride_id)
+    assert list(service.unassigned_rides) == ride_ids
+    return ride_ids
+
+
+def test_unregister_with_pending_offer_reassigns_ride(service):
+    register(service, 'd1')
+    register(service, 'd2', '12.9500,77.5900')
+    ride_id = request_ride(service).ride_id
+    assert service.pending_offers == {'d1': ride_id}
+
+    service.UnregisterDriver(ride_sharing_pb2.UnregisterDriverRequest(driver_id='d1'), None)
+
+    ride = service.rides[ride_id]
+    assert ride['assigned_driver'] == 'd2'
+    assert ride['timeout'] is not None
+    assert service.pending_offers == {'d2': ride_id}
+    assert service.drivers.status('d1') is None
+
+
+def test_unregister_last_driver_with_pending_offer_queues_ride(service):
+    register(service, 'd1')
+    ride_id = request_ride(service).ride_id
+
+    service.UnregisterDriver(ride_sharing_pb2.UnregisterDriverRequest(driver_id='d1'), None)
+
+    ride = service.rides[ride_id]
+    assert ride['status'] == 'waiting_for_driver'
+    assert ride['timeout'] is not None
+    assert list(service.unassigned_rides) == [ride_id]
+    assert service.pending_offers == {}
+
+
+def test_rejecting_driver_takes_queued_ride(service):
+    a, b = two_offers(service)
+    reject(service, 'd2', b)  # Nobody is free, b is queued
+    assert list(service.unassigned_rides) == [b]
+
+    reject(service, 'd1', a)  # a goes to d2, and the freed d1 takes b
+
+    assert service.pending_offers == {'d2': a, 'd1': b}
+    assert service.unassigned_rides == {}
+
+
+def test_timed_out_driver_takes_queued_ride(service):
+    a, b = two_offers(service)
+    reject(service, 'd2', b)
+
+    service.handle_acceptance_timeout(a, 'd1')
+
+    assert service.pending_offers == {'d2': a, 'd1': b}
+    assert service.unassigned_rides == {}
+
+
+def test_reregistering_driver_keeps_its_offer(service):
+    a, b = two_offers(service)
+    reject(service, 'd1', a)  # d2 holds b, so a is queued
+    assert list(service.unassigned_rides) == [a]
+
+    register(service, 'd2')
+
+    assert service.pending_offers == {'d2': b}
+    assert list(service.unassigned_rides) == [a]
+
+
+def test_completing_after_unregister_leaves_queued_ride(service):
+    a, b = two_offers(service)
+    accept(service, 'd1', a)
+    reject(service, 'd2', b)  # d1 is on a ride, so b is queued
+    service.UnregisterDriver(ride_sharing_pb2.UnregisterDriverRequest(driver_id='d1'), None)
+
+    status = service.CompleteRide(ride_sharing_pb2.RideCompletionRequest(driver_id='d1', ride_id=a), None).status
+
+    assert status == 'ride_completed'
+    assert service.pending_offers == {}
+    assert list(service.unassigned_rides) == [b]
+
+
+def test_server_stats_export_timeout_lateness():
+    service = RideSharingService(metrics=ServerMetrics())
+    service.scheduler.stop()
+    service.scheduler.stats = lambda: {'pending': 3, 'fired': 2, 'avg_lateness_ms': 1.5, 'max_lateness_ms': 4.0}
+
+    stats = service.GetServerStats(ride_sharing_pb2.ServerStatsRequest(), None)
+    text = service.prometheus_text()
+
+    assert (stats.pending_timeouts, stats.timeout_avg_lateness_ms, stats.timeout_max_lateness_ms) == (3, 1.5, 4.0)
+    assert 'ride_sharing_timeout_avg_lateness_ms 1.5' in text
+    assert 'ride_sharing_timeout_max_lateness_ms 4' in text
+
+
+def test_dropped_offer_stream_unregisters_driver(service):
+    a, b = two_offers(service)
+    service.open_offer_stream('d1', print)
+
+    service.close_offer_stream('d1', print)  # The driver crashed, no UnregisterDriver
+
+    assert service.drivers.status('d1') is None
+    assert service.pending_offers == {'d2': b}
+    assert list(service.unassigned_rides) == [a]
+
+
+def test_driver_with_another_open_stream_stays_registered(service):
+    register(service, 'd1')
+    service.open_offer_stream('d1', print)
+    service.open_offer_stream('d1', repr)
+
+    service.close_offer_stream('d1', print)
+
+    assert service.drivers.status('d1') == 'available'
+
+
+def test_streams_closed_by_shutdown_keep_drivers(service):
+    register(service, 'd1')
+    service.open_offer_stream('d1', print)
+    service.stopping = True
+
+    service.close_offer_stream('d1', print)
+
+    assert service.drivers.status('d1') == 'available'
+
+
+def test_load_report_counts_calls_waiting_for_a_worker():
+    metrics = ServerMetrics()
+    service = RideSharingService(metrics=metrics)
+    service.scheduler.stop()
+    executor = CountingExecutor(metrics, max_workers=1)
+    release = threading.Event()
+    running = threading.Event()
+    executor.submit(lambda: (running.set(), release.wait()))
+    running.wait()
+    waiting = [executor.submit(lambda: None) for _ in range(2)]
+
+    queued = service.load_report()['queued_rpcs']
+    release.set()
+    for future in waiting:
+        future.result()
+    executor.shutdown()
+
+    assert queued == 2
+    assert metrics.queued() == 0
+
+
+def test_request_without_drivers_keeps_no_ride(service):
+    response = request_ride(service)
+
+    assert response.status == 'no_drivers_available'
+    assert service.rides == {}
+
+
+def test_request_offers_nearest_driver(service):
+    register(service, 'far', '12.9900,77.5900')
+    register(service, 'near', '12.9010,77.5900')
+
+    response = request_ride(service)
+
+    assert (response.status, response.assigned_driver) == ('assigned', 'near')
+    assert service.drivers.status('near') == 'busy'
+    assert service.drivers.status('far') == 'available'
+    offer = service.GetAssignedRide(ride_sharing_pb2.AssignedRideRequest(driver_id='near'), None)
+    assert offer.ride_id == response.ride_id
+
+
+def test_accept_starts_ride(service):
+    register(service, 'd1')
+    ride_id = request_ride(service).ride_id
+
+    assert accept(service, 'd2', ride_id) == 'ride_already_accepted'  # Not the offered driver
+    assert accept(service, 'd1', ride_id) == 'ride_accepted'
+
+    assert status(service, ride_id) == 'in_progress'
+    assert service.rides[ride_id]['timeout'] is None
+    assert service.pending_offers == {}
+    assert service.drivers.status('d1') == 'busy'
+    assert accept(service, 'd1', ride_id) == 'ride_already_accepted'
+
+
+def test_reject_offers_ride_to_next_driver_only_once(service):
+    register(service, 'd1')
+    register(service, 'd2', '12.9500,77.5900')
+    ride_id = request_ride(service).ride_id
+
+    assert reject(service, 'd1', ride_id) == 'ride_rejected'
+    assert service.pending_offers == {'d2': ride_id}
+    assert service.drivers.status('d1') == 'available'
+
+    reject(service, 'd2', ride_id)  # Both drivers rejected it, so it waits for a third one
+
+    assert status(service, ride_id) == 'waiting_for_driver'
+    assert service.pending_offers == {}
+    assert reject(service, 'd2', ride_id) == 'no_such_ride'
+
+
+def test_acceptance_timeout_reassigns_and_ignores_stale_deadlines(service):
+    register(service, 'd1')
+    register(service, 'd2', '12.9500,77.5900')
+    ride_id = request_ride(service).ride_id
+
+    service.handle_acceptance_timeout(ride_id, 'd1')
+    assert service.pending_offers == {'d2': ride_id}
+
+    service.handle_acceptance_timeout(ride_id, 'd1')  # A deadline of the earlier offer firing late
+    assert service.pending_offers == {'d2': ride_id}
+    assert service.rides[ride_id]['assigned_driver'] == 'd2'
+
+
+def test_new_driver_takes_oldest_queued_ride(service):
+    first, second = queued_rides(service, 2)
+
+    register(service, 'd1')
+
+    assert service.pending_offers == {'d1': first}
+    assert list(service.unassigned_rides) == [second]
+    assert service.rides[first]['status'] == 'waiting_for_acceptance'
+
+
+def test_assign_ride_pulls_oldest_queued_ride(service):
+    first, second = queued_rides(service, 2)
+    register(service, 'busy')  # Takes first
+    accept(service, 'busy', first)
+
+    assert service.AssignRide(ride_sharing_pb2.AssignRideRequest(driver_id='busy'), None).ride_id == ''
+    service.drivers.register('idle')  # Registered without the automatic dispatch
+    assert service.AssignRide(ride_sharing_pb2.AssignRideRequest(driver_id='idle'), None).ride_id == second
+    assert service.unassigned_rides == {}
+
+
+def test_queue_timeout_cancels_ride(service):
+    ride_id, = queued_rides(service, 1)
+
+    service.handle_queue_timeout(ride_id)
+
+    assert status(service, ride_id) == 'cancelled'
+    assert ride_id not in service.rides
+    assert service.unassigned_rides == {}
+
+
+def test_complete_frees_driver_for_queued_ride(service):
+    register(service, 'd1')
+    ride_id = request_ride(service).ride_id
+    accept(service, 'd1', ride_id)
+    queued, = queued_rides(service, 1)
+
+    response = service.CompleteRide(ride_sharing_pb2.RideCompletionRequest(driver_id='d1', ride_id=ride_id), None)
+
+    assert response.status == 'ride_completed'
+    assert status(service, ride_id) == 'completed'
+    assert service.pending_offers == {'d1': queued}
+
+
+def test_cancel_queued_ride(service):
+    ride_id, = queued_rides(service, 1)
+
+    assert service.CancelRide(ride_sharing_pb2.CancelRideRequest(ride_id=ride_id, rider_id='someone-else'), None).status == 'no_such_ride'
+    assert service.CancelRide(ride_sharing_pb2.CancelRideRequest(ride_id=ride_id, rider_id='rider-0'), None).status == 'ride_cancelled'
+
+    assert status(service, ride_id) == 'cancelled'
+    assert service.unassigned_rides == {}
+    register(service, 'd1')
+    assert service.pending_offers == {}
+
+
+def test_restored_drivers_that_never_reconnect_are_dropped(service):
+    offered = ['rider', PICKUP, '12.98,77.60', 'ghost', 'waiting_for_acceptance', None, []]
+    service.restore({'ride-1': offered}, {
+        'ghost': ['busy', 12.9, 77.59],  # Holds the open offer
+        'idle-ghost': ['available', 12.9, 77.59],
+        'subscriber': ['available', 12.95, 77.59],
+        'poller': ['available', 12.99, 77.59],
+        'registered': ['busy', 12.99, 77.59],
+    })
+    service.open_offer_stream('subscriber', print)
+    service.GetAssignedRide(ride_sharing_pb2.AssignedRideRequest(driver_id='poller'), None)
+    register(service, 'registered', '12.9900,77.5900')
+
+    service.drop_silent_drivers()
+
+    assert service.drivers.status('ghost') is None
+    assert service.drivers.status('idle-ghost') is None
+    assert service.pending_offers == {'subscriber': 'ride-1'}  # As if the ghost had rejected it
+    assert request_ride(service).assigned_driver in ('poller', 'registered')
+    assert service.restored_drivers == set()
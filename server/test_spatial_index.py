@@ -0,0 +1,103 @@
+import numpy as np
+
+from spatial_index import GridIndex, haversine_km, parse_location, MAX_RING_SEARCH
+
+
+def linear_scan(points, lat, lng, k, exclude=()):
+    ids = [item_id for item_id in points if item_id not in exclude]
+    if not ids:
+        return []
+    distances = haversine_km(lat, lng, np.array([points[i][0] for i in ids]), np.array([points[i][1] for i in ids]))
+    return sorted(zip(ids, distances.tolist()), key=lambda pair: pair[1])[:k]
+
+
+def check_nearest(index, points, lat, lng, k, exclude=()):
+    found = index.nearest(lat, lng, k, exclude)
+    expected = linear_scan(points, lat, lng, k, exclude)
+    # Equal distances may come back in either order, so compare distances rather than ids
+    assert np.allclose([d for _, d in found], [d for _, d in expected])
+    distances = dict(linear_scan(points, lat, lng, len(points)))
+    for item_id, distance in found:
+        assert item_id not in exclude
+        assert np.isclose(distance, distances[item_id])
+
+
+def test_nearest_matches_linear_scan():
+    rng = np.random.default_rng(3)
+    index = GridIndex()
+    points = {}
+    for i in range(300):
+        points[f'd{i}'] = (12.9 + rng.uniform(-0.1, 0.1), 77.6 + rng.uniform(-0.1, 0.1))
+        index.insert(f'd{i}', *points[f'd{i}'])
+
+    for _ in range(50):
+        lat, lng = 12.9 + rng.uniform(-0.12, 0.12), 77.6 + rng.uniform(-0.12, 0.12)
+        k = int(rng.integers(1, 8))
+        exclude = {f'd{i}' for i in rng.integers(0, 300, 20)}
+        check_nearest(index, points, lat, lng, k)
+        check_nearest(index, points, lat, lng, k, exclude)
+
+
+def test_move_and_remove_match_linear_scan():
+    rng = np.random.default_rng(5)
+    index = GridIndex()
+    points = {}
+    for i in range(100):
+        points[f'd{i}'] = (12.9 + rng.uniform(-0.05, 0.05), 77.6 + rng.uniform(-0.05, 0.05))
+        index.insert(f'd{i}', *points[f'd{i}'])
+
+    for step in range(300):
+        item_id = f'd{rng.integers(0, 100)}'
+        if step % 3 == 0:
+            assert index.remove(item_id) == (item_id in points)
+            points.pop(item_id, None)
+        else:
+            points[item_id] = (12.9 + rng.uniform(-0.05, 0.05), 77.6 + rng.uniform(-0.05, 0.05))
+            index.insert(item_id, *points[item_id])  # Inserting again moves the driver
+        assert len(index) == len(points)
+        check_nearest(index, points, 12.9 + rng.uniform(-0.05, 0.05), 77.6 + rng.uniform(-0.05, 0.05), 3)
+
+
+def test_driver_moving_across_a_cell_boundary():
+    index = GridIndex(cell_size=0.01)
+    index.insert('mover', 12.9049, 77.5949)
+    index.insert('other', 12.9150, 77.5950)
+    old_cell = index._where['mover']
+
+    index.insert('mover', 12.9051, 77.6001)  # One cell east
+
+    assert index._where['mover'] != old_cell
+    assert old_cell not in index._cells  # The emptied cell is dropped
+    assert len(index) == 2
+    assert index.nearest(12.9051, 77.6001)[0][0] == 'mover'
+    assert [item_id for item_id, _ in index.nearest(12.9049, 77.5949, k=2)] == ['mover', 'other']
+
+
+def test_remove_unknown_driver():
+    index = GridIndex()
+    index.insert('d1', 12.9, 77.6)
+
+    assert index.remove('d1') is True
+    assert index.remove('d1') is False
+    assert index.nearest(12.9, 77.6) == []
+
+
+def test_pickup_with_no_driver_within_ring_search():
+    # The only drivers are further away than MAX_RING_SEARCH rings, so the query falls back to a full scan
+    index = GridIndex(cell_size=0.01)
+    far = 0.01 * (MAX_RING_SEARCH + 10)
+    points = {'east': (12.9, 77.6 + far), 'north': (12.9 + far * 1.5, 77.6)}
+    for item_id, point in points.items():
+        index.insert(item_id, *point)
+
+    found = index.nearest(12.9, 77.6, k=2)
+
+    assert [item_id for item_id, _ in found] == [item_id for item_id, _ in linear_scan(points, 12.9, 77.6, 2)]
+    assert index.nearest(12.9, 77.6, exclude={'east', 'north'}) == []
+
+
+def test_parse_location():
+    assert parse_location('12.9, 77.6') == (12.9, 77.6)
+    assert parse_location('Koramangala') is None
+    assert parse_location('91,0') is None
+    assert parse_location(None) is None
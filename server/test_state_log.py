@@ -0,0 +1,164 @@
+import json
+import os
+import pickle
+import threading
+
+import ride_sharing_pb2
+from ride_sharing_server import RideSharingService
+from state_log import StateLog, SNAPSHOT_FILE
+
+PICKUP = '12.9000,77.5900'
+
+
+def start_service(directory):
+    # Commits only on flush(), so each test decides what is on disk
+    service = RideSharingService(accept_timeout=3600, queue_timeout=3600, state_log=StateLog(directory, sync_interval=3600))
+    service.recover()
+    return service
+
+
+def stop_service(service):
+    service.state_log.close()
+    service.scheduler.stop()
+
+
+def driver(service, driver_id, location):
+    service.RegisterDriver(ride_sharing_pb2.RegisterDriverRequest(driver_id=driver_id, location=location), None)
+
+
+def ride(service, rider_id):
+    return service.RequestRide(ride_sharing_pb2.RideRequest(rider_id=rider_id, pickup_location=PICKUP, destination='12.98,77.60'), None)
+
+
+def write_log(directory, generation, text):
+    with open(os.path.join(directory, f'wal.{generation}.log'), 'w') as f:
+        f.write(text)
+
+
+def line(kind, key, record):
+    return json.dumps([kind, key, record]) + '\n'
+
+
+def files(directory):
+    return sorted(os.listdir(directory))
+
+
+def test_restart_restores_rides_drivers_and_rejections(tmp_path):
+    service = start_service(tmp_path)
+    driver(service, 'd1', PICKUP)
+    driver(service, 'd2', '12.9500,77.5900')
+    driver(service, 'd3', '12.9900,77.5900')
+    riding = ride(service, 'rider-a').ride_id  # Offered to d1
+    service.AcceptRide(ride_sharing_pb2.AcceptRideRequest(driver_id='d1', ride_id=riding), None)
+    queued = ride(service, 'rider-b').ride_id  # Offered to d2, then d3, then queued
+    service.RejectRide(ride_sharing_pb2.RejectRideRequest(driver_id='d2', ride_id=queued), None)
+    service.RejectRide(ride_sharing_pb2.RejectRideRequest(driver_id='d3', ride_id=queued), None)
+    offered = ride(service, 'rider-c').ride_id  # d2 is free again
+    service.state_log.flush()
+    stop_service(service)
+
+    restarted = start_service(tmp_path)
+    try:
+        assert restarted.state_log.recovery['replayed_records'] > 0
+        assert restarted.rides[riding]['status'] == 'in_progress'
+        assert restarted.rides[riding]['assigned_driver'] == 'd1'
+        assert restarted.rides[queued]['status'] == 'waiting_for_driver'
+        assert list(restarted.unassigned_rides) == [queued]
+        assert restarted.rejected_rides.rejected_by(queued) == {'d2', 'd3'}
+        assert restarted.pending_offers == {'d2': offered}
+        assert restarted.rides[offered]['timeout'] is not None
+        assert {d: restarted.drivers.status(d) for d in ('d1', 'd2', 'd3')} == {'d1': 'busy', 'd2': 'busy', 'd3': 'available'}
+        assert restarted.drivers.location('d3') == (12.99, 77.59)
+    finally:
+        stop_service(restarted)
+
+
+def test_torn_final_batch_is_dropped_and_truncated(tmp_path):
+    committed = line('d', 'd1', ['available', 12.9, 77.59]) + '["c"]\n'
+    write_log(tmp_path, 0, committed + line('d', 'd2', ['available', 12.9, 77.59]) + '["r","x",')
+    log = StateLog(tmp_path)
+
+    rides, drivers = log.load()
+    log.close()
+
+    assert (rides, list(drivers)) == ({}, ['d1'])
+    assert os.path.getsize(tmp_path / 'wal.0.log') == len(committed)
+    assert log.recovery['replayed_records'] == 1
+
+
+def test_batch_without_commit_marker_is_dropped(tmp_path):
+    committed = line('d', 'd1', ['available', 12.9, 77.59]) + '["c"]\n'
+    write_log(tmp_path, 0, committed + line('d', 'd1', None) + line('d', 'd2', ['busy', 12.9, 77.59]))
+
+    rides, drivers = StateLog(tmp_path).load()
+
+    assert list(drivers) == ['d1']
+    assert os.path.getsize(tmp_path / 'wal.0.log') == len(committed)
+
+
+def test_snapshot_rotation_keeps_only_uncovered_logs(tmp_path):
+    records = {}
+    lock = threading.Lock()
+    log = StateLog(tmp_path, sync_interval=3600, snapshot_every=2).start(
+        lock, lambda ride_ids, driver_ids: ({}, {d: records.get(d) for d in driver_ids}))
+
+    for i in range(3):
+        with lock:
+            records[f'd{i}'] = ['available', 12.9, 77.59]
+            log.driver_changed(f'd{i}')
+        log.flush()
+        if i == 0:
+            assert files(tmp_path) == ['wal.0.log']
+    log.close()
+
+    # The second batch reached snapshot_every: wal.0 is covered by the snapshot, the third batch is in wal.1
+    assert files(tmp_path) == [SNAPSHOT_FILE, 'wal.1.log']
+    assert log.stats()['snapshots'] == 1
+    assert StateLog(tmp_path).load()[1] == records
+
+
+def test_load_deletes_only_logs_the_snapshot_covers(tmp_path):
+    # A crash after the snapshot was replaced but before wal.0 was deleted, with two newer log files
+    with open(tmp_path / SNAPSHOT_FILE, 'wb') as f:
+        pickle.dump({'generation': 1, 'rides': {}, 'drivers': {'d1': ['available', 12.9, 77.59]}}, f)
+    write_log(tmp_path, 0, line('d', 'stale', ['busy', 0, 0]) + '["c"]\n')
+    write_log(tmp_path, 1, line('d', 'd2', ['busy', 12.9, 77.59]) + '["c"]\n')
+    write_log(tmp_path, 2, line('d', 'd1', None) + '["c"]\n')
+    log = StateLog(tmp_path)
+
+    rides, drivers = log.load()
+    log.close()
+
+    assert drivers == {'d2': ['busy', 12.9, 77.59]}
+    assert files(tmp_path) == [SNAPSHOT_FILE, 'wal.1.log', 'wal.2.log']
+    assert log.stats()['generation'] == 2
+
+
+def test_standby_apply_with_reset_replaces_its_state(tmp_path):
+    standby = StateLog(tmp_path)
+    standby.load()
+    standby.apply(line('d', 'old', ['available', 12.9, 77.59]).encode(), sequence=4)
+
+    standby.apply((line('d', 'd1', ['busy', 12.9, 77.59]) +
+                   line('r', 'r1', ['rider', PICKUP, 'dest', 'd1', 'in_progress', None, []])).encode(), reset=True, sequence=9)
+    standby.apply(line('d', 'd2', ['available', 12.95, 77.59]).encode(), sequence=10)
+    standby.close()
+
+    assert set(standby.drivers) == {'d1', 'd2'}
+    assert list(standby.rides) == ['r1']
+    assert standby.sequence == 10
+    # The reset wrote a snapshot of the new state and dropped the log that held 'old'
+    assert files(tmp_path) == [SNAPSHOT_FILE, 'wal.1.log']
+    rides, drivers = StateLog(tmp_path).load()
+    assert (set(rides), set(drivers)) == ({'r1'}, {'d1', 'd2'})
+
+
+def test_without_directory_records_stay_in_memory():
+    log = StateLog()
+
+    assert log.load() == ({}, {})
+    log.apply(line('d', 'd1', ['available', 12.9, 77.59]).encode(), reset=True)
+    log.close()
+
+    assert list(log.drivers) == ['d1']
+    assert log.stats()['snapshots'] == 0
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+import pytest
+
+from timeout_scheduler import TimeoutScheduler, AsyncioScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = TimeoutScheduler()
+    yield scheduler
+    scheduler.stop()
+
+
+def test_deadlines_fire_in_deadline_order(scheduler):
+    fired = []
+    done = threading.Event()
+    scheduler.schedule(0.06, lambda: (fired.append('last'), done.set()))
+    scheduler.schedule(0.02, fired.append, 'first')
+    scheduler.schedule(0.04, fired.append, 'second')
+
+    assert done.wait(2)
+    assert fired == ['first', 'second', 'last']
+    assert scheduler.stats()['pending'] == 0
+    assert scheduler.stats()['fired'] == 3
+
+
+def test_cancel_prevents_callback(scheduler):
+    fired = []
+    done = threading.Event()
+    cancelled = scheduler.schedule(0.02, fired.append, 'cancelled')
+    scheduler.schedule(0.04, lambda: done.set())
+
+    assert cancelled.cancel() is True
+    assert cancelled.cancel() is False  # Already cancelled
+    assert done.wait(2)
+    assert fired == []
+    assert scheduler.stats()['fired'] == 1
+
+
+def test_cancel_after_firing_is_refused(scheduler):
+    done = threading.Event()
+    handle = scheduler.schedule(0.01, done.set)
+
+    assert done.wait(2)
+    assert handle.cancel() is False
+    assert scheduler.stats()['pending'] == 0
+
+
+def test_failing_callback_does_not_stop_the_scheduler(scheduler):
+    done = threading.Event()
+    scheduler.schedule(0.01, lambda: 1 / 0)
+    scheduler.schedule(0.02, done.set)
+
+    assert done.wait(2)
+
+
+def test_heap_is_compacted_once_cancelled_entries_dominate(scheduler):
+    fired = threading.Event()
+    handles = [scheduler.schedule(3600, fired.set) for _ in range(2000)]
+    kept = scheduler.schedule(0.05, fired.set)
+
+    for handle in handles[:1100]:
+        handle.cancel()
+
+    # The 1025th cancel rebuilt the heap without the 1025 cancelled entries; 75 more followed
+    assert len(scheduler._heap) == 2001 - 1025
+    assert scheduler._cancelled_in_heap == 75
+    assert scheduler.stats()['pending'] == 901
+    assert fired.wait(2)
+    assert kept.fired
+
+
+def test_asyncio_scheduler_fires_in_order_and_honours_cancel():
+    async def run():
+        scheduler = AsyncioScheduler()
+        fired = []
+        scheduler.schedule(0.03, fired.append, 'second')
+        scheduler.schedule(0.01, fired.append, 'first')
+        scheduler.schedule(0.02, fired.append, 'cancelled').cancel()
+        await asyncio.sleep(0.1)
+        return fired, scheduler.stats()
+
+    fired, stats = asyncio.run(run())
+
+    assert fired == ['first', 'second']
+    assert (stats['pending'], stats['fired']) == (0, 2)
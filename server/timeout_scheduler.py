@@ -0,0 +1,182 @@
+# timeout_scheduler.py
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+
+class TimeoutHandle:
+    __slots__ = ('deadline', 'callback', 'args', 'cancelled', 'fired', 'timer', '_scheduler')
+
+    def __init__(self, scheduler, deadline, callback, args):
+        self._scheduler = scheduler
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.fired = False
+        self.timer = None  # asyncio.TimerHandle when owned by an AsyncioScheduler
+
+    def cancel(self):
+        return self._scheduler.cancel(self)
+
+
+class TimeoutScheduler:
+    # A single daemon thread owns every deadline. Deadlines live in a min-heap keyed by
+    # (deadline, sequence); cancelling only flags the handle, and the flagged entry is
+    # skipped when it reaches the top of the heap (or dropped when the heap is compacted).
+    def __init__(self, name='timeout-scheduler'):
+        self._heap = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._pending = 0  # Scheduled and neither fired nor cancelled
+        self._cancelled_in_heap = 0
+        self._fired = 0
+        self._total_lateness = 0.0
+        self._max_lateness = 0.0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def schedule(self, delay, callback, *args):
+        with self._cond:
+            handle = TimeoutHandle(self, time.monotonic() + delay, callback, args)
+            heapq.heappush(self._heap, (handle.deadline, next(self._sequence), handle))
+            self._pending += 1
+            # Only wake the worker if the new deadline is now the earliest one
+            if self._heap[0][2] is handle:
+                self._cond.notify()
+        return handle
+
+    def cancel(self, handle):
+        with self._cond:
+            if handle.cancelled or handle.fired:
+                return False
+            handle.cancelled = True
+            self._pending -= 1
+            self._cancelled_in_heap += 1
+            # Rebuild once cancelled entries dominate so the heap cannot grow unbounded
+            if self._cancelled_in_heap > 1024 and self._cancelled_in_heap * 2 > len(self._heap):
+                self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled_in_heap = 0
+            return True
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': self._pending,
+                'fired': self._fired,
+                'avg_lateness_ms': (self._total_lateness / self._fired * 1000) if self._fired else 0.0,
+                'max_lateness_ms': self._max_lateness * 1000,
+            }
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                handle = None
+                while self._running and handle is None:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    deadline, _, head = self._heap[0]
+                    if head.cancelled:
+                        heapq.heappop(self._heap)
+                        self._cancelled_in_heap -= 1
+                        continue
+                    now = time.monotonic()
+                    if deadline > now:
+                        self._cond.wait(deadline - now)
+                        continue
+                    heapq.heappop(self._heap)
+                    head.fired = True
+                    self._pending -= 1
+                    self._fired += 1
+                    lateness = now - deadline
+                    self._total_lateness += lateness
+                    self._max_lateness = max(self._max_lateness, lateness)
+                    handle = head
+                if not self._running:
+                    return
+
+            # Run the callback outside the scheduler lock so it can schedule or cancel freely
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                print(f"[Scheduler] Timeout callback failed: {e}")
+
+
+class AsyncioScheduler:
+    # Same interface as TimeoutScheduler for the grpc.aio server: deadlines are asyncio timer
+    # handles on the running event loop, so callbacks run on the loop and cancel() is O(1).
+    # Calls from other threads (e.g. the batch dispatcher) are handed over to the loop.
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._fired = 0
+        self._total_lateness = 0.0
+        self._max_lateness = 0.0
+
+    def schedule(self, delay, callback, *args):
+        handle = TimeoutHandle(self, self._loop.time() + delay, callback, args)
+        with self._lock:
+            self._pending += 1
+        self._on_loop(self._arm, handle)
+        return handle
+
+    def cancel(self, handle):
+        with self._lock:
+            if handle.cancelled or handle.fired:
+                return False
+            handle.cancelled = True
+            self._pending -= 1
+        if handle.timer is not None:
+            self._on_loop(handle.timer.cancel)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'fired': self._fired,
+                'avg_lateness_ms': (self._total_lateness / self._fired * 1000) if self._fired else 0.0,
+                'max_lateness_ms': self._max_lateness * 1000,
+            }
+
+    def stop(self):
+        pass
+
+    def _on_loop(self, callback, *args):
+        if threading.get_ident() == self._loop_thread:
+            callback(*args)
+        else:
+            self._loop.call_soon_threadsafe(callback, *args)
+
+    def _arm(self, handle):
+        if not handle.cancelled:
+            handle.timer = self._loop.call_at(handle.deadline, self._fire, handle)
+
+    def _fire(self, handle):
+        with self._lock:
+            if handle.cancelled:
+                return
+            handle.fired = True
+            self._pending -= 1
+            self._fired += 1
+            lateness = self._loop.time() - handle.deadline
+            self._total_lateness += lateness
+            self._max_lateness = max(self._max_lateness, lateness)
+        try:
+            handle.callback(*handle.args)
+        except Exception as e:
+            print(f"[Scheduler] Timeout callback failed: {e}")